@@ -1,18 +1,91 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
+import os
+import signal
+import sys
+from pathlib import Path
 import warnings
 
+from startup import StartupProfile
+
+# Профиль запуска создается до остальных импортов, чтобы профилировщик их
+# видел. STARTUP_PROFILE=1 включает разбивку времени импортов по пакетам.
+# Это переменная окружения, а не настройка из .env: конфигурация читается позже
+profile = StartupProfile(imports=os.environ.get('STARTUP_PROFILE', '') not in ('', '0'))
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+
+# Импорт aiogram бот сократить не может, поэтому он замеряется отдельной фазой
+profile.mark('aiogram')
+
 from configs import load_config, Config
-from database import User
+from database import Leaderboards, SessionManager, UserRegistry, UserStore, create_storage
 from handlers import router
+from hotreload import HotReloader
+from lexicon import LEXICON
+from middlewares import (LocaleMiddleware, OutboundThrottleMiddleware, SessionMiddleware,
+                         StorageMiddleware, UserLockMiddleware)
+from responses import PreparedSession
 
+profile.mark('импорты')
+
+# Кластер, метрики, журнал раундов и вебхук импортируются там, где они
+# включаются: процесс не платит за подсистемы, которые ему не нужны
 
 warnings.simplefilter(action='ignore', category=Warning)
 
 logger = logging.getLogger(__name__)
 
 
+def ready() -> None:
+    """Функция отмечает готовность процесса принимать апдейты и пишет время запуска"""
+    profile.mark('готовность')
+    logger.info('Запуск занял %.2f с', profile.elapsed)
+    # Фазы пишутся всегда: по ним startup_bench считает накладные расходы бота
+    logger.info(profile.report())
+
+
+async def run_front(configs: Config, bot: Bot, dp: Dispatcher) -> None:
+    """
+    Функция запускает процесс-фронт: он получает апдейты и раздает их
+    воркерам по id пользователя. Воркеры — этот же скрипт с номером в
+    окружении. По SIGHUP воркеры по очереди перезапускаются, а по SIGUSR1
+    перезагружают хэндлеры и лексикон на месте
+    """
+    from cluster import ClusterFront, run_front_polling, run_front_webhook, worker_env
+
+    if configs.storage.backend == 'memory':
+        logger.warning('Хранилище memory не переживает перезапуск воркеров, '
+                       'используйте sqlite или redis')
+
+    front = ClusterFront(
+        configs.cluster.workers, lambda n: [sys.executable, sys.argv[0]], env=worker_env
+    )
+    front.start()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.create_task(front.restart()))
+    # SIGUSR1 пересылаем воркерам: каждый перезагрузит хэндлеры без перезапуска
+    loop.add_signal_handler(signal.SIGUSR1, lambda: front.signal(signal.SIGUSR1))
+    logger.info('Фронт запущен, воркеров: %d', configs.cluster.workers)
+    ready()
+
+    try:
+        if configs.webhook:
+            await run_front_webhook(
+                front, bot, base_url=configs.webhook.base_url,
+                path=configs.webhook.path, host=configs.webhook.host,
+                port=configs.webhook.port, secret=configs.webhook.secret,
+                allowed_updates=dp.resolve_used_update_types()
+            )
+        else:
+            await run_front_polling(front, bot, allowed_updates=dp.resolve_used_update_types())
+    finally:
+        # Воркеры дорабатывают принятые апдейты и сохраняют профили
+        await front.close()
+        await bot.session.close()
+
+
 async def main():
     # Конфигурируем логгер
     logging.basicConfig(
@@ -25,19 +98,154 @@ async def main():
 
     # Загружаем конфигурацию бота
     configs: Config = load_config()
+    profile.mark('конфигурация')
+    # Номер воркера в многопроцессном режиме; None — фронт или единственный процесс
+    worker = configs.cluster.index if configs.cluster else None
 
-    bot = Bot(token=configs.tg_bot.token, parse_mode='HTML')
+    # Сессия подставляет заранее сериализованные клавиатуры в запросы к Bot API
+    bot = Bot(
+        token=configs.tg_bot.token, session=PreparedSession(),
+        default=DefaultBotProperties(parse_mode='HTML')
+    )
     dp = Dispatcher()
 
     # Подключаем роутер к диспетчеру
     dp.include_router(router=router)
 
-    # Создаем "базу данных" с пользовательским данными
-    UsersStorage: dict[int, User] = {}
+    # В многопроцессном режиме этот процесс только раздает апдейты воркерам
+    if configs.cluster and worker is None:
+        await run_front(configs, bot, dp)
+        return
+
+    # Исходящие сообщения проходят через ведра токенов с учетом лимитов Telegram.
+    # Общий лимит бота делится между воркерами поровну
+    bot.session.middleware(OutboundThrottleMiddleware(
+        global_rate=25 / configs.cluster.workers if configs.cluster else 25
+    ))
+
+    storage = create_storage(
+        configs.storage.backend, path=configs.storage.path,
+        host=configs.storage.host, port=configs.storage.port,
+        shards=configs.storage.shards
+    )
+
+    # Собираем метрики хэндлеров, запросов к Bot API и хранилища
+    metrics_runner = None
+    if configs.monitoring:
+        from metrics import Metrics, TimedStorage, start_metrics_server
+        from middlewares import setup_metrics
+
+        metrics = Metrics()
+        setup_metrics(dp, bot, metrics, trace_sample_rate=configs.monitoring.trace_sample_rate)
+        storage = TimedStorage(storage, metrics)
+        # Каждый воркер отдает метрики на своем порту: METRICS_PORT + 1 + номер
+        metrics_runner = await start_metrics_server(
+            metrics, configs.monitoring.host,
+            configs.monitoring.port + (0 if worker is None else 1 + worker)
+        )
+
+    # Создаем хранилище пользовательских данных с отложенной пачечной записью
+    UsersStorage = UserStore(
+        storage,
+        cache=UserRegistry() if configs.storage.columnar else None,
+        flush_interval=configs.storage.flush_interval
+    )
+    # Апдейты одного пользователя обрабатываем последовательно, чтобы
+    # хэндлеры не гонялись за один и тот же профиль
+    dp.update.outer_middleware(UserLockMiddleware())
+    # Брошенные игры завершаем, а профили молчащих пользователей выгружаем из памяти
+    sessions = SessionManager(
+        UsersStorage, game_ttl=configs.storage.game_ttl, idle_ttl=configs.storage.idle_ttl
+    )
+    dp.update.outer_middleware(SessionMiddleware(sessions))
+    dp.update.outer_middleware(StorageMiddleware(UsersStorage))
+    # Тексты ответов берем на языке пользователя
+    locale = LocaleMiddleware(LEXICON)
+    dp.update.outer_middleware(locale)
+    UsersStorage.start()
+    sessions.start()
+    profile.mark('хранилище')
+
+    # Таблицы лидеров строятся по всем профилям из хранилища в фоне, дальше их
+    # обновляют хэндлеры ходов. Воркер учитывает только своих пользователей
+    leaderboards = Leaderboards()
+    if worker is not None:
+        from cluster import jump_hash
+
+        leaderboards.start(
+            storage, lambda user_id: jump_hash(user_id, configs.cluster.workers) == worker
+        )
+    else:
+        leaderboards.start(storage)
+
+    # Журнал раундов для подробной статистики. У каждого воркера свой журнал
+    history = None
+    if configs.history:
+        from history import GameHistory
+
+        directory = Path(configs.history.directory)
+        history = GameHistory(
+            directory if worker is None else directory / f'worker-{worker}',
+            flush_interval=configs.history.flush_interval,
+            compact_interval=configs.history.compact_interval
+        )
+        logger.info('Журнал раундов загружен, дочитано раундов: %d', history.open())
+        history.start()
+        profile.mark('журнал раундов')
+
+    # По SIGUSR1 перезагружаем хэндлеры, клавиатуры и лексикон, не теряя
+    # апдейтов, и применяем настройки из .env, которые меняются на лету
+    def reload_settings() -> None:
+        fresh = load_config(override=True)
+        if fresh.storage.game_ttl > fresh.storage.idle_ttl:
+            logger.warning('STORAGE_GAME_TTL больше STORAGE_IDLE_TTL, время жизни сессий не изменено')
+        else:
+            sessions.game_ttl = fresh.storage.game_ttl
+            sessions.idle_ttl = fresh.storage.idle_ttl
+        UsersStorage.flush_interval = fresh.storage.flush_interval
+
+    reloader = HotReloader(dp, locale, after_reload=reload_settings)
+    reloader.install(signal.SIGUSR1)
+
+    try:
+        if worker is not None:
+            from cluster import serve_worker
+
+            # Апдейты своих пользователей получаем от фронта
+            ready()
+            await serve_worker(
+                dp, bot, max_concurrency=configs.webhook.max_concurrency if configs.webhook else 64,
+                UsersStorage=UsersStorage, history=history, leaderboards=leaderboards
+            )
+        elif configs.webhook:
+            from webhook import run_webhook
 
-    # Пропускаем накопившиеся апдейты и начинаем поллинг
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot, UsersStorage=UsersStorage)
+            # Принимаем апдейты через вебхук и обрабатываем их параллельно
+            ready()
+            await run_webhook(
+                dp, bot, base_url=configs.webhook.base_url,
+                path=configs.webhook.path, host=configs.webhook.host,
+                port=configs.webhook.port, secret=configs.webhook.secret,
+                max_concurrency=configs.webhook.max_concurrency,
+                UsersStorage=UsersStorage, history=history, leaderboards=leaderboards
+            )
+        else:
+            # Начинаем поллинг. Накопившиеся апдейты не сбрасываем: они
+            # ждали, пока бот перезапускался
+            ready()
+            await bot.delete_webhook(drop_pending_updates=False)
+            await dp.start_polling(
+                bot, UsersStorage=UsersStorage, history=history, leaderboards=leaderboards
+            )
+    finally:
+        # Сбрасываем несохраненные изменения перед завершением работы
+        await sessions.close()
+        await leaderboards.close()
+        if history is not None:
+            await history.close()
+        await UsersStorage.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,10 @@
+from startup import lazy_exports
+
+
+# Фронт и воркер — разные процессы: каждый загружает только свою часть пакета
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    '.front': ('ClusterFront', 'WorkerLink', 'run_front_polling', 'run_front_webhook',
+               'worker_env'),
+    '.sharding': ('get_payload_key', 'jump_hash'),
+    '.worker': ('serve_worker',),
+})
\ No newline at end of file
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import logging
+import os
+from collections.abc import Callable, Sequence
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.methods import GetUpdates
+
+from webhook.app import SECRET_HEADER
+from .sharding import get_payload_key, jump_hash
+
+
+logger = logging.getLogger(__name__)
+
+# Колбэк подтверждения: номер апдейта и итог его обработки в воркере
+AckCallback = Callable[[int, str], None]
+
+
+# Канал фронта к одному процессу-воркеру. Апдейт пишется в stdin воркера
+# кадром '<номер> <длина>\n<json>', а воркер после обработки отвечает в
+# stdout строкой '<номер> <итог>\n', а после запуска присылает '0 ready\n'.
+# Неподтвержденные апдейты хранятся до
+# ответа: если воркер упал или перезапускается, они в том же порядке
+# досылаются новому процессу, поэтому апдейты не теряются
+class WorkerLink:
+    def __init__(
+            self, index: int, command: Sequence[str], *, env: dict[str, str] | None = None,
+            max_unacked: int = 10000, restart_delay: float = 1.0,
+            on_ack: AckCallback | None = None
+    ) -> None:
+        self.index = index
+        self.restarts = 0
+        self._command = list(command)
+        self._env = env
+        self._restart_delay = restart_delay
+        self._on_ack = on_ack
+        self._unacked: dict[int, bytes] = {}
+        self._slots = asyncio.Semaphore(max_unacked)
+        self._process: asyncio.subprocess.Process | None = None
+        self._spare: asyncio.subprocess.Process | None = None
+        self._supervisor: asyncio.Task | None = None
+        self._closing = False
+
+    @property
+    def pending(self) -> int:
+        """Количество апдейтов, отправленных воркеру и еще не подтвержденных"""
+        return len(self._unacked)
+
+    def start(self) -> None:
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        """Запускает процесс воркера и ждет, пока он сообщит о готовности"""
+        process = await asyncio.create_subprocess_exec(
+            *self._command, env=self._env,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE
+        )
+        # Первой строкой воркер присылает подтверждение с номером 0. Если он
+        # упал при запуске, строка пустая, и это обработает цикл _supervise
+        await process.stdout.readline()
+        return process
+
+    async def _supervise(self) -> None:
+        while True:
+            process, self._spare = self._spare or await self._spawn(), None
+            # Досылаем то, что не успел подтвердить предыдущий процесс
+            for frame in self._unacked.values():
+                process.stdin.write(frame)
+            self._process = process
+            logger.info('Воркер %d запущен (pid %d)', self.index, process.pid)
+
+            async for line in process.stdout:
+                seq, _, status = line.rstrip().decode().partition(' ')
+                if self._unacked.pop(int(seq), None) is None:
+                    continue
+                self._slots.release()
+                if self._on_ack is not None:
+                    self._on_ack(int(seq), status)
+
+            code = await process.wait()
+            self._process = None
+            if self._closing:
+                return
+            if code:
+                logger.warning('Воркер %d завершился с кодом %d, перезапускаем', self.index, code)
+                await asyncio.sleep(self._restart_delay)
+            self.restarts += 1
+
+    async def send(self, seq: int, payload: bytes) -> None:
+        await self._slots.acquire()
+        frame = self._unacked[seq] = b'%d %d\n%s' % (seq, len(payload), payload)
+        process = self._process
+        if process is None or process.stdin.is_closing():
+            # Воркер перезапускается: апдейт уйдет новому процессу
+            return
+        process.stdin.write(frame)
+        try:
+            await process.stdin.drain()
+        except ConnectionError:
+            # Воркер упал, апдейт остался в неподтвержденных
+            pass
+
+    def stop(self) -> None:
+        """Закрывает stdin воркера: он дорабатывает принятые апдейты и завершается"""
+        if self._process is not None and not self._process.stdin.is_closing():
+            self._process.stdin.close()
+
+    def signal(self, sig: int) -> None:
+        """Отправляет сигнал работающему воркеру, например SIGUSR1 для перезагрузки хэндлеров"""
+        if self._process is not None and self._process.returncode is None:
+            self._process.send_signal(sig)
+
+    async def restart(self) -> None:
+        """Мягко перезапускает воркер и дожидается, пока он снова примет апдейты"""
+        restarts = self.restarts
+        # Новый процесс запускаем заранее и ждем его готовности, а старый
+        # останавливаем после этого. Апдейты новый процесс получит только
+        # после выхода старого, который успеет сохранить профили
+        self._spare = await self._spawn()
+        self.stop()
+        while self.restarts == restarts or self._process is None:
+            await asyncio.sleep(0.05)
+
+    async def close(self) -> None:
+        self._closing = True
+        self.stop()
+        if self._supervisor is not None:
+            await self._supervisor
+
+
+# Фронт многопроцессного режима. Сам апдейты не обрабатывает: по id
+# пользователя выбирает воркер консистентным хэшем и пересылает ему сырой
+# JSON. Так все апдейты пользователя попадают в один процесс, который
+# держит его профиль в своем срезе хранилища, а порядок их обработки
+# сохраняется. command(n) возвращает командную строку n-го воркера
+class ClusterFront:
+    def __init__(
+            self, workers: int, command: Callable[[int], Sequence[str]], *,
+            env: Callable[[int], dict[str, str]] | None = None, max_unacked: int = 10000,
+            on_ack: AckCallback | None = None
+    ) -> None:
+        self.links = [
+            WorkerLink(
+                n, command(n), env=env(n) if env else None,
+                max_unacked=max_unacked, on_ack=on_ack
+            )
+            for n in range(workers)
+        ]
+        self._seq = 0
+
+    @property
+    def pending(self) -> int:
+        return sum(link.pending for link in self.links)
+
+    def start(self) -> None:
+        for link in self.links:
+            link.start()
+
+    def worker_for(self, key: int) -> WorkerLink:
+        return self.links[jump_hash(key, len(self.links))]
+
+    async def submit(self, payload: bytes, key: int | None = None) -> int:
+        """
+        Отправляет сырой апдейт воркеру, отвечающему за пользователя, и
+        возвращает номер апдейта. Если ключ не передан, он берется из JSON
+        """
+        if key is None:
+            key = get_payload_key(json.loads(payload))
+        self._seq += 1
+        await self.worker_for(key).send(self._seq, payload)
+        return self._seq
+
+    async def join(self) -> None:
+        """Дожидается подтверждения всех отправленных апдейтов"""
+        while self.pending:
+            await asyncio.sleep(0.01)
+
+    def signal(self, sig: int) -> None:
+        for link in self.links:
+            link.signal(sig)
+
+    async def restart(self) -> None:
+        """Перезапускает воркеры по одному, не останавливая прием апдейтов"""
+        for link in self.links:
+            await link.restart()
+
+    async def close(self) -> None:
+        await asyncio.gather(*(link.close() for link in self.links))
+
+
+def worker_env(index: int, variable: str = 'CLUSTER_WORKER_INDEX') -> dict[str, str]:
+    """Окружение воркера: окружение фронта и номер воркера"""
+    return {**os.environ, variable: str(index)}
+
+
+async def run_front_webhook(
+        front: ClusterFront, bot: Bot, *, base_url: str, path: str, host: str, port: int,
+        secret: str | None = None, allowed_updates: list[str] | None = None
+) -> None:
+    """Функция принимает апдейты через вебхук и пересылает их воркерам как есть"""
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+        await front.submit(await request.read())
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+
+    await bot.set_webhook(
+        url=f'{base_url.rstrip("/")}{path}', secret_token=secret,
+        allowed_updates=allowed_updates
+    )
+    logger.info('Вебхук фронта запущен на %s:%s%s', host, port, path)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_front_polling(
+        front: ClusterFront, bot: Bot, *, allowed_updates: list[str] | None = None,
+        timeout: int = 30
+) -> None:
+    """Функция получает апдейты поллингом и пересылает их воркерам"""
+    # Накопившиеся апдейты не сбрасываем: пока фронт перезапускался, они ждали в Telegram
+    await bot.delete_webhook(drop_pending_updates=False)
+    offset = None
+    while True:
+        updates = await bot(GetUpdates(
+            offset=offset, timeout=timeout, allowed_updates=allowed_updates
+        ))
+        for update in updates:
+            user = getattr(update.event, 'from_user', None)
+            await front.submit(
+                update.model_dump_json(by_alias=True, exclude_unset=True).encode(),
+                user.id if user is not None else -update.update_id
+            )
+            offset = update.update_id + 1
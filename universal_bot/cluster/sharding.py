@@ -0,0 +1,34 @@
+from collections.abc import Mapping
+from typing import Any
+
+
+_MASK = (1 << 64) - 1
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Консистентное хэширование Jump Hash (Lamping, Veach): ключ всегда попадает
+    в один и тот же бакет, а при переходе с N бакетов на N + 1 переезжает
+    лишь 1/(N + 1) ключей. Не требует памяти и работает за O(log N)
+    """
+    key &= _MASK
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & _MASK
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def get_payload_key(payload: Mapping[str, Any]) -> int:
+    """
+    Функция возвращает ключ шардирования сырого апдейта Telegram: id
+    отправителя, а если его нет, то id апдейта со знаком минус, как
+    webhook.scheduler.get_update_key
+    """
+    for name, event in payload.items():
+        if name != 'update_id' and isinstance(event, dict):
+            user = event.get('from') or event.get('user')
+            if user is not None:
+                return user['id']
+    return -payload['update_id']
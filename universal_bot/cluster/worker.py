@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+import sys
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import Update
+
+from webhook import UpdateScheduler
+from webhook.scheduler import get_update_key
+
+
+logger = logging.getLogger(__name__)
+
+
+async def serve_worker(dp: Dispatcher, bot: Bot, *, max_concurrency: int = 64, **kwargs: Any) -> None:
+    """
+    Функция обслуживает воркер многопроцессного режима: читает из stdin
+    апдейты, присланные фронтом, обрабатывает их через планировщик и
+    подтверждает каждый в stdout. Когда фронт закрывает stdin, воркер
+    дорабатывает принятые апдейты и возвращается. Именованные аргументы
+    передаются в хэндлеры
+    """
+    loop = asyncio.get_running_loop()
+
+    # stdout занимают подтверждения, поэтому случайный вывод уводим в stderr
+    ack_file = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    reader = asyncio.StreamReader(limit=2 ** 20)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, ack_file)
+    acks = asyncio.StreamWriter(transport, protocol, None, loop)
+
+    # Номера апдейтов, присвоенные фронтом, по id объекта апдейта
+    sequence: dict[int, int] = {}
+
+    def ack(update: Update, status: str) -> None:
+        acks.write(b'%d %s\n' % (sequence.pop(id(update)), status.encode()))
+
+    async def process(update: Update) -> None:
+        # Прерванный апдейт не подтверждаем: фронт отправит его заново
+        try:
+            result = await dp.feed_update(bot, update, **kwargs)
+        except Exception as error:
+            ack(update, type(error).__name__)
+            raise
+        ack(update, 'unhandled' if result is UNHANDLED else 'ok')
+
+    scheduler = UpdateScheduler(process, max_concurrency=max_concurrency)
+    await dp.emit_startup(bot=bot, **kwargs)
+    # Сообщаем фронту, что воркер загрузился и готов принимать апдейты
+    acks.write(b'0 ready\n')
+    try:
+        while header := await reader.readline():
+            seq, size = map(int, header.split())
+            payload = await reader.readexactly(size)
+            try:
+                update = Update.model_validate_json(payload, context={'bot': bot})
+                get_update_key(update)
+            except Exception as error:
+                # Битый апдейт подтверждаем с ошибкой, иначе фронт будет слать его снова
+                logger.exception('Не удалось разобрать апдейт %d', seq)
+                acks.write(b'%d %s\n' % (seq, type(error).__name__.encode()))
+                continue
+            sequence[id(update)] = seq
+            await scheduler.submit(update)
+            if transport.get_write_buffer_size() > 2 ** 16:
+                await acks.drain()
+        # Фронт закрыл канал — дорабатываем принятые апдейты
+        await scheduler.join()
+    finally:
+        await dp.emit_shutdown(bot=bot, **kwargs)
+        while transport.get_write_buffer_size():
+            await asyncio.sleep(0.01)
+        acks.close()
@@ -7,13 +7,98 @@ class TgBot:
     token: str
 
 
+@dataclass(slots=True)
+class Storage:
+    backend: str  # memory, sqlite или redis
+    path: str
+    host: str
+    port: int
+    shards: int
+    flush_interval: float
+    columnar: bool  # Хранить профили в колоночном реестре вместо объектов User
+    game_ttl: float  # Через сколько секунд простоя брошенная игра завершается
+    idle_ttl: float  # Через сколько секунд простоя профиль выгружается из памяти
+
+
+@dataclass(slots=True)
+class Webhook:
+    base_url: str
+    path: str
+    host: str
+    port: int
+    secret: str | None
+    max_concurrency: int
+
+
+@dataclass(slots=True)
+class Monitoring:
+    host: str
+    port: int
+    trace_sample_rate: float  # Доля апдейтов, трассировка которых пишется в лог
+
+
+@dataclass(slots=True)
+class History:
+    directory: str  # Каталог журнала раундов и снимка агрегатов
+    flush_interval: float
+    compact_interval: float  # Как часто уплотнять журнал и сохранять снимок
+
+
+@dataclass(slots=True)
+class Cluster:
+    workers: int  # Число процессов-воркеров
+    index: int | None  # Номер воркера; None — процесс-фронт
+
+
 @dataclass(slots=True)
 class Config:
     tg_bot: TgBot
+    storage: Storage
+    webhook: Webhook | None  # None — работа в режиме поллинга
+    monitoring: Monitoring | None  # None — метрики не отдаются
+    cluster: Cluster | None  # None — все апдейты обрабатываются в одном процессе
+    history: History | None  # None — история раундов не ведется
 
 
-def load_config() -> Config:
+def load_config(override: bool = False) -> Config:
+    # override=True перечитывает .env поверх уже загруженных переменных, как
+    # при горячей перезагрузке настроек
     env = Env()
-    env.read_env()
+    env.read_env(override=override)
 
-    return Config(TgBot(token=env('BOT_TOKEN')))
\ No newline at end of file
+    return Config(
+        tg_bot=TgBot(token=env('BOT_TOKEN')),
+        storage=Storage(
+            backend=env.str('STORAGE_BACKEND', 'memory'),
+            path=env.str('STORAGE_PATH', 'users.sqlite3'),
+            host=env.str('STORAGE_HOST', 'localhost'),
+            port=env.int('STORAGE_PORT', 6379),
+            shards=env.int('STORAGE_SHARDS', 1),
+            flush_interval=env.float('STORAGE_FLUSH_INTERVAL', 0.5),
+            columnar=env.bool('STORAGE_COLUMNAR', False),
+            game_ttl=env.float('STORAGE_GAME_TTL', 900),
+            idle_ttl=env.float('STORAGE_IDLE_TTL', 3600)
+        ),
+        webhook=Webhook(
+            base_url=env.str('WEBHOOK_URL'),
+            path=env.str('WEBHOOK_PATH', '/webhook'),
+            host=env.str('WEBHOOK_HOST', '0.0.0.0'),
+            port=env.int('WEBHOOK_PORT', 8080),
+            secret=env.str('WEBHOOK_SECRET', '') or None,
+            max_concurrency=env.int('WEBHOOK_MAX_CONCURRENCY', 64)
+        ) if env.str('WEBHOOK_URL', '') else None,
+        monitoring=Monitoring(
+            host=env.str('METRICS_HOST', '127.0.0.1'),
+            port=env.int('METRICS_PORT'),
+            trace_sample_rate=env.float('TRACE_SAMPLE_RATE', 0.0)
+        ) if env.int('METRICS_PORT', 0) else None,
+        cluster=Cluster(
+            workers=env.int('CLUSTER_WORKERS'),
+            index=env.int('CLUSTER_WORKER_INDEX', None)
+        ) if env.int('CLUSTER_WORKERS', 1) > 1 else None,
+        history=History(
+            directory=env.str('HISTORY_DIR'),
+            flush_interval=env.float('HISTORY_FLUSH_INTERVAL', 5.0),
+            compact_interval=env.float('HISTORY_COMPACT_INTERVAL', 3600)
+        ) if env.str('HISTORY_DIR', '') else None
+    )
\ No newline at end of file
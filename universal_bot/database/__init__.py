@@ -1 +1,6 @@
-from .database import *
\ No newline at end of file
+from .database import *
+from .leaderboard import FenwickTree, Leaderboard, Leaderboards
+from .registry import UserRegistry, UserView
+from .sessions import SessionManager, TimerWheel, reset_game
+from .storage import (BaseStorage, MemoryStorage, SQLiteStorage, RedisStorage,
+                      ShardedStorage, UserStore, create_storage)
\ No newline at end of file
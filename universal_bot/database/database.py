@@ -30,4 +30,31 @@ class User:
     is_playing: bool = field(default=False)
     current_game: Games | None = field(default=None)
     number_guessing: NumberGuessingPlayer = field(default_factory=NumberGuessingPlayer)
-    rock_paper_scissors: RockPaperScissorsPlayer = field(default_factory=RockPaperScissorsPlayer)
\ No newline at end of file
+    rock_paper_scissors: RockPaperScissorsPlayer = field(default_factory=RockPaperScissorsPlayer)
+
+def dump_user(user: User) -> dict:
+    """Функция переводит профиль пользователя в словарь для сохранения в хранилище"""
+    return {
+        'is_playing': user.is_playing,
+        'current_game': user.current_game.value if user.current_game else None,
+        'number_guessing': {
+            'secret_number': user.number_guessing.secret_number,
+            'attempts': user.number_guessing.attempts,
+            'total_games': user.number_guessing.total_games,
+            'wins': user.number_guessing.wins
+        },
+        'rock_paper_scissors': {
+            'total_games': user.rock_paper_scissors.total_games,
+            'wins': user.rock_paper_scissors.wins
+        }
+    }
+
+
+def load_user(data: dict) -> User:
+    """Функция восстанавливает профиль пользователя из словаря, полученного из хранилища"""
+    return User(
+        is_playing=data['is_playing'],
+        current_game=Games(data['current_game']) if data['current_game'] else None,
+        number_guessing=NumberGuessingPlayer(**data['number_guessing']),
+        rock_paper_scissors=RockPaperScissorsPlayer(**data['rock_paper_scissors'])
+    )
@@ -0,0 +1,265 @@
+import asyncio
+import heapq
+import json
+import logging
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+from .database import Games, load_user
+from .storage import BaseStorage
+
+
+logger = logging.getLogger(__name__)
+
+# Дерево Фенвика над счетчиками: прибавление к счетчику и сумма первых i
+# счетчиков за O(log n). Размер растет удвоением по мере появления больших
+# индексов. Рядом хранятся сами счетчики, чтобы дерево пересобиралось за O(n)
+class FenwickTree:
+    __slots__ = ('_tree', '_counts')
+
+    def __init__(self, counts: Iterable[int] = ()) -> None:
+        self._counts = array('q', counts)
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def _rebuild(self) -> None:
+        tree = self._tree = array('q', bytes(8))  # Нумерация с единицы
+        tree.extend(self._counts)
+        size = len(self._counts)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+
+    def grow(self, size: int) -> None:
+        """Увеличивает дерево минимум до size счетчиков"""
+        if size <= len(self._counts):
+            return
+        capacity = len(self._counts) or 1
+        while capacity < size:
+            capacity *= 2
+        self._counts.extend(array('q', bytes(8 * (capacity - len(self._counts)))))
+        self._rebuild()
+
+    def insert(self, index: int, count: int = 0) -> None:
+        """Вставляет счетчик перед индексом index, сдвигая следующие, за O(n)"""
+        self._counts.insert(index, count)
+        self._rebuild()
+
+    def add(self, index: int, delta: int) -> None:
+        if index >= len(self._counts):
+            self.grow(index + 1)
+        self._counts[index] += delta
+        tree, size = self._tree, len(self._counts)
+        i = index + 1
+        while i <= size:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index: int) -> int:
+        """Сумма счетчиков с индексами меньше index"""
+        tree, total = self._tree, 0
+        i = min(index, len(self._counts))
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, k: int) -> int:
+        """Наименьший индекс, сумма счетчиков до которого включительно больше k"""
+        tree, size = self._tree, len(self._counts)
+        position = 0
+        step = 1 << size.bit_length()
+        while step:
+            following = position + step
+            if following <= size and tree[following] <= k:
+                position = following
+                k -= tree[following]
+            step >>= 1
+        return position
+
+
+# Таблица лидеров одной игры. Игроки упорядочены по числу побед, а при
+# равенстве по проценту побед: оба числа сводятся в один ключ, и дерево
+# Фенвика хранит, сколько игроков имеют каждый ключ. Счетчиком дерева служит
+# не сам ключ, а его место среди различных ключей, поэтому размер дерева
+# зависит от числа ключей, а не от числа побед лучшего игрока. Место игрока
+# и переход к следующему ключу при выводе топа стоят O(log k) от числа
+# ключей k, обновление игрока тоже, если его ключ уже встречался, без
+# сортировки всех пользователей. Игроки с равным ключом делят одно место
+class Leaderboard:
+    def __init__(self) -> None:
+        self._tree = FenwickTree()
+        self._levels: list[int] = []  # Различные ключи по возрастанию, место ключа — индекс в дереве
+        self._keys: dict[int, int] = {}  # id пользователя -> ключ
+        self._buckets: dict[int, set[int]] = {}  # ключ -> id пользователей
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._keys
+
+    @staticmethod
+    def key(wins: int, games: int) -> int:
+        return wins * 101 + (round(100 * wins / games) if games else 0)
+
+    @staticmethod
+    def unpack(key: int) -> tuple[int, int]:
+        """Переводит ключ обратно в число побед и процент побед"""
+        return divmod(key, 101)
+
+    def _reindex(self, keys: Iterable[int] = ()) -> None:
+        """
+        Пересобирает дерево над ключами, у которых есть игроки, и новыми
+        ключами keys за O(k log k). Ключи без игроков выбрасываются
+        """
+        buckets = self._buckets
+        self._levels = sorted({*buckets, *keys})
+        self._tree = FenwickTree(len(buckets.get(key, ())) for key in self._levels)
+
+    def _position(self, key: int) -> int:
+        """
+        Место ключа в дереве. Новый ключ больше всех прежних, как у игрока,
+        который обходит лидера, занимает следующее место, остальные новые
+        ключи вставляются в дерево за O(k). Ключи без игроков остаются в
+        дереве, пока их не станет больше, чем ключей с игроками
+        """
+        levels = self._levels
+        position = bisect_left(levels, key)
+        if position < len(levels) and levels[position] == key:
+            return position
+        if len(levels) > 2 * len(self._buckets) + 64:
+            self._reindex((key,))
+            return bisect_left(self._levels, key)
+        levels.insert(position, key)
+        if position == len(levels) - 1:
+            self._tree.grow(len(levels))
+        else:
+            self._tree.insert(position)
+        return position
+
+    def _discard(self, user_id: int) -> None:
+        key = self._keys.pop(user_id, None)
+        if key is None:
+            return
+        bucket = self._buckets[key]
+        bucket.discard(user_id)
+        if not bucket:
+            del self._buckets[key]
+        self._tree.add(bisect_left(self._levels, key), -1)
+
+    def update(self, user_id: int, wins: int, games: int) -> None:
+        """Учитывает новые результаты игрока. Игроки без сыгранных игр в таблицу не входят"""
+        key = self.key(wins, games)
+        if games and self._keys.get(user_id) == key:
+            return
+        self._discard(user_id)
+        if not games:
+            return
+        position = self._position(key)
+        self._keys[user_id] = key
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = set()
+        bucket.add(user_id)
+        self._tree.add(position, 1)
+
+    def extend(self, players: Iterable[tuple[int, int, int]]) -> None:
+        """
+        Добавляет пачку игроков (id, побед, игр) с одной пересборкой дерева.
+        Игроки, которые уже есть в таблице, не меняются: их результаты
+        обновлены хэндлерами и свежее прочитанных из хранилища
+        """
+        for user_id, wins, games in players:
+            if not games or user_id in self._keys:
+                continue
+            key = self._keys[user_id] = self.key(wins, games)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = set()
+            bucket.add(user_id)
+        self._reindex()
+
+    def rank(self, user_id: int) -> int | None:
+        """Место игрока: 1 плюс число игроков с лучшим результатом"""
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        return 1 + len(self._keys) - self._tree.prefix(bisect_left(self._levels, key) + 1)
+
+    def top(self, n: int) -> list[tuple[int, int, int, int]]:
+        """Лучшие n игроков: кортежи (место, id, побед, процент побед)"""
+        result: list[tuple[int, int, int, int]] = []
+        better = 0
+        while len(result) < n and better < len(self._keys):
+            # Ключ, на котором находится игрок с номером better с конца
+            key = self._levels[self._tree.find(len(self._keys) - 1 - better)]
+            bucket = self._buckets[key]
+            wins, win_rate = self.unpack(key)
+            # Из равных игроков берем только недостающих, не сортируя всех
+            for user_id in heapq.nsmallest(n - len(result), bucket):
+                result.append((better + 1, user_id, wins, win_rate))
+            better += len(bucket)
+        return result
+
+
+# Таблицы лидеров всех игр. При запуске заполняются из хранилища в фоне,
+# пока бот уже принимает апдейты, а хэндлеры ходов обновляют их после
+# каждой сыгранной игры
+class Leaderboards:
+    def __init__(self) -> None:
+        self._boards = {game: Leaderboard() for game in Games}
+        self._loader: asyncio.Task | None = None
+
+    def __getitem__(self, game: Games) -> Leaderboard:
+        return self._boards[game]
+
+    def update(self, user_id: int, game: Games, profile) -> None:
+        """Учитывает профиль игрока в игре: объект с полями wins и total_games"""
+        self._boards[game].update(user_id, profile.wins, profile.total_games)
+
+    async def load(self, storage: BaseStorage,
+                   owns: Callable[[int], bool] | None = None) -> int:
+        """
+        Заполняет таблицы профилями из хранилища. owns отбирает пользователей,
+        которых учитывает этот процесс. Возвращает число прочитанных профилей
+        """
+        # Дерево собираем один раз после чтения всех профилей
+        players: dict[Games, list[tuple[int, int, int]]] = {game: [] for game in Games}
+        loaded = 0
+        async for records in storage.scan():
+            for user_id, data in records.items():
+                if owns is not None and not owns(user_id):
+                    continue
+                user = load_user(json.loads(data))
+                for game, board in players.items():
+                    profile = getattr(user, game.value)
+                    board.append((user_id, profile.wins, profile.total_games))
+                loaded += 1
+        for game, board in players.items():
+            self._boards[game].extend(board)
+        return loaded
+
+    async def _load_logged(self, storage: BaseStorage, owns: Callable[[int], bool] | None) -> None:
+        try:
+            logger.info('Таблицы лидеров построены, профилей: %d', await self.load(storage, owns))
+        except Exception:
+            logger.exception('Не удалось построить таблицы лидеров')
+
+    def start(self, storage: BaseStorage, owns: Callable[[int], bool] | None = None) -> None:
+        """Запускает заполнение таблиц из хранилища фоновой задачей"""
+        if self._loader is None:
+            self._loader = asyncio.create_task(self._load_logged(storage, owns))
+
+    async def close(self) -> None:
+        if self._loader is not None:
+            self._loader.cancel()
+            try:
+                await self._loader
+            except asyncio.CancelledError:
+                pass
+            self._loader = None
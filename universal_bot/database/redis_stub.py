@@ -0,0 +1,69 @@
+import asyncio
+
+
+# Локальная замена Redis-сервера для запуска без внешней инфраструктуры.
+# Поддерживает подмножество команд, которым пользуется RedisStorage
+class RedisStub:
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    @staticmethod
+    def _bulk(value: str | None) -> bytes:
+        if value is None:
+            return b'$-1\r\n'
+        value = value.encode()
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def _execute(self, command: list[str]) -> bytes:
+        name, args = command[0].upper(), command[1:]
+        match name:
+            case 'PING':
+                return b'+PONG\r\n'
+            case 'GET':
+                return self._bulk(self.data.get(args[0]))
+            case 'SET':
+                self.data[args[0]] = args[1]
+                return b'+OK\r\n'
+            case 'MGET':
+                return b'*%d\r\n' % len(args) + b''.join(self._bulk(self.data.get(k)) for k in args)
+            case 'MSET':
+                self.data.update(zip(args[::2], args[1::2]))
+                return b'+OK\r\n'
+            case 'SCAN':
+                # Курсор — смещение в отсортированном списке подходящих ключей
+                start = int(args[0])
+                options = dict(zip(map(str.upper, args[1::2]), args[2::2]))
+                prefix = options.get('MATCH', '*').rstrip('*')
+                count = int(options.get('COUNT', 10))
+                keys = sorted(key for key in self.data if key.startswith(prefix))
+                page = keys[start:start + count]
+                cursor = start + count if start + count < len(keys) else 0
+                return (b'*2\r\n' + self._bulk(str(cursor))
+                        + b'*%d\r\n' % len(page) + b''.join(map(self._bulk, page)))
+            case 'DEL':
+                return b':%d\r\n' % sum(self.data.pop(k, None) is not None for k in args)
+            case _:
+                return b'-ERR unknown command\r\n'
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                command = []
+                for _ in range(int(line[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    command.append((await reader.readexactly(length + 2))[:-2].decode())
+                writer.write(self._execute(command))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = 'localhost', port: int = 6379) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
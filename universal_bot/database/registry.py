@@ -0,0 +1,289 @@
+from array import array
+from collections.abc import Iterator, MutableMapping
+
+from .database import Games, User
+
+
+# Порядок кодирования текущей игры в колонке current_game (0 — нет игры)
+_GAMES: tuple[Games | None, ...] = (None, *Games)
+_GAME_CODES: dict[Games | None, int] = {game: code for code, game in enumerate(_GAMES)}
+
+# id свободной строки. id пользователей Telegram всегда положительные
+_EMPTY = 0
+
+# Более широкие типы элементов для колонок, в которые перестало помещаться значение
+_WIDER = {'b': 'h', 'h': 'i', 'i': 'q', 'B': 'H', 'H': 'I', 'I': 'Q'}
+
+
+def _home(user_id: int, mask: int) -> int:
+    """Функция возвращает начальную ячейку индекса для id (биты id перемешиваются)"""
+    return ((user_id * 0x9E3779B97F4A7C15) >> 32) & mask
+
+
+# Представление профиля в игре Числовая угадайка поверх колонок реестра
+class NumberGuessingView:
+    __slots__ = ('_registry', '_row')
+
+    def __init__(self, registry: 'UserRegistry', row: int) -> None:
+        self._registry = registry
+        self._row = row
+
+    @property
+    def secret_number(self) -> int | None:
+        return self._registry._secret_number[self._row] or None
+
+    @secret_number.setter
+    def secret_number(self, value: int | None) -> None:
+        self._registry._set('_secret_number', self._row, value or 0)
+
+    @property
+    def attempts(self) -> int:
+        return self._registry._attempts[self._row]
+
+    @attempts.setter
+    def attempts(self, value: int) -> None:
+        self._registry._set('_attempts', self._row, value)
+
+    @property
+    def total_games(self) -> int:
+        return self._registry._ng_total_games[self._row]
+
+    @total_games.setter
+    def total_games(self, value: int) -> None:
+        self._registry._set('_ng_total_games', self._row, value)
+
+    @property
+    def wins(self) -> int:
+        return self._registry._ng_wins[self._row]
+
+    @wins.setter
+    def wins(self, value: int) -> None:
+        self._registry._set('_ng_wins', self._row, value)
+
+
+# Представление профиля в игре камень, ножницы, бумага поверх колонок реестра
+class RockPaperScissorsView:
+    __slots__ = ('_registry', '_row')
+
+    def __init__(self, registry: 'UserRegistry', row: int) -> None:
+        self._registry = registry
+        self._row = row
+
+    @property
+    def total_games(self) -> int:
+        return self._registry._rps_total_games[self._row]
+
+    @total_games.setter
+    def total_games(self, value: int) -> None:
+        self._registry._set('_rps_total_games', self._row, value)
+
+    @property
+    def wins(self) -> int:
+        return self._registry._rps_wins[self._row]
+
+    @wins.setter
+    def wins(self, value: int) -> None:
+        self._registry._set('_rps_wins', self._row, value)
+
+
+# Представление профиля пользователя с тем же набором атрибутов, что и у User
+class UserView:
+    __slots__ = ('_registry', '_row')
+
+    def __init__(self, registry: 'UserRegistry', row: int) -> None:
+        self._registry = registry
+        self._row = row
+
+    @property
+    def is_playing(self) -> bool:
+        return bool(self._registry._is_playing[self._row])
+
+    @is_playing.setter
+    def is_playing(self, value: bool) -> None:
+        self._registry._is_playing[self._row] = bool(value)
+
+    @property
+    def current_game(self) -> Games | None:
+        return _GAMES[self._registry._current_game[self._row]]
+
+    @current_game.setter
+    def current_game(self, value: Games | None) -> None:
+        self._registry._current_game[self._row] = _GAME_CODES[value]
+
+    @property
+    def number_guessing(self) -> NumberGuessingView:
+        return NumberGuessingView(self._registry, self._row)
+
+    @property
+    def rock_paper_scissors(self) -> RockPaperScissorsView:
+        return RockPaperScissorsView(self._registry, self._row)
+
+    def __repr__(self) -> str:
+        return f'UserView(id={self._registry._ids[self._row]})'
+
+
+# Колоночный реестр профилей пользователей. Вместо трех объектов на каждого
+# пользователя хранит по одной строке в типизированных массивах и индекс
+# id -> номер строки в виде хэш-таблицы с открытой адресацией (тоже на
+# массиве). Счетчики хранятся в самых узких типах и расширяются только когда
+# значение в них перестает помещаться. Строка создается методом get_or_create
+# или записью профиля, а освободившиеся строки переиспользуются, так что номера
+# строк остальных пользователей (и выданные на них представления) не меняются
+class UserRegistry(MutableMapping[int, UserView]):
+    def __init__(self, capacity: int = 1024) -> None:
+        # Индекс хранит номер строки + 1 (0 — пустая ячейка). Размер индекса —
+        # степень двойки, заполненность не выше 2/3
+        size = 8
+        while size * 2 < capacity * 3:
+            size *= 2
+        self._mask = size - 1
+        self._index = array('i', bytes(4 * size))
+        self._len = 0
+
+        # Колонки профилей
+        self._ids = array('q')  # id владельца строки (_EMPTY — строка свободна)
+        self._is_playing = bytearray()
+        self._current_game = bytearray()
+        self._secret_number = array('B')  # 0 — число не загадано
+        self._attempts = array('b')
+        self._ng_total_games = array('H')
+        self._ng_wins = array('H')
+        self._rps_total_games = array('H')
+        self._rps_wins = array('H')
+        self._free_rows: list[int] = []
+
+    def _columns(self) -> tuple:
+        return (
+            self._ids, self._is_playing, self._current_game, self._secret_number,
+            self._attempts, self._ng_total_games, self._ng_wins,
+            self._rps_total_games, self._rps_wins
+        )
+
+    def _set(self, column: str, row: int, value: int) -> None:
+        """Записывает значение в колонку, при переполнении расширяя тип ее элементов"""
+        values = getattr(self, column)
+        try:
+            values[row] = value
+        except OverflowError:
+            while True:
+                values = array(_WIDER[values.typecode], values)
+                try:
+                    values[row] = value
+                    break
+                except OverflowError:
+                    continue
+            setattr(self, column, values)
+
+    def _slot(self, user_id: int) -> int:
+        """Возвращает ячейку индекса с данным id или первую пустую ячейку на его пути"""
+        mask = self._mask
+        index = self._index
+        ids = self._ids
+        slot = _home(user_id, mask)
+        while True:
+            row = index[slot]
+            if not row or ids[row - 1] == user_id:
+                return slot
+            slot = (slot + 1) & mask
+
+    def _resize(self) -> None:
+        rows = [row for row in self._index if row]
+        self._mask = self._mask * 2 + 1
+        self._index = array('i', bytes(4 * (self._mask + 1)))
+        for row in rows:
+            self._index[self._slot(self._ids[row - 1])] = row
+
+    def _new_row(self, user_id: int) -> int:
+        if self._free_rows:
+            row = self._free_rows.pop()
+            for column in self._columns():
+                column[row] = 0
+            self._ids[row] = user_id
+            return row
+
+        for column in self._columns():
+            column.append(0)
+        self._ids[-1] = user_id
+        return len(self._ids) - 1
+
+    def row_of(self, user_id: int, create: bool = True) -> int | None:
+        """Возвращает номер строки пользователя, при необходимости создавая ее"""
+        slot = self._slot(user_id)
+        row = self._index[slot]
+        if row:
+            return row - 1
+        if not create:
+            return None
+
+        if (self._len + 1) * 3 > (self._mask + 1) * 2:
+            self._resize()
+            slot = self._slot(user_id)
+        row = self._new_row(user_id)
+        self._index[slot] = row + 1
+        self._len += 1
+        return row
+
+    def __getitem__(self, user_id: int) -> UserView:
+        row = self.row_of(user_id, create=False)
+        if row is None:
+            raise KeyError(user_id)
+        return UserView(self, row)
+
+    def get_or_create(self, user_id: int) -> UserView:
+        """Возвращает профиль пользователя, создавая пустую строку для нового"""
+        return UserView(self, self.row_of(user_id))
+
+    def get(self, user_id: int, default=None):
+        row = self.row_of(user_id, create=False)
+        return default if row is None else UserView(self, row)
+
+    def __setitem__(self, user_id: int, user: User | UserView) -> None:
+        view = self.get_or_create(user_id)
+        view.is_playing = user.is_playing
+        view.current_game = user.current_game
+        view.number_guessing.secret_number = user.number_guessing.secret_number
+        view.number_guessing.attempts = user.number_guessing.attempts
+        view.number_guessing.total_games = user.number_guessing.total_games
+        view.number_guessing.wins = user.number_guessing.wins
+        view.rock_paper_scissors.total_games = user.rock_paper_scissors.total_games
+        view.rock_paper_scissors.wins = user.rock_paper_scissors.wins
+
+    def __delitem__(self, user_id: int) -> None:
+        slot = self._slot(user_id)
+        row = self._index[slot]
+        if not row:
+            raise KeyError(user_id)
+
+        self._ids[row - 1] = _EMPTY
+        self._free_rows.append(row - 1)
+        self._len -= 1
+
+        # Удаление со сдвигом: подтягиваем следующие ячейки цепочки на место
+        # освободившейся, чтобы поиск не обрывался на "дыре"
+        mask = self._mask
+        index = self._index
+        hole = slot
+        slot = (slot + 1) & mask
+        while row := index[slot]:
+            home = _home(self._ids[row - 1], mask)
+            if (slot - home) & mask >= (slot - hole) & mask:
+                index[hole] = row
+                hole = slot
+            slot = (slot + 1) & mask
+        index[hole] = 0
+
+    def __contains__(self, user_id: object) -> bool:
+        return isinstance(user_id, int) and self._index[self._slot(user_id)] != 0
+
+    def __iter__(self) -> Iterator[int]:
+        return (user_id for user_id in self._ids if user_id != _EMPTY)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def memory_usage(self) -> int:
+        """Возвращает объем памяти (в байтах), занятый индексом и колонками"""
+        return sum(
+            len(column) * getattr(column, 'itemsize', 1)
+            for column in (self._index, *self._columns())
+        )
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import math
+import time
+from collections.abc import Callable, Hashable, Iterator
+
+from .database import User
+from .storage import UserStore
+
+
+logger = logging.getLogger(__name__)
+
+
+# Хэшированное колесо таймеров: срок ключа округляется вверх до тика длиной
+# resolution секунд, и ключ кладется в корзину этого тика. Постановка таймера
+# стоит O(1), а продвижение колеса перебирает только наступившие корзины,
+# не просматривая все ключи
+class TimerWheel:
+    def __init__(self, resolution: float = 1.0) -> None:
+        self.resolution = resolution
+        self._slots: dict[int, list[Hashable]] = {}
+        self._current: int | None = None
+
+    def __len__(self) -> int:
+        return sum(map(len, self._slots.values()))
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        tick = math.ceil(deadline / self.resolution)
+        if self._current is not None and tick <= self._current:
+            tick = self._current + 1
+        self._slots.setdefault(tick, []).append(key)
+
+    def advance(self, now: float) -> Iterator[Hashable]:
+        """Выдает ключи, срок которых наступил к моменту now"""
+        tick = math.floor(now / self.resolution)
+        if self._current is None:
+            self._current = min(self._slots, default=tick) - 1
+        # После долгого простоя пустые тики не перебираем по одному
+        if tick - self._current > len(self._slots):
+            due = sorted(t for t in self._slots if t <= tick)
+        else:
+            due = range(self._current + 1, tick + 1)
+        self._current = max(self._current, tick)
+        for t in due:
+            yield from self._slots.pop(t, ())
+
+
+def reset_game(user: User) -> None:
+    """Функция завершает брошенную игру пользователя без начисления результата"""
+    user.is_playing = False
+    user.current_game = None
+    user.number_guessing.secret_number = None
+    user.number_guessing.attempts = 0
+
+
+# Менеджер сессий: помнит время последнего апдейта каждого пользователя из
+# кэша и по колесу таймеров (без обхода всех пользователей) завершает игры,
+# брошенные дольше game_ttl секунд, а профили пользователей, молчащих дольше
+# idle_ttl секунд, записывает в хранилище и выгружает из памяти. Профиль
+# пользователя, чей апдейт сейчас обрабатывается, не трогается
+class SessionManager:
+    def __init__(
+            self, store: UserStore, *, game_ttl: float = 900, idle_ttl: float = 3600,
+            resolution: float = 1.0, expire_game: Callable[[User], None] = reset_game
+    ) -> None:
+        if game_ttl > idle_ttl:
+            raise ValueError('game_ttl must not exceed idle_ttl')
+        self.store = store
+        self.game_ttl = game_ttl
+        self.idle_ttl = idle_ttl
+        self.expire_game = expire_game
+        self.expired_games = 0
+        self.offloaded = 0
+        self._wheel = TimerWheel(resolution)
+        # Время последней активности. Каждый пользователь отсюда стоит в
+        # колесе ровно один раз
+        self._last_seen: dict[int, float] = {}
+        self._active: dict[int, int] = {}
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._last_seen)
+
+    def touch(self, user_id: int, now: float | None = None) -> None:
+        """Отмечает активность пользователя"""
+        now = time.monotonic() if now is None else now
+        if user_id not in self._last_seen:
+            self._wheel.schedule(user_id, now + self.game_ttl)
+        self._last_seen[user_id] = now
+
+    def acquire(self, user_id: int) -> None:
+        """Отмечает начало обработки апдейта пользователя"""
+        self._active[user_id] = self._active.get(user_id, 0) + 1
+        self.touch(user_id)
+
+    def release(self, user_id: int) -> None:
+        """Отмечает конец обработки апдейта пользователя"""
+        refs = self._active[user_id] - 1
+        if refs:
+            self._active[user_id] = refs
+        else:
+            del self._active[user_id]
+        self.touch(user_id)
+
+    async def expire(self, now: float | None = None) -> None:
+        """Завершает брошенные игры и выгружает простаивающих пользователей"""
+        now = time.monotonic() if now is None else now
+        cold = []
+        for user_id in self._wheel.advance(now):
+            last_seen = self._last_seen[user_id]
+            idle = now - last_seen
+            if user_id in self._active or idle < self.game_ttl:
+                # Пользователь был активен после постановки таймера
+                self._wheel.schedule(user_id, max(now, last_seen) + self.game_ttl)
+                continue
+
+            if user_id not in self.store:
+                # Профиля в кэше нет (например, пользователь только читал
+                # /help): завершать и выгружать нечего, поэтому перестаем
+                # следить за пользователем до его следующего апдейта
+                del self._last_seen[user_id]
+                continue
+
+            user = self.store[user_id]
+            if user.is_playing or user.current_game:
+                self.expire_game(user)
+                self.store.mark_dirty(user_id)
+                self.expired_games += 1
+
+            if idle >= self.idle_ttl:
+                cold.append(user_id)
+            else:
+                self._wheel.schedule(user_id, last_seen + self.idle_ttl)
+
+        if not cold:
+            return
+        seen = {user_id: self._last_seen[user_id] for user_id in cold}
+        try:
+            # Пользователь, приславший апдейт во время записи, остается в памяти
+            offloaded = await self.store.offload(
+                cold, keep=lambda user_id: user_id in self._active
+                or self._last_seen[user_id] != seen[user_id]
+            )
+        except Exception:
+            # Запись не удалась: попробуем выгрузить этих пользователей позже
+            for user_id in cold:
+                self._wheel.schedule(user_id, now + self.game_ttl)
+            raise
+
+        for user_id in offloaded:
+            del self._last_seen[user_id]
+        for user_id in set(cold).difference(offloaded):
+            self._wheel.schedule(user_id, max(now, self._last_seen[user_id]) + self.game_ttl)
+        self.offloaded += len(offloaded)
+
+    async def _expire_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._wheel.resolution)
+            try:
+                await self.expire()
+            except Exception:
+                logger.exception('Не удалось выгрузить простаивающих пользователей')
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._expire_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
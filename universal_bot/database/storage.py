@@ -0,0 +1,411 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from abc import ABC, abstractmethod
+from collections.abc import (AsyncIterator, Callable, Iterable, Iterator, Mapping,
+                             MutableMapping, Sequence)
+from concurrent.futures import ThreadPoolExecutor
+
+from .database import User, dump_user, load_user
+
+
+logger = logging.getLogger(__name__)
+
+
+# Базовый интерфейс хранилища. Хранилище оперирует уже сериализованными
+# профилями (JSON-строками), чтобы бэкенды не зависели от устройства User.
+class BaseStorage(ABC):
+    @abstractmethod
+    async def get_many(self, user_ids: Iterable[int]) -> dict[int, str]:
+        """Возвращает сохраненные профили для переданных id (отсутствующие пропускаются)"""
+
+    @abstractmethod
+    async def set_many(self, records: Mapping[int, str]) -> None:
+        """Сохраняет пачку профилей одной операцией"""
+
+    @abstractmethod
+    async def delete_many(self, user_ids: Iterable[int]) -> None:
+        """Удаляет профили пользователей"""
+
+    @abstractmethod
+    def scan(self, batch: int = 1000) -> AsyncIterator[dict[int, str]]:
+        """Перебирает все сохраненные профили пачками примерно по batch штук"""
+
+    async def get(self, user_id: int) -> str | None:
+        return (await self.get_many((user_id,))).get(user_id)
+
+    async def close(self) -> None:
+        pass
+
+
+# Хранилище в памяти процесса. Данные теряются при перезапуске
+class MemoryStorage(BaseStorage):
+    def __init__(self) -> None:
+        self._data: dict[int, str] = {}
+
+    async def get_many(self, user_ids: Iterable[int]) -> dict[int, str]:
+        return {i: self._data[i] for i in user_ids if i in self._data}
+
+    async def set_many(self, records: Mapping[int, str]) -> None:
+        self._data.update(records)
+
+    async def delete_many(self, user_ids: Iterable[int]) -> None:
+        for user_id in user_ids:
+            self._data.pop(user_id, None)
+
+    async def scan(self, batch: int = 1000) -> AsyncIterator[dict[int, str]]:
+        items = list(self._data.items())
+        for start in range(0, len(items), batch):
+            yield dict(items[start:start + batch])
+
+
+# Хранилище в SQLite в режиме WAL. Все обращения к соединению выполняются
+# в одном отдельном потоке, чтобы не блокировать цикл событий
+class SQLiteStorage(BaseStorage):
+    def __init__(self, path: str) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        # Файл может быть общим для нескольких процессов-воркеров
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, data TEXT NOT NULL)'
+        )
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _get_many(self, user_ids: list[int]) -> dict[int, str]:
+        result: dict[int, str] = {}
+        # SQLite ограничивает число параметров в запросе, поэтому читаем частями
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            rows = self._conn.execute(
+                f'SELECT id, data FROM users WHERE id IN ({",".join("?" * len(chunk))})',
+                chunk
+            )
+            result.update(rows)
+        return result
+
+    def _set_many(self, records: list[tuple[int, str]]) -> None:
+        # Вся пачка записывается в одной транзакции — один коммит на пачку
+        with self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.executemany(
+                'INSERT INTO users (id, data) VALUES (?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET data = excluded.data',
+                records
+            )
+
+    def _delete_many(self, user_ids: list[int]) -> None:
+        with self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.executemany('DELETE FROM users WHERE id = ?', ((i,) for i in user_ids))
+
+    def _scan_after(self, after: int, batch: int) -> dict[int, str]:
+        return dict(self._conn.execute(
+            'SELECT id, data FROM users WHERE id > ? ORDER BY id LIMIT ?', (after, batch)
+        ))
+
+    async def get_many(self, user_ids: Iterable[int]) -> dict[int, str]:
+        return await self._run(self._get_many, list(user_ids))
+
+    async def set_many(self, records: Mapping[int, str]) -> None:
+        if records:
+            await self._run(self._set_many, list(records.items()))
+
+    async def delete_many(self, user_ids: Iterable[int]) -> None:
+        await self._run(self._delete_many, list(user_ids))
+
+    async def scan(self, batch: int = 1000) -> AsyncIterator[dict[int, str]]:
+        # Листаем по первичному ключу, а не смещением, чтобы каждая пачка читалась по индексу
+        after = -2 ** 63
+        while records := await self._run(self._scan_after, after, batch):
+            yield records
+            after = max(records)
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+        self._executor.shutdown()
+
+
+# Хранилище в Redis-совместимом сервере (Redis, KeyDB, локальная заглушка
+# database.redis_stub). Реализует минимальный клиент протокола RESP
+class RedisStorage(BaseStorage):
+    def __init__(self, host: str = 'localhost', port: int = 6379, prefix: str = 'user:') -> None:
+        self._host = host
+        self._port = port
+        self._prefix = prefix
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _encode(*args: str | int) -> bytes:
+        parts = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            value = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(value), value))
+        return b''.join(parts)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        kind, payload = line[:1], line[1:-2]
+        if kind in (b'+', b':'):
+            return payload.decode()
+        if kind == b'-':
+            raise RuntimeError(payload.decode())
+        if kind == b'$':
+            length = int(payload)
+            if length == -1:
+                return None
+            return (await self._reader.readexactly(length + 2))[:-2].decode()
+        if kind == b'*':
+            return [await self._read_reply() for _ in range(int(payload))]
+        raise RuntimeError(f'Unexpected RESP reply: {line!r}')
+
+    async def _command(self, *args: str | int):
+        async with self._lock:
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
+            self._writer.write(self._encode(*args))
+            await self._writer.drain()
+            return await self._read_reply()
+
+    async def get_many(self, user_ids: Iterable[int]) -> dict[int, str]:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        values = await self._command('MGET', *(f'{self._prefix}{i}' for i in user_ids))
+        return {i: v for i, v in zip(user_ids, values) if v is not None}
+
+    async def set_many(self, records: Mapping[int, str]) -> None:
+        if records:
+            args = []
+            for user_id, data in records.items():
+                args += (f'{self._prefix}{user_id}', data)
+            await self._command('MSET', *args)
+
+    async def delete_many(self, user_ids: Iterable[int]) -> None:
+        keys = [f'{self._prefix}{i}' for i in user_ids]
+        if keys:
+            await self._command('DEL', *keys)
+
+    async def scan(self, batch: int = 1000) -> AsyncIterator[dict[int, str]]:
+        cursor = '0'
+        while True:
+            cursor, keys = await self._command(
+                'SCAN', cursor, 'MATCH', f'{self._prefix}*', 'COUNT', batch
+            )
+            # Ключи других шардов с тем же началом префикса ('user:1:...') пропускаем
+            keys = [key for key in keys if key[len(self._prefix):].isdigit()]
+            if keys:
+                values = await self._command('MGET', *keys)
+                yield {
+                    int(key[len(self._prefix):]): value
+                    for key, value in zip(keys, values) if value is not None
+                }
+            if cursor == '0':
+                return
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._writer = None
+
+
+# Хранилище, распределяющее пользователей по нескольким шардам по их id
+class ShardedStorage(BaseStorage):
+    def __init__(self, shards: Sequence[BaseStorage]) -> None:
+        self._shards = list(shards)
+
+    def shard_for(self, user_id: int) -> BaseStorage:
+        return self._shards[user_id % len(self._shards)]
+
+    def _split(self, user_ids: Iterable[int]) -> dict[int, list[int]]:
+        groups: dict[int, list[int]] = {}
+        for user_id in user_ids:
+            groups.setdefault(user_id % len(self._shards), []).append(user_id)
+        return groups
+
+    async def get_many(self, user_ids: Iterable[int]) -> dict[int, str]:
+        groups = self._split(user_ids)
+        result: dict[int, str] = {}
+        for part in await asyncio.gather(
+            *(self._shards[n].get_many(ids) for n, ids in groups.items())
+        ):
+            result.update(part)
+        return result
+
+    async def set_many(self, records: Mapping[int, str]) -> None:
+        groups = self._split(records)
+        await asyncio.gather(
+            *(self._shards[n].set_many({i: records[i] for i in ids}) for n, ids in groups.items())
+        )
+
+    async def delete_many(self, user_ids: Iterable[int]) -> None:
+        groups = self._split(user_ids)
+        await asyncio.gather(*(self._shards[n].delete_many(ids) for n, ids in groups.items()))
+
+    async def scan(self, batch: int = 1000) -> AsyncIterator[dict[int, str]]:
+        for shard in self._shards:
+            async for records in shard.scan(batch):
+                yield records
+
+    async def close(self) -> None:
+        await asyncio.gather(*(shard.close() for shard in self._shards))
+
+
+def create_storage(
+        backend: str = 'memory', *, path: str = 'users.sqlite3', host: str = 'localhost',
+        port: int = 6379, shards: int = 1
+) -> BaseStorage:
+    """Функция создает хранилище по его названию: memory, sqlite или redis"""
+    def create_shard(n: int) -> BaseStorage:
+        match backend:
+            case 'memory':
+                return MemoryStorage()
+            case 'sqlite':
+                return SQLiteStorage(path if shards == 1 else f'{path}.{n}')
+            case 'redis':
+                return RedisStorage(host, port, prefix=f'user:{n}:' if shards > 1 else 'user:')
+            case _:
+                raise ValueError(f'Unknown storage backend: {backend}')
+
+    if shards == 1:
+        return create_shard(0)
+    return ShardedStorage([create_shard(n) for n in range(shards)])
+
+
+# Кэш профилей пользователей поверх хранилища с отложенной записью.
+# Хэндлеры работают с ним как со словарем, а изменения копятся в множестве
+# "грязных" id и сбрасываются в хранилище одной пачкой раз в flush_interval
+# секунд (или раньше, если пачка достигла max_batch). Чтение по id не создает
+# профиль: отсутствующий пользователь дает KeyError, а профиль нового
+# пользователя создается явно методом get_or_create. В качестве кэша можно
+# передать database.UserRegistry, чтобы хранить профили в колонках
+class UserStore(MutableMapping[int, User]):
+    def __init__(
+            self, storage: BaseStorage, *, cache: MutableMapping[int, User] | None = None,
+            flush_interval: float = 0.5, max_batch: int = 1000
+    ) -> None:
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._cache: MutableMapping[int, User] = {} if cache is None else cache
+        self._dirty: set[int] = set()
+        self._full = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+
+    def __getitem__(self, user_id: int) -> User:
+        return self._cache[user_id]
+
+    def get_or_create(self, user_id: int) -> User:
+        """Возвращает профиль пользователя, создавая профиль по умолчанию для нового"""
+        if user_id not in self._cache:
+            self[user_id] = User()
+        return self._cache[user_id]
+
+    def __setitem__(self, user_id: int, user: User) -> None:
+        self._cache[user_id] = user
+        self.mark_dirty(user_id)
+
+    def __delitem__(self, user_id: int) -> None:
+        del self._cache[user_id]
+        self._dirty.discard(user_id)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._cache)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._cache
+
+    def mark_dirty(self, user_id: int) -> None:
+        self._dirty.add(user_id)
+        if len(self._dirty) >= self.max_batch:
+            self._full.set()
+
+    async def load(self, user_id: int) -> User | None:
+        """Подгружает профиль пользователя из хранилища в кэш, если его там еще нет"""
+        if user_id not in self._cache:
+            data = await self.storage.get(user_id)
+            # Пока шло чтение, профиль мог успеть появиться в кэше
+            if data is not None and user_id not in self._cache:
+                self._cache[user_id] = load_user(json.loads(data))
+        return self._cache.get(user_id)
+
+    async def offload(self, user_ids: Iterable[int], *,
+                      keep: Callable[[int], bool] = lambda user_id: False) -> list[int]:
+        """
+        Записывает несохраненные профили пользователей в хранилище и выгружает
+        их из кэша. Профили, измененные во время записи или для которых keep
+        вернул True, остаются в кэше. Возвращает id выгруженных пользователей
+        """
+        user_ids = [user_id for user_id in user_ids if user_id in self._cache]
+        dirty = self._dirty.intersection(user_ids)
+        if dirty:
+            self._dirty -= dirty
+            await self._write(dirty)
+
+        offloaded = []
+        for user_id in user_ids:
+            if user_id in self._cache and user_id not in self._dirty and not keep(user_id):
+                del self._cache[user_id]
+                offloaded.append(user_id)
+        return offloaded
+
+    async def flush(self) -> None:
+        """Сбрасывает все накопленные изменения в хранилище одной пачкой"""
+        self._full.clear()
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        await self._write(dirty)
+
+    async def _write(self, dirty: set[int]) -> None:
+        """
+        Записывает профили пользователей dirty, уже снятых с очереди на запись,
+        в хранилище одной пачкой. При ошибке id возвращаются в очередь
+        """
+        records = {
+            user_id: json.dumps(dump_user(self._cache[user_id]), separators=(',', ':'))
+            for user_id in dirty if user_id in self._cache
+        }
+        try:
+            await self.storage.set_many(records)
+        except Exception:
+            # Не теряем изменения: вернем id в очередь на следующую запись
+            self._dirty |= dirty
+            raise
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('Не удалось записать профили пользователей в хранилище')
+
+    def start(self) -> None:
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        await self.storage.close()
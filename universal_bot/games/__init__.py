@@ -0,0 +1,10 @@
+from .base import Game
+from .registry import GameRegistry
+from .number_guessing import NumberGuessing
+from .rock_paper_scissors import RockPaperScissors
+
+
+# Реестр доступных игр. Порядок регистрации задает порядок кнопок в меню
+GAMES = GameRegistry()
+GAMES.register(RockPaperScissors())
+GAMES.register(NumberGuessing())
\ No newline at end of file
@@ -0,0 +1,121 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from aiogram import Router
+from aiogram.types import CallbackQuery
+
+from database import Games, User
+from lexicon import LEXICON, Catalog
+
+# Ключи строк таблицы лидеров, общие для всех игр
+TOP_LINE = LEXICON.key('top.line')
+TOP_YOU = LEXICON.key('top.you')
+TOP_PLAYER = LEXICON.key('top.player')
+TOP_RANK = LEXICON.key('top.rank')
+TOP_UNRANKED = LEXICON.key('top.unranked')
+TOP_EMPTY = LEXICON.key('top.empty')
+
+if TYPE_CHECKING:
+    from handlers.routing import RouteTable
+    from database import Leaderboards
+    from history import GameHistory
+
+
+# Ключи общих текстов игры в лексиконе
+@dataclass(slots=True, frozen=True)
+class GameKeys:
+    button: int
+    welcome: int
+    impossible_answer: int
+    roles: int
+    stat: int
+    stat_history: int
+    top: int
+
+    @classmethod
+    def for_game(cls, game_id: str) -> 'GameKeys':
+        return cls(
+            button=LEXICON.key(f'{game_id}.button'),
+            welcome=LEXICON.key(f'{game_id}.welcome'),
+            impossible_answer=LEXICON.key(f'{game_id}.impossible_answer'),
+            roles=LEXICON.key(f'{game_id}./roles'),
+            stat=LEXICON.key(f'{game_id}./stat'),
+            stat_history=LEXICON.key(f'{game_id}./stat_history'),
+            top=LEXICON.key(f'{game_id}./top')
+        )
+
+
+# Интерфейс игрового плагина. Состояние игрока хранится в поле User с именем,
+# равным id игры, а игра описывает начало раунда, собственные хэндлеры и
+# подсчет статистики. Общие хэндлеры (выбор игры, правила, статистика,
+# продолжение) работают с любой игрой через этот интерфейс
+class Game(ABC):
+    game: Games
+    # Можно ли прервать игру командой /cancel
+    cancellable: bool = True
+    # Ключи текстов игры, вычисляются при объявлении класса игры
+    keys: GameKeys
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.keys = GameKeys.for_game(cls.game.value)
+
+    @property
+    def id(self) -> str:
+        """Идентификатор игры: ключ лексикона и callback_data кнопки выбора игры"""
+        return self.game.value
+
+    def profile(self, user: User):
+        """Возвращает профиль пользователя в этой игре"""
+        return getattr(user, self.id)
+
+    def stats(self, user: User) -> tuple[int, int, int]:
+        """Возвращает число сыгранных игр, побед и процент побед пользователя"""
+        profile = self.profile(user)
+        win_rate = round(100 * profile.wins / profile.total_games) if profile.total_games else 0
+        return profile.total_games, profile.wins, win_rate
+
+    def stat_text(self, lexicon: Catalog, user: User, user_id: int,
+                  history: 'GameHistory | None' = None) -> str:
+        """
+        Возвращает текст статистики пользователя. Если ведется история
+        раундов, к ней добавляются серии побед, форма и итоги по всем игрокам
+        """
+        if history is None:
+            return lexicon.format(self.keys.stat, *self.stats(user))
+        player = history.player(user_id, self.game)
+        totals = history.totals(self.game)
+        return lexicon.format(
+            self.keys.stat_history, *self.stats(user), player.streak, player.best_streak,
+            round(100 * player.form), totals.games, totals.win_rate
+        )
+
+    def top_text(self, lexicon: Catalog, user_id: int,
+                 leaderboards: 'Leaderboards | None' = None, size: int = 10) -> str:
+        """
+        Возвращает текст таблицы лидеров игры и место пользователя в ней.
+        id других игроков не показываются: сам пользователь отмечен в
+        таблице, остальные подписаны просто игроками
+        """
+        board = leaderboards[self.game] if leaderboards is not None else None
+        if not board:
+            return lexicon[TOP_EMPTY]
+        lines = '\n'.join(
+            lexicon.format(TOP_LINE, place, lexicon[TOP_YOU if player == user_id else TOP_PLAYER],
+                           wins, win_rate)
+            for place, player, wins, win_rate in board.top(size)
+        )
+        rank = board.rank(user_id)
+        return lexicon.format(
+            self.keys.top, lines,
+            lexicon[TOP_UNRANKED] if rank is None else lexicon.format(TOP_RANK, rank, len(board))
+        )
+
+    @abstractmethod
+    async def start(self, callback: CallbackQuery, user: User, lexicon: Catalog) -> None:
+        """Начинает новый раунд игры в ответ на нажатие кнопки"""
+
+    @abstractmethod
+    def register(self, router: Router, messages: 'RouteTable', callbacks: 'RouteTable') -> None:
+        """Регистрирует хэндлеры ходов игры в роутере и таблицах маршрутов"""
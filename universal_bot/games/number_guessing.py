@@ -0,0 +1,107 @@
+from typing import TYPE_CHECKING
+
+from aiogram import Router
+from aiogram.types import CallbackQuery, Message
+
+import services
+import keyboards
+from lexicon import LEXICON, Catalog
+from database import Games, Leaderboards, User, UserStore
+from .base import Game
+
+if TYPE_CHECKING:
+    from handlers.routing import RouteTable
+    from history import GameHistory
+
+
+# Допустимые ответы в игре Числовая угадайка
+GUESSES = tuple(str(number) for number in range(1, 101))
+
+WIN = LEXICON.key('number_guessing.win')
+LOSE = LEXICON.key('number_guessing.lose')
+NEXT_TRY = LEXICON.key('number_guessing.next_try')
+LESS_OR_MORE = (LEXICON.key('number_guessing.less'), LEXICON.key('number_guessing.more'))
+IS_NOT_PLAYING_YET = LEXICON.key('is_not_playing_yet')
+# Ответ на число во время другой игры
+IMPOSSIBLE_ANSWER = {game: LEXICON.key(f'{game.value}.impossible_answer') for game in Games}
+
+
+def is_guess(message: Message) -> bool:
+    """Фильтр сообщений, полностью состоящих из числа от 1 до 100 (например, '007')"""
+    return bool(message.text and message.text.isdigit() and 1 <= int(message.text) <= 100)
+
+
+# Обрабатываем сообщения полностью состоящие из чисел
+async def process_number_guessing_answer(message: Message, UsersStorage: UserStore,
+                                         lexicon: Catalog, history: 'GameHistory | None' = None,
+                                         leaderboards: Leaderboards | None = None):
+    user = UsersStorage.get_or_create(message.from_user.id)
+
+    if user.current_game == Games.NumberGuessing:
+        # Логика обработки ответа, если текущая игра пользователя Числовая угадайка
+        curr_num = int(message.text)
+
+        if curr_num == user.number_guessing.secret_number:
+            user.is_playing = False
+            user.number_guessing.wins += 1
+            user.number_guessing.total_games += 1
+            if history is not None:
+                history.record(message.from_user.id, Games.NumberGuessing, curr_num, curr_num, 'win')
+            if leaderboards is not None:
+                leaderboards.update(message.from_user.id, Games.NumberGuessing, user.number_guessing)
+
+            await message.answer(
+                text=lexicon[WIN],
+                reply_markup=keyboards.yes_no_kb(lexicon)
+            )
+        else:
+            user.number_guessing.attempts -= 1
+
+            if not user.number_guessing.attempts:
+                user.is_playing = False
+                user.number_guessing.total_games += 1
+                if history is not None:
+                    history.record(
+                        message.from_user.id, Games.NumberGuessing,
+                        curr_num, user.number_guessing.secret_number, 'lose'
+                    )
+                if leaderboards is not None:
+                    leaderboards.update(message.from_user.id, Games.NumberGuessing, user.number_guessing)
+
+                await message.answer(
+                    text=lexicon.format(LOSE, user.number_guessing.secret_number),
+                    reply_markup=keyboards.yes_no_kb(lexicon)
+                )
+            else:
+                more_or_less = lexicon[LESS_OR_MORE[curr_num < user.number_guessing.secret_number]]
+
+                await message.answer(
+                    text=lexicon.format(NEXT_TRY, more_or_less, user.number_guessing.attempts)
+                )
+    elif not user.is_playing:
+        # Отправляем ответ если пользователь еще не играет
+        await message.answer(
+            text=lexicon[IS_NOT_PLAYING_YET]
+        )
+    else:
+        # Отправляем сообщение о невозможном ответе для конкретной игры, если пользователь играет в другую игру
+        await message.answer(
+            text=lexicon[IMPOSSIBLE_ANSWER[user.current_game]]
+        )
+
+
+# Игра Числовая угадайка
+class NumberGuessing(Game):
+    game = Games.NumberGuessing
+
+    async def start(self, callback: CallbackQuery, user: User, lexicon: Catalog) -> None:
+        user.number_guessing.attempts = 7
+        user.number_guessing.secret_number = services.get_random_number(1, 100)
+
+        await services.replace_message(callback, text=lexicon[self.keys.welcome])
+
+    def register(self, router: Router, messages: 'RouteTable', callbacks: 'RouteTable') -> None:
+        # Обычные ответы находятся таблицей маршрутов, а фильтр ловит
+        # нестандартную запись чисел
+        messages.route(*GUESSES)(process_number_guessing_answer)
+        router.message(is_guess)(process_number_guessing_answer)
@@ -0,0 +1,65 @@
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from aiogram import Router
+from aiogram.types import InlineKeyboardMarkup
+
+from database import Games
+from keyboards import build_games_kb, cached_kb
+from lexicon import Catalog
+from .base import Game
+
+if TYPE_CHECKING:
+    from handlers.routing import RouteTable
+
+
+# Реестр игр. Игра находится по Games или по строковому id одним поиском в
+# словаре. При запуске реестр один раз регистрирует хэндлеры всех игр, а
+# клавиатуры выбора игры, правил и статистики собирает один раз на локаль
+class GameRegistry:
+    def __init__(self) -> None:
+        self._games: dict[Games | str, Game] = {}
+
+    def register(self, game: Game) -> Game:
+        if game.game in self._games:
+            raise ValueError(f'Game {game.id!r} is already registered')
+        self._games[game.game] = self._games[game.id] = game
+        return game
+
+    def __getitem__(self, key: Games | str) -> Game:
+        return self._games[key]
+
+    def get(self, key: Games | str | None) -> Game | None:
+        return self._games.get(key)
+
+    def __iter__(self) -> Iterator[Game]:
+        return (game for key, game in self._games.items() if isinstance(key, Games))
+
+    def ids(self, suffix: str = '') -> tuple[str, ...]:
+        """Возвращает callback_data кнопок всех игр с заданным суффиксом"""
+        return tuple(f'{game.id}{suffix}' for game in self)
+
+    def setup(self, router: Router, messages: 'RouteTable', callbacks: 'RouteTable') -> None:
+        for game in self:
+            game.register(router, messages, callbacks)
+
+    def _kb(self, lexicon: Catalog, suffix: str) -> InlineKeyboardMarkup:
+        return cached_kb(lexicon, f'games_kb{suffix}', lambda: build_games_kb(
+            [(lexicon[game.keys.button], game.id) for game in self], suffix=suffix
+        ))
+
+    def games_kb(self, lexicon: Catalog) -> InlineKeyboardMarkup:
+        """Клавиатура выбора игры"""
+        return self._kb(lexicon, '')
+
+    def roles_kb(self, lexicon: Catalog) -> InlineKeyboardMarkup:
+        """Клавиатура выбора игры для просмотра правил"""
+        return self._kb(lexicon, '_roles')
+
+    def stat_kb(self, lexicon: Catalog) -> InlineKeyboardMarkup:
+        """Клавиатура выбора игры для просмотра статистики"""
+        return self._kb(lexicon, '_stat')
+
+    def top_kb(self, lexicon: Catalog) -> InlineKeyboardMarkup:
+        """Клавиатура выбора игры для просмотра таблицы лидеров"""
+        return self._kb(lexicon, '_top')
@@ -0,0 +1,68 @@
+from typing import TYPE_CHECKING
+
+from aiogram import Router
+from aiogram.types import CallbackQuery
+
+import services
+import keyboards
+from lexicon import LEXICON, Catalog
+from database import Games, Leaderboards, User, UserStore
+from .base import Game
+
+if TYPE_CHECKING:
+    from handlers.routing import RouteTable
+    from history import GameHistory
+
+
+# Коды предметов в журнале раундов
+ITEM_CODES = {item: code for code, item in enumerate(services.ROCK_PAPER_SCISSORS_ITEMS)}
+
+# Ключи шаблонов исхода игры: 'win', 'lose' или 'draw' -> ключ лексикона
+RESULTS = {result: LEXICON.key(f'rock_paper_scissors.{result}') for result in ('win', 'lose', 'draw')}
+
+
+# Обрабатываем нажатие на одну из кнопок 'Камень🗿', 'Бумага📃', 'Ножницы✂️'
+async def process_rock_paper_scissors_answer(callback: CallbackQuery, UsersStorage: UserStore,
+                                             lexicon: Catalog, history: 'GameHistory | None' = None,
+                                             leaderboards: Leaderboards | None = None):
+    user = UsersStorage.get_or_create(callback.from_user.id)
+
+    bot_item = services.get_random_item() # Генерируем случайный ответ
+    result = services.get_winner(callback.data, bot_item) # Определяем победителя
+
+    if history is not None:
+        history.record(
+            callback.from_user.id, Games.RockPaperScissors,
+            ITEM_CODES[callback.data], ITEM_CODES[bot_item], result
+        )
+
+    bot_item = lexicon[keyboards.ROCK_PAPER_SCISSORS_BUTTONS[bot_item]]
+
+    if result == 'win':
+        user.rock_paper_scissors.wins += 1
+    user.rock_paper_scissors.total_games += 1
+    if leaderboards is not None:
+        leaderboards.update(callback.from_user.id, Games.RockPaperScissors, user.rock_paper_scissors)
+
+    await services.replace_message(
+        callback,
+        text=lexicon.format(RESULTS[result], bot_item),
+        reply_markup=keyboards.yes_no_kb(lexicon)
+    )
+
+
+# Игра камень, ножницы, бумага
+class RockPaperScissors(Game):
+    game = Games.RockPaperScissors
+    # Раунд длится одно нажатие, прерывать его командой /cancel нельзя
+    cancellable = False
+
+    async def start(self, callback: CallbackQuery, user: User, lexicon: Catalog) -> None:
+        await services.replace_message(
+            callback,
+            text=lexicon[self.keys.welcome],
+            reply_markup=keyboards.rock_paper_scissors_kb(lexicon)
+        )
+
+    def register(self, router: Router, messages: 'RouteTable', callbacks: 'RouteTable') -> None:
+        callbacks.route(*keyboards.ROCK_PAPER_SCISSORS_BUTTONS)(process_rock_paper_scissors_answer)
@@ -1,297 +1,272 @@
-from aiogram import Router, F
+from typing import TYPE_CHECKING
+
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, CommandStart
 
 import services
+from games import GAMES, Game
 import keyboards
-from lexicon import LEXICON_RU
-from database import User, Games
+from lexicon import LEXICON, Catalog
+from database import Leaderboards, User, UserStore
+from .routing import RouteTable, callback_data, message_text
+
+if TYPE_CHECKING:
+    from history import GameHistory
 
 
 router = Router()
 
+# Ключи текстов лексикона, вычисляются один раз при импорте
+START = LEXICON.key('/start')
+HELP = LEXICON.key('/help')
+PLAY = LEXICON.key('/play')
+ROLES = LEXICON.key('/roles')
+CANCEL = LEXICON.key('/cancel')
+STAT = LEXICON.key('/stat')
+TOP = LEXICON.key('/top')
+IS_NOT_PLAYING_YET = LEXICON.key('is_not_playing_yet')
+DISAGREEMENT = LEXICON.key('disagreement')
+MISUNDERSTANDING = LEXICON.key('misunderstanding')
+
+# Таблицы маршрутов по точному тексту сообщения и по callback_data. Их хэндлеры
+# регистрируются первыми, поэтому типичные апдейты находят свой хэндлер одним
+# поиском в словаре, а фильтры ниже проверяются только для нестандартных
+# сообщений (например, '/start@bot' или '007')
+messages = RouteTable(message_text)
+callbacks = RouteTable(callback_data)
+router.message.register(messages.dispatch, messages)
+router.callback_query.register(callbacks.dispatch, callbacks)
+
 
 # Обработчик команды \start
 @router.message(CommandStart())
-async def process_start_command(message: Message, UsersStorage: dict[int, User]):
-    if message.from_user.id not in UsersStorage:
-        UsersStorage[message.from_user.id] = User()
+@messages.route('/start')
+async def process_start_command(message: Message, UsersStorage: UserStore,
+                                lexicon: Catalog):
+    UsersStorage.get_or_create(message.from_user.id)
 
     await message.answer(
-        text=LEXICON_RU['/start']
+        text=lexicon[START]
     )
 
 
 # Обработчик команды \help
 @router.message(Command(commands='help'))
-async def process_help_command(message: Message, UsersStorage: dict[int, User]):
+@messages.route('/help')
+async def process_help_command(message: Message, UsersStorage: UserStore,
+                               lexicon: Catalog):
     await message.answer(
-        text=LEXICON_RU['/help']
+        text=lexicon[HELP]
     )
 
 
 # Обработчик команды \play
 @router.message(Command(commands='play'))
-async def process_play_command(message: Message | CallbackQuery, UsersStorage: dict[int, User]):
-    user = UsersStorage[message.from_user.id]
+@messages.route('/play')
+async def process_play_command(message: Message | CallbackQuery, UsersStorage: UserStore,
+                               lexicon: Catalog):
+    user = UsersStorage.get_or_create(message.from_user.id)
 
     if isinstance(message, CallbackQuery):
         await message.message.delete()
         message = message.message
 
+    # Пользователь начинает играть только после выбора игры (см. start_game),
+    # поэтому пока игра не выбрана, повторный /play снова присылает клавиатуру
     if user.is_playing:
         await message.answer(
-            text=LEXICON_RU[user.current_game.value]['impossible_answer']
+            text=lexicon[GAMES[user.current_game].keys.impossible_answer]
         )
     else:
-        user.is_playing = True
-
         await message.answer(
-            text=LEXICON_RU['/play'],
-            reply_markup=keyboards.games_kb
+            text=lexicon[PLAY],
+            reply_markup=GAMES.games_kb(lexicon)
         )
 
 
 # Обработчик команды \roles
 @router.message(Command(commands='roles'))
-async def process_roles_command(message: Message, UsersStorage: dict[int, User]):
-    user = UsersStorage[message.from_user.id]
+@messages.route('/roles')
+async def process_roles_command(message: Message, UsersStorage: UserStore,
+                                lexicon: Catalog):
+    user = UsersStorage.get_or_create(message.from_user.id)
 
     # Если пользователь сейчас играет, выводим правила текущей игры, иначе же отправляем клавиатуру с выбором игры
     if user.current_game:
         await message.answer(
-            text=LEXICON_RU[user.current_game.value]['/roles']
+            text=lexicon[GAMES[user.current_game].keys.roles]
             )
     else:
         await message.answer(
-            text=LEXICON_RU['/roles'],
-            reply_markup=keyboards.roles_kb
+            text=lexicon[ROLES],
+            reply_markup=GAMES.roles_kb(lexicon)
         )
 
 
 # Обрабатываем нажатие на кнопку для отображения правил конкретной игры
-@router.callback_query(F.data.in_(['rock_paper_scissors_roles', 'number_guessing_roles']))
-async def describe_roles(callback: CallbackQuery, UsersStorage: dict[int, User]):
-    game = callback.data.replace('_roles', '')
-
-    await callback.answer() # Убираем знак часов
-    await callback.message.answer(
-        text=LEXICON_RU[game]['/roles']
+@callbacks.route(*GAMES.ids('_roles'))
+async def describe_roles(callback: CallbackQuery, UsersStorage: UserStore,
+                         lexicon: Catalog):
+    game = GAMES[callback.data.removesuffix('_roles')]
+
+    await services.replace_message(
+        callback,
+        text=lexicon[game.keys.roles]
     )
-    await callback.message.delete()
 
 
 # Обработчик команды \cancel
 @router.message(Command(commands='cancel'))
-async def process_cancel_command(message: Message, UsersStorage: dict[int, User]):
-    user = UsersStorage[message.from_user.id]
+@messages.route('/cancel')
+async def process_cancel_command(message: Message, UsersStorage: UserStore,
+                                 lexicon: Catalog):
+    user = UsersStorage.get_or_create(message.from_user.id)
+
+    game = GAMES.get(user.current_game)
 
     if user.is_playing:
-        if user.current_game == Games.RockPaperScissors:
+        if game and not game.cancellable:
             await message.answer(
-            text=LEXICON_RU['rock_paper_scissors']['impossible_answer']
+            text=lexicon[game.keys.impossible_answer]
             )
         else:
             user.current_game = None
             user.is_playing = False
 
             await message.answer(
-            text=LEXICON_RU['/cancel']
+            text=lexicon[CANCEL]
             )
     else:
         await message.answer(
-            text=LEXICON_RU['is_not_playing_yet']
+            text=lexicon[IS_NOT_PLAYING_YET]
         )
 
 
 # Обработчик команды \stat
 @router.message(Command(commands='stat'))
-async def process_stat_command(message: Message, UsersStorage: dict[int, User]):
-    user = UsersStorage[message.from_user.id]
+@messages.route('/stat')
+async def process_stat_command(message: Message, UsersStorage: UserStore,
+                               lexicon: Catalog, history: 'GameHistory | None' = None):
+    user = UsersStorage.get_or_create(message.from_user.id)
 
     # Если пользователь сейчас играет, выводим статистику по текущей игре, иначе же отправляем клавиатуру с выбором игры
     if user.current_game:
-        if user.current_game == Games.NumberGuessing:
-            profile = user.number_guessing
-        elif user.current_game == Games.RockPaperScissors:
-            profile = user.rock_paper_scissors
-
-        win_rate = round(100 * profile.wins / profile.total_games) if profile.total_games else 0
+        game = GAMES[user.current_game]
 
         await message.answer(
-            text=LEXICON_RU[user.current_game.value]['/stat'].format(
-                profile.total_games,
-                profile.wins,
-                win_rate
-            )
+            text=game.stat_text(lexicon, user, message.from_user.id, history)
         )
     else:
         await message.answer(
-            text=LEXICON_RU['/stat'],
-            reply_markup=keyboards.stat_kb
+            text=lexicon[STAT],
+            reply_markup=GAMES.stat_kb(lexicon)
         )
 
 # Обрабатываем нажатие на кнопку для отображения статистики по конкретной игре
-@router.callback_query(F.data.in_(['rock_paper_scissors_stat', 'number_guessing_stat']))
-async def describe_stat(callback: CallbackQuery, UsersStorage: dict[int, User]):
-    user = UsersStorage[callback.from_user.id]
-    game = callback.data.replace('_stat', '')
-
-    if game == Games.NumberGuessing.value:
-        profile = user.number_guessing
-    elif game == Games.RockPaperScissors.value:
-        profile = user.rock_paper_scissors
-
-    win_rate = round(100 * profile.wins / profile.total_games) if profile.total_games else 0
-
-    await callback.answer() # Убираем знак часов
-    await callback.message.answer(
-        text=LEXICON_RU[game]['/stat'].format(
-            profile.total_games,
-            profile.wins,
-            win_rate
-        )
-    )
-    await callback.message.delete()
-
-
-# Обрабатываем нажатие на кнопку 'Камень🗿, ножницы✂️, бумага📃'
-@router.callback_query(F.data == 'rock_paper_scissors')
-async def start_rock_paper_scissors_game(callback: CallbackQuery, UsersStorage: dict[int, User]):
-    user = UsersStorage[callback.from_user.id]
-
-    user.is_playing = True
-    user.current_game = Games.RockPaperScissors
-
-    await callback.answer() # Убираем знак часов
-    await callback.message.answer(
-        text=LEXICON_RU[user.current_game.value]['welcome'],
-        reply_markup=keyboards.rock_paper_scissors_kb
+@callbacks.route(*GAMES.ids('_stat'))
+async def describe_stat(callback: CallbackQuery, UsersStorage: UserStore,
+                        lexicon: Catalog, history: 'GameHistory | None' = None):
+    user = UsersStorage.get_or_create(callback.from_user.id)
+    game = GAMES[callback.data.removesuffix('_stat')]
+
+    await services.replace_message(
+        callback,
+        text=game.stat_text(lexicon, user, callback.from_user.id, history)
     )
-    await callback.message.delete()
 
 
-# Обрабатываем нажатие на одну из кнопок 'Камень🗿', 'Бумага📃', 'Ножницы✂️'
-@router.callback_query(F.data.in_(LEXICON_RU['rock_paper_scissors']['buttons']))
-async def process_rock_paper_scissors_answer(callback: CallbackQuery, UsersStorage: dict[int, User]):
-    user = UsersStorage[callback.from_user.id]
+# Обработчик команды \top
+@router.message(Command(commands='top'))
+@messages.route('/top')
+async def process_top_command(message: Message, UsersStorage: UserStore,
+                              lexicon: Catalog, leaderboards: Leaderboards | None = None):
+    user = UsersStorage.get_or_create(message.from_user.id)
 
-    bot_item = services.get_random_item() # Генерируем случайный ответ
-    result = services.get_winner(callback.data, bot_item) # Определяем победителя
+    # Если пользователь сейчас играет, выводим таблицу лидеров текущей игры, иначе же отправляем клавиатуру с выбором игры
+    if user.current_game:
+        game = GAMES[user.current_game]
 
-    bot_item = LEXICON_RU['rock_paper_scissors']['buttons'][bot_item]
+        await message.answer(
+            text=game.top_text(lexicon, message.from_user.id, leaderboards)
+        )
+    else:
+        await message.answer(
+            text=lexicon[TOP],
+            reply_markup=GAMES.top_kb(lexicon)
+        )
 
-    if result == 'win':
-        user.rock_paper_scissors.wins += 1
-    user.rock_paper_scissors.total_games += 1
+# Обрабатываем нажатие на кнопку для отображения таблицы лидеров конкретной игры
+@callbacks.route(*GAMES.ids('_top'))
+async def describe_top(callback: CallbackQuery, lexicon: Catalog,
+                       leaderboards: Leaderboards | None = None):
+    game = GAMES[callback.data.removesuffix('_top')]
 
-    await callback.answer() # Убираем знак часов
-    await callback.message.answer(
-        text=LEXICON_RU['rock_paper_scissors'][result].format(bot_item),
-        reply_markup=keyboards.yes_no_kb
+    await services.replace_message(
+        callback,
+        text=game.top_text(lexicon, callback.from_user.id, leaderboards)
     )
-    await callback.message.delete()
-
 
-# Обрабатываем нажатие на кнопку 'Числовая угадайка🔢'
-@router.callback_query(F.data == 'number_guessing')
-async def start_number_guessing_game(callback: CallbackQuery, UsersStorage: dict[int, User]):
-    user = UsersStorage[callback.from_user.id]
 
+async def start_game(callback: CallbackQuery, user: User, game: Game, lexicon: Catalog) -> None:
+    """Функция начинает новый раунд выбранной игры"""
     user.is_playing = True
-    user.current_game = Games.NumberGuessing
-    user.number_guessing.attempts = 7
-    user.number_guessing.secret_number = services.get_random_number(1, 100)
+    user.current_game = game.game
 
-    await callback.answer() # Убираем знак часов
-    await callback.message.answer(text=LEXICON_RU[user.current_game.value]['welcome'])
-    await callback.message.delete()
+    await game.start(callback, user, lexicon)
 
 
-# Обрабатываем сообщения полностью состоящие из чисел
-@router.message(lambda x: x.text and x.text.isdigit() and 1 <= int(x.text) <= 100)
-async def process_number_guessing_answer(message: Message, UsersStorage: dict[int, User]):
-    user = UsersStorage[message.from_user.id]
+# Обрабатываем нажатие на кнопку выбора игры, например 'Числовая угадайка🔢'
+@callbacks.route(*GAMES.ids())
+async def process_game_choice(callback: CallbackQuery, UsersStorage: UserStore,
+                              lexicon: Catalog):
+    user = UsersStorage.get_or_create(callback.from_user.id)
 
-    if user.current_game == Games.NumberGuessing:
-        # Логика обработки ответа, если текущая игра пользователя Числовая угадайка
-        curr_num = int(message.text)
+    await start_game(callback, user, GAMES[callback.data], lexicon)
 
-        if curr_num == user.number_guessing.secret_number:
-            user.is_playing = False
-            user.number_guessing.wins += 1
-            user.number_guessing.total_games += 1
 
-            await message.answer(
-                text=LEXICON_RU['number_guessing']['win'],
-                reply_markup=keyboards.yes_no_kb
-            )
-        else:
-            user.number_guessing.attempts -= 1
-
-            if not user.number_guessing.attempts:
-                user.is_playing = False
-                user.number_guessing.total_games += 1
-
-                await message.answer(
-                    text=LEXICON_RU['number_guessing']['lose'].format(user.number_guessing.secret_number),
-                    reply_markup=keyboards.yes_no_kb
-                )
-            else:
-                more_or_less = ("меньше", "больше")[curr_num < user.number_guessing.secret_number]
-
-                await message.answer(
-                    text=LEXICON_RU['number_guessing']['next_try'].format(more_or_less, user.number_guessing.attempts)
-                )
-    elif not user.is_playing:
-        # Отправляем ответ если пользователь еще не играет
-        await message.answer(
-            text=LEXICON_RU['is_not_playing_yet']
-        )
-    else:
-        # Отправляем сообщение о невозможном ответе для конкретной игры, если пользователь играет в другую игру
-        await message.answer(
-            text=LEXICON_RU[user.current_game.value]['impossible_answer']
-        )
+# Регистрируем хэндлеры ходов всех игр и собираем клавиатуры выбора игры
+GAMES.setup(router, messages, callbacks)
+
 
 # Обрабатываем нажатие на инлайн-кнопку 'Давай😎'
-@router.callback_query(F.data == 'Давай😎')
-async def process_positive_answer(callback: CallbackQuery, UsersStorage: dict[int, User]):
-    user = UsersStorage[callback.from_user.id]
+@callbacks.route(keyboards.YES_CALLBACK)
+async def process_positive_answer(callback: CallbackQuery, UsersStorage: UserStore,
+                                  lexicon: Catalog):
+    user = UsersStorage.get_or_create(callback.from_user.id)
 
     await callback.answer() # Убираем знак часов
 
-    if user.current_game == Games.RockPaperScissors:
-        await start_rock_paper_scissors_game(callback, UsersStorage)
-    elif user.current_game == Games.NumberGuessing:
-        await start_number_guessing_game(callback, UsersStorage)
+    if user.current_game:
+        await start_game(callback, user, GAMES[user.current_game], lexicon)
     else:
-        await process_play_command(callback, UsersStorage)
+        await process_play_command(callback, UsersStorage, lexicon)
 
 # Обрабатываем нажатие на инлайн-кнопку 'Не хочу☹️'
-@router.callback_query(F.data == 'Не хочу☹️')
-async def process_negative_answer(callback: CallbackQuery, UsersStorage: dict[int, User]):
-    user = UsersStorage[callback.from_user.id]
+@callbacks.route(keyboards.NO_CALLBACK)
+async def process_negative_answer(callback: CallbackQuery, UsersStorage: UserStore,
+                                  lexicon: Catalog):
+    user = UsersStorage.get_or_create(callback.from_user.id)
 
     user.is_playing = False
     user.current_game = None
 
-    await callback.answer() # Убираем знак часов
-    await callback.message.answer(
-        text=LEXICON_RU['disagreement']
+    await services.replace_message(
+        callback,
+        text=lexicon[DISAGREEMENT]
     )
-    await callback.message.delete()
 
 # Обрабатывем любые сообщения не прошедшие предыдущие хэндлеры
 @router.message()
-async def process_other_answers(message: Message, UsersStorage: dict[int, User]):
-    user = UsersStorage[message.from_user.id]
+async def process_other_answers(message: Message, UsersStorage: UserStore,
+                                lexicon: Catalog):
+    user = UsersStorage.get_or_create(message.from_user.id)
 
     if user.is_playing:
         await message.answer(
-            text=LEXICON_RU[user.current_game.value]['impossible_answer']
+            text=lexicon[GAMES[user.current_game].keys.impossible_answer]
         )
     else:
         await message.answer(
-            text=LEXICON_RU['misunderstanding']
+            text=lexicon[MISUNDERSTANDING]
         )
\ No newline at end of file
@@ -0,0 +1,46 @@
+from typing import Any, Callable
+
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.filters import Filter
+from aiogram.types import CallbackQuery, Message
+
+
+# Таблица маршрутов: точное значение ключа апдейта (callback_data или текст
+# сообщения) -> хэндлер. Регистрируется в роутере одним фильтром и одним
+# хэндлером, так что выбор хэндлера стоит один поиск в словаре вместо
+# последовательной проверки фильтров всех хэндлеров роутера
+class RouteTable(Filter):
+    def __init__(self, key: Callable[[Any], str | None]) -> None:
+        self._key = key
+        self._routes: dict[str, CallableObject] = {}
+
+    def route(self, *values: str):
+        """Декоратор, направляющий апдейты с переданными значениями ключа в хэндлер"""
+        def decorator(handler):
+            target = CallableObject(callback=handler)
+            for value in values:
+                if value in self._routes:
+                    raise ValueError(f'Route {value!r} is already registered')
+                self._routes[value] = target
+            return handler
+        return decorator
+
+    def __contains__(self, value: str) -> bool:
+        return value in self._routes
+
+    async def __call__(self, event: Message | CallbackQuery) -> bool | dict[str, Any]:
+        target = self._routes.get(self._key(event))
+        return False if target is None else {'route': target}
+
+    @staticmethod
+    async def dispatch(event: Message | CallbackQuery, route: CallableObject, **kwargs: Any) -> Any:
+        """Единый хэндлер таблицы: вызывает найденный фильтром хэндлер"""
+        return await route.call(event, **kwargs)
+
+
+def callback_data(callback: CallbackQuery) -> str | None:
+    return callback.data
+
+
+def message_text(message: Message) -> str | None:
+    return message.text
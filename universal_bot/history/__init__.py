@@ -0,0 +1,3 @@
+from .aggregates import Aggregates, GameTotals, PlayerStats
+from .history import GameHistory
+from .log import EventLog, GameEvent, decode_segment, encode_segment
\ No newline at end of file
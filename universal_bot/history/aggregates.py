@@ -0,0 +1,122 @@
+from dataclasses import dataclass, field
+
+from database import Games
+from .log import GameEvent
+
+
+# Вес последнего раунда в скользящем проценте побед: примерно последние 10 игр
+FORM_WEIGHT = 0.1
+
+SECONDS_PER_DAY = 86400
+
+
+# Статистика игрока в одной игре, обновляется на каждом раунде за O(1)
+@dataclass(slots=True)
+class PlayerStats:
+    games: int = 0
+    wins: int = 0
+    draws: int = 0
+    streak: int = 0  # Текущая серия побед
+    best_streak: int = 0
+    form: float = 0.0  # Скользящая доля побед в последних играх
+
+    @property
+    def win_rate(self) -> int:
+        return round(100 * self.wins / self.games) if self.games else 0
+
+    def apply(self, result: str) -> None:
+        won = result == 'win'
+        self.games += 1
+        self.wins += won
+        self.draws += result == 'draw'
+        self.streak = self.streak + 1 if won else 0
+        if self.streak > self.best_streak:
+            self.best_streak = self.streak
+        # Первая игра задает форму целиком, дальше она сглаживается
+        weight = max(FORM_WEIGHT, 1 / self.games)
+        self.form += weight * (won - self.form)
+
+
+# Статистика игры по всем игрокам: итоги, лучшая серия побед и процент
+# побед по дням
+@dataclass(slots=True)
+class GameTotals:
+    games: int = 0
+    wins: int = 0
+    draws: int = 0
+    best_streak: int = 0
+    best_streak_user: int | None = None
+    daily: dict[int, list[int]] = field(default_factory=dict)  # день -> [игр, побед]
+
+    @property
+    def win_rate(self) -> int:
+        return round(100 * self.wins / self.games) if self.games else 0
+
+    def win_rate_by_day(self) -> list[tuple[int, float]]:
+        """Процент побед по дням: пары (день от начала эпохи, процент)"""
+        return [(day, 100 * wins / games) for day, (games, wins) in sorted(self.daily.items())]
+
+
+# Агрегаты поверх журнала раундов. Каждый раунд обновляет счетчики игрока и
+# игры, поэтому статистика отдается готовой, без повторного чтения журнала.
+# Снимок агрегатов сохраняется вместе с номером последнего учтенного
+# сегмента, и при запуске дочитываются только сегменты после него
+class Aggregates:
+    def __init__(self) -> None:
+        # Статистика игроков по играм: игра -> id пользователя -> статистика
+        self.players: dict[Games, dict[int, PlayerStats]] = {game: {} for game in Games}
+        self.games: dict[Games, GameTotals] = {game: GameTotals() for game in Games}
+
+    def apply(self, event: GameEvent) -> PlayerStats:
+        players = self.players[event.game]
+        player = players.get(event.user_id)
+        if player is None:
+            player = players[event.user_id] = PlayerStats()
+        player.apply(event.result)
+
+        totals = self.games[event.game]
+        won = event.result == 'win'
+        totals.games += 1
+        totals.wins += won
+        totals.draws += event.result == 'draw'
+        if player.streak > totals.best_streak:
+            totals.best_streak = player.streak
+            totals.best_streak_user = event.user_id
+        key = int(event.timestamp // SECONDS_PER_DAY)
+        day = totals.daily.get(key)
+        if day is None:
+            day = totals.daily[key] = [0, 0]
+        day[0] += 1
+        day[1] += won
+        return player
+
+    def player(self, user_id: int, game: Games) -> PlayerStats:
+        return self.players[game].get(user_id) or PlayerStats()
+
+    def dump(self) -> dict:
+        """Переводит агрегаты в словарь для снимка"""
+        return {
+            'players': [
+                [user_id, game.value, p.games, p.wins, p.draws, p.streak, p.best_streak, p.form]
+                for game, players in self.players.items()
+                for user_id, p in players.items()
+            ],
+            'games': {
+                game.value: {
+                    'games': t.games, 'wins': t.wins, 'draws': t.draws,
+                    'best_streak': t.best_streak, 'best_streak_user': t.best_streak_user,
+                    'daily': [[day, *counts] for day, counts in t.daily.items()]
+                }
+                for game, t in self.games.items()
+            }
+        }
+
+    @classmethod
+    def load(cls, data: dict) -> 'Aggregates':
+        aggregates = cls()
+        for user_id, game, *stats in data['players']:
+            aggregates.players[Games(game)][user_id] = PlayerStats(*stats)
+        for game, totals in data['games'].items():
+            daily = {day: [games, wins] for day, games, wins in totals.pop('daily')}
+            aggregates.games[Games(game)] = GameTotals(**totals, daily=daily)
+        return aggregates
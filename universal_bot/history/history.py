@@ -0,0 +1,111 @@
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+
+from database import Games
+from .aggregates import Aggregates, GameTotals, PlayerStats
+from .log import EventLog, GameEvent, write_atomic
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = 'aggregates.json'
+
+
+# История раундов: журнал событий и агрегаты над ним. record дописывает
+# раунд в журнал и сразу обновляет агрегаты, поэтому статистика игрока и
+# игры берется из счетчиков за O(1). Раз в compact_interval секунд фоновая
+# задача уплотняет журнал и сохраняет снимок агрегатов, чтобы при запуске
+# дочитывать журнал только после снимка
+class GameHistory:
+    def __init__(
+            self, directory: str | Path, *, segment_rows: int = 65536,
+            flush_interval: float = 5.0, compact_interval: float = 3600.0
+    ) -> None:
+        self.log = EventLog(directory, segment_rows=segment_rows, flush_interval=flush_interval)
+        self.snapshot_path = self.log.directory / SNAPSHOT_FILE
+        self.compact_interval = compact_interval
+        self.aggregates = Aggregates()
+        self._compactor: asyncio.Task | None = None
+
+    def open(self) -> int:
+        """Загружает снимок агрегатов и учитывает раунды после него. Возвращает их число"""
+        watermark = 0
+        if self.snapshot_path.exists():
+            data = json.loads(self.snapshot_path.read_text(encoding='utf-8'))
+            watermark = data['segment']
+            self.aggregates = Aggregates.load(data)
+        replayed = 0
+        for event in self.log.scan(after=watermark):
+            self.aggregates.apply(event)
+            replayed += 1
+        return replayed
+
+    def record(
+            self, user_id: int, game: Games, user_choice: int, bot_choice: int, result: str,
+            timestamp: float | None = None
+    ) -> PlayerStats:
+        """Записывает раунд и возвращает обновленную статистику игрока"""
+        event = GameEvent(
+            user_id, game, user_choice, bot_choice, result,
+            time.time() if timestamp is None else timestamp
+        )
+        self.log.append(event)
+        return self.aggregates.apply(event)
+
+    def player(self, user_id: int, game: Games) -> PlayerStats:
+        return self.aggregates.player(user_id, game)
+
+    def totals(self, game: Games) -> GameTotals:
+        return self.aggregates.games[game]
+
+    async def snapshot(self) -> int:
+        """
+        Сбрасывает журнал и сохраняет снимок агрегатов, согласованный с ним.
+        Возвращает номер последнего сегмента, учтенного в снимке
+        """
+        snapshot: dict = {}
+
+        def checkpoint(segment: int) -> None:
+            snapshot.update(self.aggregates.dump(), segment=segment)
+
+        await self.log.flush(checkpoint)
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: write_atomic(self.snapshot_path, json.dumps(snapshot).encode())
+        )
+        return snapshot['segment']
+
+    async def compact(self) -> int:
+        """Задача уплотнения: сохраняет снимок и сливает мелкие сегменты журнала"""
+        # Пока пишется снимок, фоновая задача может сбросить новый сегмент.
+        # Сливать его с учтенными в снимке нельзя: при запуске слитый сегмент
+        # дочитывается целиком, и учтенные раунды посчитались бы дважды
+        watermark = await self.snapshot()
+        return await self.log.compact(upto=watermark)
+
+    async def _compact_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.compact_interval)
+            try:
+                removed = await self.compact()
+                logger.info('Журнал раундов уплотнен, сегментов слито: %d', removed)
+            except Exception:
+                logger.exception('Не удалось уплотнить журнал раундов')
+
+    def start(self) -> None:
+        self.log.start()
+        if self._compactor is None:
+            self._compactor = asyncio.create_task(self._compact_loop())
+
+    async def close(self) -> None:
+        if self._compactor is not None:
+            self._compactor.cancel()
+            try:
+                await self._compactor
+            except asyncio.CancelledError:
+                pass
+            self._compactor = None
+        await self.snapshot()
+        await self.log.close()
@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import operator
+import os
+import struct
+import zlib
+from array import array
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import accumulate
+from pathlib import Path
+
+from database import Games
+
+
+logger = logging.getLogger(__name__)
+
+# Коды игр и исходов раунда в колонках журнала
+GAMES: tuple[Games, ...] = tuple(Games)
+GAME_CODES = {game: code for code, game in enumerate(GAMES)}
+RESULTS = ('lose', 'win', 'draw')
+RESULT_CODES = {result: code for code, result in enumerate(RESULTS)}
+
+# Колонки журнала: имя и тип элемента array. Время хранится в миллисекундах
+COLUMNS = (
+    ('user_id', 'q'),
+    ('game', 'B'),
+    ('user_choice', 'h'),
+    ('bot_choice', 'h'),
+    ('result', 'B'),
+    ('timestamp', 'q'),
+)
+# Колонки, которые перед сжатием кодируются разностями соседних значений
+DELTA_COLUMNS = frozenset({'timestamp'})
+
+# Заголовок сегмента: сигнатура, версия, число строк. Затем для каждой
+# колонки длина сжатых данных и сами данные
+_MAGIC = b'UBEL'
+_HEADER = struct.Struct('<4sHI')
+_COLUMN = struct.Struct('<I')
+
+
+# Раунд игры: кто играл, во что, чем ходили пользователь и бот и чем кончилось
+@dataclass(slots=True)
+class GameEvent:
+    user_id: int
+    game: Games
+    user_choice: int
+    bot_choice: int
+    result: str  # 'win', 'lose' или 'draw' с точки зрения пользователя
+    timestamp: float
+
+
+def new_columns() -> dict[str, array]:
+    return {name: array(typecode) for name, typecode in COLUMNS}
+
+
+def _delta(values: array) -> array:
+    encoded = array(values.typecode, values[:1])
+    encoded.extend(map(operator.sub, values[1:], values))
+    return encoded
+
+
+def _undelta(values: array) -> array:
+    return array(values.typecode, accumulate(values))
+
+
+def encode_segment(columns: dict[str, array]) -> bytes:
+    """Функция сериализует колонки в сегмент: каждая колонка сжимается отдельно"""
+    rows = len(columns['user_id'])
+    parts = [_HEADER.pack(_MAGIC, 1, rows)]
+    for name, _ in COLUMNS:
+        values = columns[name]
+        data = zlib.compress((_delta(values) if name in DELTA_COLUMNS else values).tobytes())
+        parts += (_COLUMN.pack(len(data)), data)
+    return b''.join(parts)
+
+
+def decode_segment(data: bytes) -> dict[str, array]:
+    magic, version, rows = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != 1:
+        raise ValueError('Not an event log segment')
+    offset = _HEADER.size
+    columns = {}
+    for name, typecode in COLUMNS:
+        (size,) = _COLUMN.unpack_from(data, offset)
+        offset += _COLUMN.size
+        values = array(typecode)
+        values.frombytes(zlib.decompress(data[offset:offset + size]))
+        offset += size
+        if len(values) != rows:
+            raise ValueError(f'Column {name!r} has {len(values)} rows instead of {rows}')
+        columns[name] = _undelta(values) if name in DELTA_COLUMNS else values
+    return columns
+
+
+def iter_events(columns: dict[str, array]) -> Iterator[GameEvent]:
+    for user_id, game, user_choice, bot_choice, result, timestamp in zip(
+        *(columns[name] for name, _ in COLUMNS)
+    ):
+        yield GameEvent(
+            user_id, GAMES[game], user_choice, bot_choice, RESULTS[result], timestamp / 1000
+        )
+
+
+# Сегмент на диске: файл '<первый номер>-<последний номер>.seg'. Номера
+# растут с каждым записанным сегментом, а при слиянии сегментов новый файл
+# получает диапазон номеров всех слитых, поэтому после сбоя посреди
+# уплотнения повторяющиеся события легко отбросить
+@dataclass(slots=True, frozen=True)
+class SegmentFile:
+    first: int
+    last: int
+    rows: int
+    path: Path
+
+    @classmethod
+    def parse(cls, path: Path) -> 'SegmentFile':
+        first, _, last = path.stem.partition('-')
+        with open(path, 'rb') as file:
+            _, _, rows = _HEADER.unpack(file.read(_HEADER.size))
+        return cls(int(first), int(last), rows, path)
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Функция записывает файл целиком: читатели видят либо старую, либо новую версию"""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, path)
+
+
+# Журнал раундов: только дописывается, хранится по колонкам и сжимается.
+# append кладет раунд в колонки буфера в памяти за O(1), а flush в фоновом
+# потоке сжимает буфер и пишет его на диск новым сегментом. Буфер
+# сбрасывается раз в flush_interval секунд или по заполнении segment_rows
+# строк. compact сливает мелкие сегменты в крупные: так файлов меньше, а
+# сжатие лучше
+class EventLog:
+    def __init__(
+            self, directory: str | Path, *, segment_rows: int = 65536, flush_interval: float = 5.0
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_rows = segment_rows
+        self.flush_interval = flush_interval
+        self._buffer = new_columns()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='event-log')
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+        self.segments = self._scan()
+        self.last_segment = self.segments[-1].last if self.segments else 0
+
+    def _scan(self) -> list[SegmentFile]:
+        for tmp in self.directory.glob('*.tmp'):
+            tmp.unlink()
+        segments = sorted(
+            (SegmentFile.parse(path) for path in self.directory.glob('*.seg')),
+            key=lambda segment: (segment.first, -segment.last)
+        )
+        # Сегменты, поглощенные слиянием, которое прервалось до их удаления
+        result: list[SegmentFile] = []
+        for segment in segments:
+            if result and segment.last <= result[-1].last:
+                segment.path.unlink()
+            else:
+                result.append(segment)
+        return result
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buffer['user_id'])
+
+    @property
+    def rows(self) -> int:
+        return sum(segment.rows for segment in self.segments) + self.buffered
+
+    def append(self, event: GameEvent) -> None:
+        buffer = self._buffer
+        buffer['user_id'].append(event.user_id)
+        buffer['game'].append(GAME_CODES[event.game])
+        buffer['user_choice'].append(event.user_choice)
+        buffer['bot_choice'].append(event.bot_choice)
+        buffer['result'].append(RESULT_CODES[event.result])
+        buffer['timestamp'].append(int(event.timestamp * 1000))
+        if len(buffer['user_id']) >= self.segment_rows:
+            self._full.set()
+
+    def _take_buffer(self) -> tuple[int, dict[str, array]] | None:
+        if not self.buffered:
+            return None
+        columns, self._buffer = self._buffer, new_columns()
+        self._full.clear()
+        self.last_segment += 1
+        return self.last_segment, columns
+
+    async def _write(self, number: int, columns: dict[str, array]) -> None:
+        path = self.directory / f'{number:010d}-{number:010d}.seg'
+        data = await self._run(encode_segment, columns)
+        await self._run(write_atomic, path, data)
+        self.segments.append(SegmentFile(number, number, len(columns['user_id']), path))
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def flush(self, checkpoint: Callable[[int], None] | None = None) -> int:
+        """
+        Пишет накопленные раунды новым сегментом и возвращает номер последнего
+        сегмента. checkpoint вызывается с этим номером сразу после того, как
+        буфер забран, до первого переключения цикла событий: в этот момент
+        все принятые раунды лежат в сегментах с номерами не больше него
+        """
+        async with self._lock:
+            taken = self._take_buffer()
+            if checkpoint is not None:
+                checkpoint(self.last_segment)
+            if taken is not None:
+                await self._write(*taken)
+            return self.last_segment
+
+    def scan(self, after: int = 0) -> Iterator[GameEvent]:
+        """Перебирает раунды из сегментов с номерами больше after и из буфера"""
+        for segment in list(self.segments):
+            if segment.last > after:
+                yield from iter_events(decode_segment(segment.path.read_bytes()))
+        yield from iter_events(self._buffer)
+
+    def _merge(self, group: list[SegmentFile]) -> SegmentFile:
+        columns = new_columns()
+        for segment in group:
+            for name, values in decode_segment(segment.path.read_bytes()).items():
+                columns[name].extend(values)
+        path = self.directory / f'{group[0].first:010d}-{group[-1].last:010d}.seg'
+        write_atomic(path, encode_segment(columns))
+        for segment in group:
+            segment.path.unlink()
+        return SegmentFile(group[0].first, group[-1].last, len(columns['user_id']), path)
+
+    async def compact(self, upto: int | None = None) -> int:
+        """
+        Сливает подряд идущие мелкие сегменты в сегменты до segment_rows строк
+        и возвращает, сколько файлов стало меньше. Если задан upto, сливаются
+        только сегменты с номерами не больше него
+        """
+        async with self._lock:
+            eligible = [
+                segment for segment in self.segments if upto is None or segment.last <= upto
+            ]
+            groups: list[list[SegmentFile]] = [[]]
+            rows = 0
+            for segment in eligible:
+                if rows + segment.rows > self.segment_rows and groups[-1]:
+                    groups.append([])
+                    rows = 0
+                groups[-1].append(segment)
+                rows += segment.rows
+
+            compacted = []
+            for group in groups:
+                if len(group) > 1:
+                    compacted.append(await self._run(self._merge, group))
+                else:
+                    compacted.extend(group)
+            compacted.extend(self.segments[len(eligible):])
+            removed = len(self.segments) - len(compacted)
+            self.segments = compacted
+            return removed
+
+    def disk_size(self) -> int:
+        return sum(segment.path.stat().st_size for segment in self.segments)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('Не удалось записать сегмент журнала раундов')
+
+    def start(self) -> None:
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        self._executor.shutdown()
+
@@ -0,0 +1 @@
+from .hotreload import APP_PACKAGES, App, HotReloader, current_app, load_app
\ No newline at end of file
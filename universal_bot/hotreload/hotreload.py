@@ -0,0 +1,134 @@
+import asyncio
+import importlib
+import logging
+import signal
+import sys
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any
+
+from aiogram import Dispatcher, Router
+
+from middlewares import LocaleMiddleware
+
+
+logger = logging.getLogger(__name__)
+
+# Пакеты, которые перезагружаются вместе: тексты, клавиатуры, игры и
+# хэндлеры. Ключи текстов вычисляются при импорте модулей, поэтому эти пакеты
+# нельзя перезагружать по отдельности. Хранилище, сессии, история, таблицы
+# лидеров и сервисы со своим состоянием не перезагружаются
+APP_PACKAGES = ('lexicon', 'keyboards', 'games', 'handlers')
+
+# Одновременно собирается не больше одной копии приложения
+_import_lock = threading.Lock()
+
+
+def _is_app_module(name: str) -> bool:
+    return name.partition('.')[0] in APP_PACKAGES
+
+
+# Загруженная копия приложения: роутер с хэндлерами, лексикон и модули, из
+# которых они собраны
+@dataclass(slots=True)
+class App:
+    router: Router
+    lexicon: Any  # lexicon.Lexicon этой копии
+    modules: dict[str, ModuleType]
+
+
+def current_app() -> App:
+    """Функция возвращает уже загруженную копию приложения"""
+    return App(
+        router=sys.modules['handlers'].router,
+        lexicon=sys.modules['lexicon'].LEXICON,
+        modules={name: module for name, module in sys.modules.items() if _is_app_module(name)}
+    )
+
+
+def load_app() -> App:
+    """
+    Функция импортирует пакеты приложения заново в новые объекты модулей.
+    Старые модули не меняются, поэтому хэндлеры, которые сейчас работают,
+    дорабатывают на своей копии кода и текстов. Если импорт упал, в
+    sys.modules возвращается прежняя копия
+    """
+    with _import_lock:
+        previous = {name: sys.modules.pop(name) for name in list(sys.modules) if _is_app_module(name)}
+        try:
+            importlib.invalidate_caches()
+            handlers = importlib.import_module('handlers')
+            lexicon = importlib.import_module('lexicon')
+        except BaseException:
+            for name in [name for name in sys.modules if _is_app_module(name)]:
+                del sys.modules[name]
+            sys.modules.update(previous)
+            raise
+        return App(
+            router=handlers.router,
+            lexicon=lexicon.LEXICON,
+            modules={name: module for name, module in sys.modules.items() if _is_app_module(name)}
+        )
+
+
+# Горячая перезагрузка хэндлеров, клавиатур и лексикона. Новая копия
+# приложения импортируется в фоновом потоке, пока бот продолжает отвечать
+# старой, а затем роутер диспетчера и лексикон LocaleMiddleware
+# подменяются синхронно, за один шаг цикла событий. Хранилище пользователей
+# и очередь апдейтов не трогаются: апдейты, которые уже обрабатываются,
+# доходят до конца на старом коде, а все следующие попадают в новый роутер,
+# так что ни один апдейт не теряется. after_reload вызывается после подмены,
+# например чтобы перечитать настройки
+class HotReloader:
+    def __init__(
+            self, dp: Dispatcher, locale: LocaleMiddleware, *, app: App | None = None,
+            after_reload: Callable[[], None] | None = None
+    ) -> None:
+        self.dp = dp
+        self.locale = locale
+        self.app = app if app is not None else current_app()
+        self.after_reload = after_reload
+        self.latencies: list[float] = []  # Время перезагрузок от начала до подмены
+        self.pauses: list[float] = []  # Время подмены, на которое встает цикл событий
+        self.failures = 0
+        self._lock = asyncio.Lock()
+
+    def swap(self, app: App) -> None:
+        """Ставит роутер новой копии на место старого и подменяет лексикон"""
+        routers = self.dp.sub_routers
+        index = routers.index(self.app.router)
+        self.dp.include_router(app.router)
+        routers.insert(index, routers.pop())
+        routers.remove(self.app.router)
+        self.locale.lexicon = app.lexicon
+        self.app = app
+
+    async def reload(self) -> bool:
+        """Перезагружает приложение и возвращает, удалось ли это"""
+        async with self._lock:
+            started = time.perf_counter()
+            try:
+                app = await asyncio.get_running_loop().run_in_executor(None, load_app)
+            except Exception:
+                self.failures += 1
+                logger.exception('Не удалось перезагрузить хэндлеры, работаем на прежних')
+                return False
+            swapping = time.perf_counter()
+            self.swap(app)
+            if self.after_reload is not None:
+                self.after_reload()
+            finished = time.perf_counter()
+            self.pauses.append(finished - swapping)
+            self.latencies.append(finished - started)
+            logger.info('Хэндлеры и лексикон перезагружены за %.1f мс (подмена %.2f мс)',
+                        self.latencies[-1] * 1000, self.pauses[-1] * 1000)
+            return True
+
+    def install(self, sig: signal.Signals = signal.SIGUSR1) -> None:
+        """Запускает перезагрузку по сигналу"""
+        asyncio.get_running_loop().add_signal_handler(
+            sig, lambda: asyncio.create_task(self.reload())
+        )
@@ -1 +1,3 @@
-from .keyboards import games_kb, yes_no_kb, rock_paper_scissors_kb, roles_kb, stat_kb
\ No newline at end of file
+from .keyboards import (NO_CALLBACK, ROCK_PAPER_SCISSORS_BUTTONS, YES_CALLBACK,
+                        build_games_kb, cached_kb, rock_paper_scissors_kb,
+                        yes_no_kb)
\ No newline at end of file
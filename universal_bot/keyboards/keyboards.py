@@ -1,84 +1,89 @@
+from typing import Callable
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from lexicon import LEXICON_RU
-
-
-# Создаем клавиатуру для выбора игры, где в колбэке
-# отправляется 'rock_paper_scissors' или 'number_guessing'.
-games_kb = InlineKeyboardMarkup(
-    inline_keyboard=[
-        [InlineKeyboardButton(
-            text=LEXICON_RU['rock_paper_scissors']['button'],
-            callback_data='rock_paper_scissors'
-        )],
-        [InlineKeyboardButton(
-            text=LEXICON_RU['number_guessing']['button'],
-            callback_data='number_guessing'
-        )]
-    ],
-    resize_keyboard=True
-)
-
-# Создаем клавиатуру для выбора игры для вывода правил
-roles_kb = InlineKeyboardMarkup(
-    inline_keyboard=[
-        [InlineKeyboardButton(
-            text=LEXICON_RU['rock_paper_scissors']['button'],
-            callback_data='rock_paper_scissors_roles'
-        )],
-        [InlineKeyboardButton(
-            text=LEXICON_RU['number_guessing']['button'],
-            callback_data='number_guessing_roles'
-        )]
-    ],
-    resize_keyboard=True
-)
-
-# Создаем клавиатуру для выбора игры для вывода статистики
-stat_kb = InlineKeyboardMarkup(
-    inline_keyboard=[
-        [InlineKeyboardButton(
-            text=LEXICON_RU['rock_paper_scissors']['button'],
-            callback_data='rock_paper_scissors_stat'
-        )],
-        [InlineKeyboardButton(
-            text=LEXICON_RU['number_guessing']['button'],
-            callback_data='number_guessing_stat'
-        )]
-    ],
-    resize_keyboard=True
-)
-
-
-# Создаем клавиатуру для выбора камня, ножниц или бумаги, где в колбэке
-# отправляется 'rock', 'paper' или 'scissors'.
-rock_paper_scissors_kb = InlineKeyboardMarkup(
-    inline_keyboard=[
-        [
-            InlineKeyboardButton(
-                text=v,
-                callback_data=k
-            )
-            for k, v in LEXICON_RU['rock_paper_scissors']['buttons'].items()
-        ]
-    ],
-    resize_keyboard=True
-)
-
-# Создаем кнопки, где в колбэки отправляется сам текст кнопки
-yes_button = InlineKeyboardButton(
-    text=LEXICON_RU['yes_button'],
-    callback_data=LEXICON_RU['yes_button']
-)
-no_button = InlineKeyboardButton(
-    text=LEXICON_RU['no_button'],
-    callback_data=LEXICON_RU['no_button']
-)
-
-# Настраиваем клавиатуру
-yes_no_kb_builder = InlineKeyboardBuilder()
-yes_no_kb_builder.row(yes_button, no_button, width=2)
-
-# Клавиатура для продолжения игры
-yes_no_kb = yes_no_kb_builder.as_markup(resize_keyboard=True)
\ No newline at end of file
+from lexicon import LEXICON, Catalog
+from responses import prepare_markup
+
+
+YES_BUTTON = LEXICON.key('yes_button')
+NO_BUTTON = LEXICON.key('no_button')
+
+# В колбэках кнопок 'Да' и 'Нет' отправляется их текст в локали по
+# умолчанию, поэтому колбэки одинаковы для всех языков
+YES_CALLBACK = LEXICON.default[YES_BUTTON]
+NO_CALLBACK = LEXICON.default[NO_BUTTON]
+
+# Кнопки камня, ножниц и бумаги: колбэк -> ключ текста кнопки
+ROCK_PAPER_SCISSORS_BUTTONS = {
+    item: LEXICON.key(f'rock_paper_scissors.buttons.{item}')
+    for item in ('rock', 'paper', 'scissors')
+}
+
+
+def cached_kb(lexicon: Catalog, name: str,
+              build: Callable[[], InlineKeyboardMarkup]) -> InlineKeyboardMarkup:
+    """
+    Функция возвращает клавиатуру локали, при первом обращении собирая ее
+    и сериализуя в JSON. Клавиатура выгружается вместе с каталогом локали
+    """
+    keyboard = lexicon.cache.get(name)
+    if keyboard is None:
+        keyboard = lexicon.cache[name] = prepare_markup(build())
+    return keyboard
+
+
+def build_games_kb(buttons: list[tuple[str, str]], suffix: str = '') -> InlineKeyboardMarkup:
+    """
+    Функция создает клавиатуру с кнопками игр по одной в ряд. В колбэке
+    отправляется id игры с суффиксом, например 'number_guessing_roles'
+    """
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text=text, callback_data=f'{game_id}{suffix}')]
+            for text, game_id in buttons
+        ],
+        resize_keyboard=True
+    )
+
+
+def rock_paper_scissors_kb(lexicon: Catalog) -> InlineKeyboardMarkup:
+    """
+    Клавиатура для выбора камня, ножниц или бумаги, где в колбэке
+    отправляется 'rock', 'paper' или 'scissors'
+    """
+    return cached_kb(lexicon, 'rock_paper_scissors_kb', lambda: InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text=lexicon[key],
+                    callback_data=item
+                )
+                for item, key in ROCK_PAPER_SCISSORS_BUTTONS.items()
+            ]
+        ],
+        resize_keyboard=True
+    ))
+
+
+def _build_yes_no_kb(lexicon: Catalog) -> InlineKeyboardMarkup:
+    # Создаем кнопки, где в колбэки отправляется текст кнопки в локали по умолчанию
+    yes_button = InlineKeyboardButton(
+        text=lexicon[YES_BUTTON],
+        callback_data=YES_CALLBACK
+    )
+    no_button = InlineKeyboardButton(
+        text=lexicon[NO_BUTTON],
+        callback_data=NO_CALLBACK
+    )
+
+    # Настраиваем клавиатуру
+    yes_no_kb_builder = InlineKeyboardBuilder()
+    yes_no_kb_builder.row(yes_button, no_button, width=2)
+    return yes_no_kb_builder.as_markup(resize_keyboard=True)
+
+
+def yes_no_kb(lexicon: Catalog) -> InlineKeyboardMarkup:
+    """Клавиатура для продолжения игры"""
+    return cached_kb(lexicon, 'yes_no_kb', lambda: _build_yes_no_kb(lexicon))
@@ -1 +1,5 @@
-from .lexicon import LEXICON_RU
\ No newline at end of file
+from .lexicon import Catalog, Lexicon, compile_template
+
+
+# Лексикон бота со всеми локалями из каталога lexicon/locales
+LEXICON = Lexicon()
\ No newline at end of file
@@ -1,82 +1,118 @@
-LEXICON_RU = {
-    '/start': 'Привет!\nТы попал в универсального бота. '
-              'Чтобы управлять мной, тыкни /help, чтобы просмотреть все '
-              'доступные способы взаимодействия со мной.',
-    '/play': 'Здорово!\n'
-             'Выбери и нажми на ту игру, в которую ты хочешь поиграть со мной',
-    'is_not_playing_yet': 'Мы сейчас с тобой не играем ни в какую игрую.',
-    '/help': 'Доступные команды:\n'
-             '/start — Приветствие\n'
-             '/help — Вспомогательная информация о командах, чтобы не потеряться\n'
-             '/roles — Правила текщий игры\n'
-             '/play — Начать игру\n'
-             '/cancel — Закончить текущую игру\n'
-             '/stat — Показать мою статистику\n\n',
-    '/cancel': 'Игра окончена. Увидимся в следующий раз! '
-               'Буду с нетерпением ждать новой встречи!',
-    'disagreement': 'Жаль :(\n\nЕсли захочешь — я в любое время готов!',
-    'misunderstanding': 'К сожалению, я не понимаю, о чем ты...',
-    'rock_paper_scissors': {
-        'button': 'Камень🗿, ножницы✂️, бумага📃',
-        'welcome': 'Что же ты выберешь?',
-        'buttons': {
-            'rock': 'Камень🗿',
-            'paper': 'Бумага📃',
-            'scissors': 'Ножницы✂️'
-        },
-        'win': 'Мой выбор — {}\n\n'
-               'Эх! Я проиграл...\n\n'
-               'Может сыграем еще?',
-        'lose': 'Мой выбор — {}\n\n'
-                'Хе-хе-хе! Я победил!\n\n'
-                'Не отчаивайся, тебе обязательно '
-                'повезет в следующий раз! Может сыграем еще?',
-        'draw': 'Мой выбор — {}\n\nНичья!\n\nПродолжим?',
-        'impossible_answer': 'Пока мы играем в "камень, ножницы, бумагу" я могу '
-                             'реагировать только на нажатия кнопок, '
-                             'которые находятся под соответствующим сообщением, '
-                             'и команды /stat, /roles и /help',
-        '/roles': 'Правила игры:\n\n'
-                 '1. Ты выбираешь камень, ножницы или бумагу и нажимаешь на '
-                 'соответствующую кнопку, которая отправит в чат твой выбор.\n'
-                 '2. Я, одновременно с тобой, тоже делаю выбор и отправляю его '
-                 'в чат вместе с исходом игры.\n'
-                 '3. Камень побеждает ножницы, ножницы побеждают бумагу, а '
-                 'бумага побеждает камень.',
-        '/stat': 'Игр сыграно: {}\n'
-                 'Побед: {}\n'
-                 'Процент побед: {}%'
-        },
-    'number_guessing': {
-        'button': 'Числовая угадайка🔢',
-        'welcome': 'Супер!\n\n'
-                   'Итак, я загадал число от 1 до 100, теперь у тебя есть 7 '
-                   'попыток, чтобы отгадать его, введя правильное число.\n\n'
-                   'Как ты думаешь, какое число я загадал?',
-        'win': 'Ура!\n\n'
-               'Ты угалал число и победил! Поздравляю тебя!\n'
-               'Может сыграем еще?',
-        'lose': 'У тебя закончились попытки. Не расстраивайся, '
-                'ведь ты всегда можешь сыграть еще!\n'
-                'А загаданное число было — {}.\n\n'
-                'Не хочешь попробовать сыграть еще?',
-        'next_try': 'Не угадал. Мое число {}!\n\n'
-                    'Количество оставшихся попыток: {}',
-        'impossible_answer': 'Пока мы играем в игру "Числовая угадайка" я могу '
-                             'реагировать только на числа от 1 до 100 '
-                             'и команды /cancel, /stat, /roles и /help',
-        '/roles': 'Правила игры:\n\n'
-                 '1. Я загадываю число от 1 до 100.\n'
-                 '2. У тебя есть 7 попыток, чтобы отгадать число.\n'
-                 '3. Чтобы тебе было легче, каждый раз, когда ты будешь отправлять '
-                 'предполагаемое число, я буду отвечать тебе больше ли оно загаданного '
-                 'или меньше.',
-        '/stat': 'Игр сыграно: {}\n'
-                 'Побед: {}\n'
-                 'Процент побед: {}%'
-        },
-    'yes_button': 'Давай😎',
-    'no_button': 'Не хочу☹️',
-    '/roles': 'Правила какой игры ты бы хотел уточнить?',
-    '/stat': 'Статистику по какой из игр ты бы хотел уточнить?'
-    }
\ No newline at end of file
+import json
+import sys
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+from string import Formatter
+from typing import Any, Callable
+
+
+# Каталоги локалей лежат в файлах <код языка>.json
+LOCALES_DIR = Path(__file__).with_name('locales')
+DEFAULT_LOCALE = 'ru'
+
+
+def compile_template(template: str) -> Callable[..., str]:
+    """
+    Функция компилирует шаблон лексикона в форматтер. Шаблоны только с
+    позиционными полями '{}' переводятся в %-формат, который не разбирает
+    строку при каждом вызове. Остальные шаблоны форматируются через str.format
+    """
+    fields = list(Formatter().parse(template))
+    if any(name or spec or conversion for _, name, spec, conversion in fields):
+        return template.format
+    percent = ''.join(
+        literal.replace('%', '%%') + ('' if name is None else '%s')
+        for literal, name, _, _ in fields
+    )
+    return lambda *args: percent % args
+
+
+def is_template(text: str) -> bool:
+    return any(name is not None for _, name, _, _ in Formatter().parse(text))
+
+
+def flatten(catalog: dict[str, Any], prefix: str = '') -> Iterator[tuple[str, str]]:
+    """Функция разворачивает вложенный каталог в пары ('игра.ключ', текст)"""
+    for key, value in catalog.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f'{prefix}{key}.')
+        else:
+            yield f'{prefix}{key}', value
+
+
+# Каталог одной локали: тексты лежат в кортеже и достаются по числовому
+# ключу (handle), который вычисляется один раз при импорте модуля, а не
+# строковыми индексами вложенных словарей при каждом ответе. Одинаковые
+# строки интернируются. В cache хранятся производные объекты локали,
+# например клавиатуры, и выгружаются вместе с каталогом
+class Catalog:
+    __slots__ = ('locale', '_texts', '_formatters', 'cache')
+
+    def __init__(self, locale: str, texts: tuple[str, ...]) -> None:
+        self.locale = locale
+        self._texts = texts
+        self._formatters = tuple(
+            compile_template(text) if is_template(text) else None for text in texts
+        )
+        self.cache: dict[Any, Any] = {}
+
+    def __getitem__(self, handle: int) -> str:
+        return self._texts[handle]
+
+    def format(self, handle: int, *args: Any) -> str:
+        """Подставляет аргументы в шаблон с ключом handle"""
+        return self._formatters[handle](*args)
+
+
+# Лексикон бота. Набор ключей задает каталог локали по умолчанию, он
+# загружается сразу. Остальные локали читаются с диска при первом
+# обращении и держатся в LRU-кэше не более чем по max_locales штук.
+# Ключи, которых нет в каталоге локали, берутся из локали по умолчанию
+class Lexicon:
+    def __init__(
+            self, directory: Path = LOCALES_DIR, *, default: str = DEFAULT_LOCALE,
+            max_locales: int = 8
+    ) -> None:
+        self.directory = directory
+        self.max_locales = max_locales
+        self.available = frozenset(path.stem for path in directory.glob('*.json'))
+        self._loaded: OrderedDict[str, Catalog] = OrderedDict()
+
+        texts = dict(flatten(self._read(default)))
+        self._keys = {sys.intern(path): handle for handle, path in enumerate(texts)}
+        self.default = Catalog(default, tuple(sys.intern(text) for text in texts.values()))
+
+    def _read(self, locale: str) -> dict[str, Any]:
+        with open(self.directory / f'{locale}.json', encoding='utf-8') as file:
+            return json.load(file)
+
+    def _load(self, locale: str) -> Catalog:
+        texts = list(self.default._texts)
+        for path, text in flatten(self._read(locale)):
+            handle = self._keys.get(path)
+            if handle is not None:
+                texts[handle] = sys.intern(text)
+        return Catalog(locale, tuple(texts))
+
+    def key(self, path: str) -> int:
+        """Возвращает числовой ключ текста по пути вида 'number_guessing.win'"""
+        try:
+            return self._keys[path]
+        except KeyError:
+            raise KeyError(f'Lexicon has no text {path!r}') from None
+
+    def get(self, language_code: str | None) -> Catalog:
+        """Возвращает каталог для языка пользователя, например 'en' или 'pt-BR'"""
+        locale = language_code.partition('-')[0].lower() if language_code else None
+        if locale == self.default.locale or locale not in self.available:
+            return self.default
+
+        catalog = self._loaded.get(locale)
+        if catalog is None:
+            catalog = self._loaded[locale] = self._load(locale)
+            if len(self._loaded) > self.max_locales:
+                self._loaded.popitem(last=False)
+        else:
+            self._loaded.move_to_end(locale)
+        return catalog
@@ -0,0 +1,2 @@
+from .mock_session import MockSession
+from .updates import UpdateFactory
\ No newline at end of file
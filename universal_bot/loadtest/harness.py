@@ -0,0 +1,462 @@
+"""
+Нагрузочный прогон бота на синтетическом или записанном потоке апдейтов.
+
+Апдейты подаются через Dispatcher.feed_update в настоящий handlers.router с
+теми же мидлварями и хранилищем, что и в bot.py, а запросы к Bot API уходят
+в имитацию сессии. Апдейты ставятся в очередь планировщика вебхука с
+заданной частотой (или все сразу), так что апдейты одного пользователя
+обрабатываются по порядку, а разных — параллельно. В отчете: пропускная
+способность, перцентили задержки, рост памяти и задержки цикла событий.
+Если заданы пороги, при их нарушении прогон завершается с кодом 1.
+
+С --workers N апдейты раздаются N процессам-воркерам через cluster.ClusterFront
+так же, как в многопроцессном режиме бота, а задержка считается от отправки
+апдейта фронтом до подтверждения воркером. Память в этом режиме — фронта.
+С --restart воркеры на середине прогона по очереди перезапускаются, а
+потерянные апдейты считаются ошибками. Профили должны пережить перезапуск,
+поэтому хранилище в памяти в этом режиме заменяется временным файлом SQLite.
+После прогона счетчик игр в камень, ножницы, бумагу каждого пользователя в
+хранилище сверяется с числом его ходов в потоке (каждый ход — сыгранная
+игра), а расхождения тоже считаются ошибками.
+
+С --reload-interval хэндлеры и лексикон перезагружаются через
+hotreload.HotReloader прямо во время прогона. В отчете появляется задержка
+перезагрузок, а каждый апдейт по-прежнему должен быть обработан.
+
+Запуск из каталога universal_bot:
+    python -m loadtest.harness --sessions 2000 --users 1000 --rate 500
+    python -m loadtest.harness --save updates.jsonl  # записать поток
+    python -m loadtest.harness --replay updates.jsonl --rate 500 --max-p99-ms 50 --max-errors 0
+    python -m loadtest.harness --workers 4 --sessions 8000
+    python -m loadtest.harness --workers 4 --sessions 2000 --rate 500 --restart --max-errors 0
+    python -m loadtest.harness --rate 500 --reload-interval 0.5 --max-errors 0
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Iterable
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import Update
+
+import services
+from cluster import ClusterFront, get_payload_key, serve_worker
+from database import (Leaderboards, SessionManager, SQLiteStorage, UserRegistry, UserStore,
+                      create_storage, load_user)
+from handlers import router
+from history import GameHistory
+from hotreload import HotReloader
+from keyboards import ROCK_PAPER_SCISSORS_BUTTONS
+from lexicon import LEXICON
+from middlewares import (LocaleMiddleware, SessionMiddleware, StorageMiddleware,
+                         UserLockMiddleware)
+from webhook import UpdateScheduler
+
+from .mock_session import MockSession
+from .stats import format_latency, percentile
+from .updates import UpdateFactory
+
+
+@dataclass(slots=True)
+class Report:
+    updates: int = 0
+    elapsed: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    loop_lags: list[float] = field(default_factory=list)
+    errors: Counter[str] = field(default_factory=Counter)
+    unhandled: int = 0
+    rss_before: int = 0
+    rss_peak: int = 0
+    rss_after: int = 0
+    api_calls: int | None = None
+    resident_users: int | None = None
+    history_rows: int | None = None
+    checked_users: int | None = None
+    reloads: list[float] | None = None  # Время перезагрузок хэндлеров
+    reload_pauses: list[float] | None = None  # Время подмены роутера в цикле событий
+
+    @property
+    def throughput(self) -> float:
+        return self.updates / self.elapsed if self.elapsed else 0.0
+
+
+def rss() -> int:
+    """Текущий размер резидентной памяти процесса в байтах"""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Вне Linux доступен только пик, в килобайтах
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def monitor(report: Report, interval: float) -> None:
+    """Замеряет задержку цикла событий и пик памяти, пока идет прогон"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        report.loop_lags.append(loop.time() - started - interval)
+        report.rss_peak = max(report.rss_peak, rss())
+
+
+def read_updates(path: str) -> list[dict]:
+    """Читает записанные апдейты: по одному JSON-объекту Telegram Update в строке"""
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def write_updates(path: str, updates: Iterable[dict]) -> None:
+    with open(path, 'w', encoding='utf-8') as file:
+        for update in updates:
+            file.write(json.dumps(update, ensure_ascii=False) + '\n')
+
+
+def build(
+        *, api_delay: float, api_jitter: float, backend: str, path: str, columnar: bool,
+        seed: int, history: str | None = None
+) -> tuple[Bot, Dispatcher, UserStore]:
+    """Собирает бота, диспетчер и хранилище так же, как bot.py"""
+    # Исходы игр воспроизводятся от прогона к прогону
+    services.RANDOMNESS.reseed(seed)
+    bot = Bot(token='123456:TEST', session=MockSession(delay=api_delay, jitter=api_jitter))
+    dp = Dispatcher()
+    dp.include_router(router)
+
+    store = UserStore(
+        create_storage(backend, path=path), cache=UserRegistry() if columnar else None
+    )
+    sessions = SessionManager(store)
+    dp.update.outer_middleware(UserLockMiddleware())
+    dp.update.outer_middleware(SessionMiddleware(sessions))
+    dp.update.outer_middleware(StorageMiddleware(store))
+    locale = LocaleMiddleware(LEXICON)
+    dp.update.outer_middleware(locale)
+    # Перезагрузчик хэндлеров держим в данных диспетчера, как и журнал раундов
+    dp['reloader'] = HotReloader(dp, locale)
+    # Хранилище прогона пустое, поэтому таблицы лидеров заполняют сами хэндлеры
+    dp['leaderboards'] = Leaderboards()
+    if history:
+        # Журнал раундов передается хэндлерам через данные диспетчера
+        dp['history'] = GameHistory(history)
+        dp['history'].open()
+    return bot, dp, store
+
+
+async def reload_loop(reloader: HotReloader, interval: float) -> None:
+    """Перезагружает хэндлеры каждые interval секунд"""
+    while True:
+        await asyncio.sleep(interval)
+        await reloader.reload()
+
+
+async def run(
+        payloads: list[dict], *, rate: float, concurrency: int, lag_interval: float,
+        reload_interval: float = 0, **options
+) -> Report:
+    bot, dp, store = build(**options)
+    report = Report(updates=len(payloads))
+    accepted: dict[int, float] = {}
+
+    async def process(update: Update) -> None:
+        try:
+            result = await dp.feed_update(bot, update, UsersStorage=store)
+        except Exception as error:
+            report.errors[type(error).__name__] += 1
+        else:
+            if result is UNHANDLED:
+                report.unhandled += 1
+        finally:
+            report.latencies.append(time.perf_counter() - accepted[update.update_id])
+
+    scheduler = UpdateScheduler(process, max_concurrency=concurrency)
+    updates = [Update.model_validate(payload, context={'bot': bot}) for payload in payloads]
+
+    store.start()
+    history = dp.workflow_data.get('history')
+    if history is not None:
+        history.start()
+    report.rss_before = report.rss_peak = rss()
+    watcher = asyncio.create_task(monitor(report, lag_interval))
+    reloader: HotReloader = dp['reloader']
+    reloading = None
+    if reload_interval:
+        reloading = asyncio.create_task(reload_loop(reloader, reload_interval))
+
+    started = time.perf_counter()
+    for n, update in enumerate(updates):
+        await pace(started, n, rate)
+        accepted[update.update_id] = time.perf_counter()
+        await scheduler.submit(update)
+    await scheduler.join()
+    report.elapsed = time.perf_counter() - started
+
+    watcher.cancel()
+    if reloading is not None:
+        reloading.cancel()
+        report.reloads, report.reload_pauses = reloader.latencies, reloader.pauses
+        report.errors['reload'] = reloader.failures
+        report.errors += Counter()
+    report.rss_after = rss()
+    report.api_calls = sum(bot.session.calls.values())
+    report.resident_users = len(store)
+    await store.close()
+    if history is not None:
+        await history.close()
+        report.history_rows = history.log.rows
+    return report
+
+
+async def pace(started: float, n: int, rate: float) -> None:
+    # Открытая модель нагрузки: апдейты приходят по расписанию,
+    # независимо от того, успевает ли бот их обработать
+    if rate:
+        delay = started + n / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def count_rounds(payloads: Iterable[dict]) -> Counter[int]:
+    """
+    Считает ходы в камне, ножницах, бумаге каждого пользователя. Каждый ход
+    засчитывается как сыгранная игра при любом выборе бота, поэтому число игр
+    не зависит ни от случайности, ни от порядка обработки апдейтов
+    """
+    rounds: Counter[int] = Counter()
+    for payload in payloads:
+        callback = payload.get('callback_query')
+        if callback is not None and callback['data'] in ROCK_PAPER_SCISSORS_BUTTONS:
+            rounds[callback['from']['id']] += 1
+    return rounds
+
+
+async def read_rounds(path: str) -> Counter[int]:
+    """Читает из файла SQLite число игр в камень, ножницы, бумагу каждого пользователя"""
+    storage = SQLiteStorage(path)
+    rounds: Counter[int] = Counter()
+    try:
+        async for records in storage.scan():
+            for user_id, record in records.items():
+                rounds[user_id] = load_user(json.loads(record)).rock_paper_scissors.total_games
+    finally:
+        await storage.close()
+    return rounds
+
+
+async def run_cluster(
+        payloads: list[dict], *, workers: int, rate: float, lag_interval: float,
+        worker_args: list[str], restart: bool = False, storage_path: str | None = None
+) -> Report:
+    """
+    Прогоняет апдейты через воркеры. Если задан storage_path (файл SQLite
+    воркеров), после прогона счетчики игр сверяются с потоком апдейтов
+    """
+    report = Report(updates=len(payloads))
+    if storage_path is not None:
+        # Профили, сохраненные до прогона, тоже учитываются
+        expected = await read_rounds(storage_path) + count_rounds(payloads)
+    accepted: dict[int, float] = {}
+
+    def on_ack(seq: int, status: str) -> None:
+        submitted = accepted.pop(seq, None)
+        if submitted is None:
+            return
+        report.latencies.append(time.perf_counter() - submitted)
+        if status == 'unhandled':
+            report.unhandled += 1
+        elif status != 'ok':
+            report.errors[status] += 1
+
+    front = ClusterFront(
+        workers, lambda n: [sys.executable, '-m', 'loadtest.harness', '--serve-worker', *worker_args],
+        on_ack=on_ack
+    )
+    # Фронт пересылает сырой JSON, поэтому сериализуем апдейты заранее
+    frames = [(json.dumps(payload).encode(), get_payload_key(payload)) for payload in payloads]
+
+    front.start()
+    # Прогреваем воркеры: ждем, пока каждый поднимется и ответит на /help
+    warmup = json.dumps(UpdateFactory(1).message(0, '/help')).encode()
+    for link in front.links:
+        await link.send(-1 - link.index, warmup)
+    await front.join()
+
+    report.rss_before = report.rss_peak = rss()
+    watcher = asyncio.create_task(monitor(report, lag_interval))
+
+    started = time.perf_counter()
+    restarting = None
+    for n, (payload, key) in enumerate(frames):
+        if restart and n == len(frames) // 2:
+            # На середине прогона по очереди перезапускаем воркеры
+            restarting = asyncio.create_task(front.restart())
+        await pace(started, n, rate)
+        # Номер апдейта фронт назначит следующим по порядку
+        accepted[n + 1] = time.perf_counter()
+        await front.submit(payload, key)
+    if restarting is not None:
+        await restarting
+    await front.join()
+    report.elapsed = time.perf_counter() - started
+
+    watcher.cancel()
+    report.rss_after = rss()
+    await front.close()
+    # Каждый апдейт должен быть подтвержден ровно один раз
+    report.errors['lost'] = len(accepted)
+    if storage_path is not None:
+        # Воркеры сохраняют профили при выходе, поэтому файл уже полон
+        rounds = await read_rounds(storage_path)
+        report.checked_users = len(expected)
+        report.errors['counters'] = sum(rounds[user_id] != n for user_id, n in expected.items())
+    report.errors += Counter()
+    return report
+
+
+async def serve(concurrency: int, **options) -> None:
+    """Воркер для --workers: обрабатывает апдейты, присланные фронтом"""
+    bot, dp, store = build(**options)
+    store.start()
+    try:
+        await serve_worker(dp, bot, max_concurrency=concurrency, UsersStorage=store)
+    finally:
+        await store.close()
+
+
+def print_report(report: Report) -> None:
+    mib = 2 ** 20
+    print(f'Апдейтов: {report.updates}, за {report.elapsed:.2f} с, '
+          f'пропускная способность: {report.throughput:.0f} апдейтов/с')
+    print(f'Задержка обработки: {format_latency(report.latencies)}')
+    print(f'Задержка цикла событий: {format_latency(report.loop_lags)}, '
+          f'макс={max(report.loop_lags, default=0) * 1000:.2f}ms')
+    print(f'Память (RSS): до {report.rss_before / mib:.1f} МБ, пик {report.rss_peak / mib:.1f} МБ, '
+          f'после {report.rss_after / mib:.1f} МБ, рост {(report.rss_after - report.rss_before) / mib:+.1f} МБ')
+    if report.api_calls is not None:
+        print(f'Профилей в памяти: {report.resident_users}, запросов к Bot API: {report.api_calls}')
+    if report.history_rows is not None:
+        print(f'Раундов в журнале: {report.history_rows}')
+    if report.checked_users is not None:
+        print(f'Счетчики игр сверены у {report.checked_users} пользователей, '
+              f'расхождений: {report.errors["counters"]}')
+    if report.reloads is not None:
+        print(f'Перезагрузок хэндлеров: {len(report.reloads)}, '
+              f'время: {format_latency(report.reloads)}, '
+              f'подмена: макс={max(report.reload_pauses, default=0) * 1000:.3f}ms')
+    print(f'Ошибок хэндлеров: {dict(report.errors) or 0}, необработанных апдейтов: {report.unhandled}')
+
+
+def check(report: Report, args: argparse.Namespace) -> list[str]:
+    """Возвращает список нарушенных порогов"""
+    failures = []
+    p99 = percentile(report.latencies, 99) * 1000
+    if args.max_p99_ms is not None and p99 > args.max_p99_ms:
+        failures.append(f'p99 задержки {p99:.2f}ms > {args.max_p99_ms}ms')
+    if args.min_throughput is not None and report.throughput < args.min_throughput:
+        failures.append(f'пропускная способность {report.throughput:.0f} < {args.min_throughput}')
+    errors = sum(report.errors.values()) + report.unhandled
+    if args.max_errors is not None and errors > args.max_errors:
+        failures.append(f'ошибок и необработанных апдейтов {errors} > {args.max_errors}')
+    growth = (report.rss_after - report.rss_before) / 2 ** 20
+    if args.max_memory_growth_mb is not None and growth > args.max_memory_growth_mb:
+        failures.append(f'рост памяти {growth:.1f} МБ > {args.max_memory_growth_mb} МБ')
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    source = parser.add_argument_group('поток апдейтов')
+    source.add_argument('--replay', help='файл с записанными апдейтами (JSON в каждой строке)')
+    source.add_argument('--save', help='записать синтетический поток в файл и выйти')
+    source.add_argument('--sessions', type=int, default=2000)
+    source.add_argument('--users', type=int, default=1000)
+    source.add_argument('--rounds', type=int, default=3)
+    source.add_argument('--languages', default='ru,en')
+    source.add_argument('--seed', type=int, default=0)
+
+    load = parser.add_argument_group('нагрузка')
+    load.add_argument('--rate', type=float, default=0, help='апдейтов в секунду, 0 — все сразу')
+    load.add_argument('--concurrency', type=int, default=64)
+    load.add_argument('--api-delay', type=float, default=0.01)
+    load.add_argument('--api-jitter', type=float, default=0.005)
+    load.add_argument('--storage', default='memory', choices=('memory', 'sqlite'))
+    load.add_argument('--storage-path', default=':memory:')
+    load.add_argument('--columnar', action='store_true')
+    load.add_argument('--history', help='каталог журнала раундов (без --workers)')
+    load.add_argument('--lag-interval', type=float, default=0.01)
+    load.add_argument('--workers', type=int, default=0, help='число процессов-воркеров, 0 — без них')
+    load.add_argument('--restart', action='store_true',
+                      help='перезапустить воркеры на середине прогона')
+    load.add_argument('--reload-interval', type=float, default=0,
+                      help='перезагружать хэндлеры каждые N секунд (без --workers)')
+    load.add_argument('--serve-worker', action='store_true', help=argparse.SUPPRESS)
+
+    limits = parser.add_argument_group('пороги')
+    limits.add_argument('--max-p99-ms', type=float)
+    limits.add_argument('--min-throughput', type=float)
+    limits.add_argument('--max-errors', type=int)
+    limits.add_argument('--max-memory-growth-mb', type=float)
+    args = parser.parse_args()
+
+    options = dict(
+        api_delay=args.api_delay, api_jitter=args.api_jitter, backend=args.storage,
+        path=args.storage_path, columnar=args.columnar, seed=args.seed, history=args.history
+    )
+    if args.serve_worker:
+        asyncio.run(serve(args.concurrency, **options))
+        return
+
+    if args.replay:
+        payloads = read_updates(args.replay)
+    else:
+        factory = UpdateFactory(
+            args.users, seed=args.seed, languages=tuple(args.languages.split(','))
+        )
+        payloads = list(factory.stream(args.sessions, args.rounds))
+    if args.save:
+        write_updates(args.save, payloads)
+        print(f'Записано апдейтов: {len(payloads)}')
+        return
+
+    if args.workers:
+        with ExitStack() as stack:
+            if args.restart and (args.storage == 'memory' or args.storage_path == ':memory:'):
+                # Профили в памяти воркера пропали бы при перезапуске, поэтому
+                # воркеры пишут в общий временный файл SQLite
+                directory = stack.enter_context(tempfile.TemporaryDirectory())
+                args.storage, args.storage_path = 'sqlite', f'{directory}/users.sqlite3'
+            # Воркеры собирают то же окружение из тех же параметров
+            worker_args = [
+                f'--concurrency={args.concurrency}', f'--api-delay={args.api_delay}',
+                f'--api-jitter={args.api_jitter}', f'--storage={args.storage}',
+                f'--storage-path={args.storage_path}', f'--seed={args.seed}',
+                *(['--columnar'] if args.columnar else [])
+            ]
+            report = asyncio.run(run_cluster(
+                payloads, workers=args.workers, rate=args.rate, lag_interval=args.lag_interval,
+                worker_args=worker_args, restart=args.restart,
+                storage_path=args.storage_path if args.restart else None
+            ))
+    else:
+        report = asyncio.run(run(
+            payloads, rate=args.rate, concurrency=args.concurrency,
+            lag_interval=args.lag_interval, reload_interval=args.reload_interval, **options
+        ))
+    print_report(report)
+
+    failures = check(report, args)
+    for failure in failures:
+        print(f'Порог нарушен: {failure}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
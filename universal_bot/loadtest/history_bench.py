@@ -0,0 +1,183 @@
+"""
+Замер записи раундов в журнал истории и чтения статистики из агрегатов.
+
+Раунды пишутся через GameHistory.record внутри цикла событий, пока фоновая
+задача сбрасывает сегменты на диск, как в боте. Затем считается размер
+журнала на диске в сравнении с JSON-строками, время статистики игрока из
+агрегатов против пересчета по журналу, время уплотнения и время запуска со
+снимком агрегатов и без него. В конце проверяется запуск после сбоя, когда
+во время уплотнения фоновая задача успела записать новый сегмент: каждый
+раунд должен быть учтен ровно один раз, иначе замер завершается с кодом 1.
+Запуск из каталога universal_bot:
+    python -m loadtest.history_bench --events 1000000 --users 100000
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from database import Games
+from history import GameHistory
+from history.log import RESULTS
+
+from .stats import format_latency
+
+
+def generate(events: int, users: int, seed: int) -> list[tuple]:
+    rnd = random.Random(seed)
+    started = time.time() - events  # по раунду в секунду
+    rounds = []
+    for n in range(events):
+        game = rnd.choice((Games.RockPaperScissors, Games.NumberGuessing))
+        if game is Games.RockPaperScissors:
+            user_choice, bot_choice = rnd.randrange(3), rnd.randrange(3)
+        else:
+            user_choice, bot_choice = rnd.randint(1, 100), rnd.randint(1, 100)
+        rounds.append((
+            rnd.randrange(users) + 10_000, game, user_choice, bot_choice,
+            rnd.choice(RESULTS), started + n
+        ))
+    return rounds
+
+
+async def check_compaction(rounds: list[tuple]) -> int:
+    """
+    Пишет раунды мелкими сегментами и уплотняет журнал, пока между снимком
+    агрегатов и слиянием сегментов сбрасывается еще один сегмент. Затем
+    запускает историю заново без снимка при выходе, как после сбоя, и
+    возвращает, на сколько раундов больше или меньше она насчитала
+    """
+    directory = Path(tempfile.mkdtemp(prefix='history-check-'))
+    try:
+        history = GameHistory(directory, segment_rows=len(rounds))
+        history.open()
+        half = len(rounds) // 2
+        for n in range(0, half, 5):
+            for event in rounds[n:min(n + 5, half)]:
+                history.record(*event)
+            await history.log.flush()
+
+        async def flush_during_compaction() -> None:
+            # Уплотнение уже сбросило журнал и пишет снимок, а раунды
+            # продолжают приходить и уходят на диск новым сегментом
+            for event in rounds[half:]:
+                history.record(*event)
+            await history.log.flush()
+
+        await asyncio.gather(history.compact(), flush_during_compaction())
+        await history.log.flush()
+
+        reopened = GameHistory(directory)
+        reopened.open()
+        counted = sum(totals.games for totals in reopened.aggregates.games.values())
+        await history.log.close()
+        return counted - len(rounds)
+    finally:
+        shutil.rmtree(directory)
+
+
+async def run(*, events: int, users: int, segment_rows: int, flush_interval: float,
+              seed: int) -> int:
+    directory = Path(tempfile.mkdtemp(prefix='history-bench-'))
+    try:
+        rounds = generate(events, users, seed)
+        history = GameHistory(
+            directory, segment_rows=segment_rows, flush_interval=flush_interval
+        )
+        history.open()
+        history.start()
+
+        # Запись: отдаем управление циклу событий каждые 256 раундов, чтобы
+        # фоновый сброс шел вперемешку с записью, как между апдейтами
+        pauses = []
+        started = time.perf_counter()
+        for n in range(0, events, 256):
+            for event in rounds[n:n + 256]:
+                history.record(*event)
+            pause = time.perf_counter()
+            await asyncio.sleep(0)
+            pauses.append(time.perf_counter() - pause)
+        elapsed = time.perf_counter() - started
+        await history.log.flush()
+        print(f'Запись: {events} раундов за {elapsed:.2f} с — {events / elapsed:,.0f} раундов/с, '
+              f'{elapsed / events * 1e6:.2f} мкс на раунд')
+        print(f'Паузы цикла событий между пачками: {format_latency(pauses)}')
+
+        size = history.log.disk_size()
+        raw = sum(
+            len(json.dumps([u, g.value, a, b, r, t])) + 1 for u, g, a, b, r, t in rounds
+        )
+        print(f'Журнал на диске: {size / 2 ** 20:.2f} МБ в {len(history.log.segments)} сегментах, '
+              f'{size / events:.2f} байта на раунд (JSON-строки: {raw / events:.1f}, '
+              f'сжатие {raw / size:.1f}x)')
+
+        # Статистика: готовые счетчики против пересчета по журналу
+        user_id, game = rounds[-1][0], rounds[-1][1]
+        lookups = 100000
+        started = time.perf_counter()
+        for _ in range(lookups):
+            history.player(user_id, game)
+            history.totals(game)
+        lookup = (time.perf_counter() - started) / lookups
+        started = time.perf_counter()
+        wins = sum(
+            event.result == 'win' for event in history.log.scan()
+            if event.user_id == user_id and event.game is game
+        )
+        rescan = time.perf_counter() - started
+        assert wins == history.player(user_id, game).wins
+        print(f'Статистика игрока: из агрегатов {lookup * 1e6:.2f} мкс, '
+              f'пересчетом по журналу {rescan * 1000:.0f} мс')
+
+        segments = len(history.log.segments)
+        started = time.perf_counter()
+        removed = await history.compact()
+        compact = time.perf_counter() - started
+        print(f'Уплотнение: {segments} -> {len(history.log.segments)} сегментов '
+              f'(слито {removed}) за {compact:.2f} с, '
+              f'на диске {history.log.disk_size() / 2 ** 20:.2f} МБ')
+        await history.close()
+
+        started = time.perf_counter()
+        reopened = GameHistory(directory)
+        replayed = reopened.open()
+        with_snapshot = time.perf_counter() - started
+        (directory / 'aggregates.json').unlink()
+        started = time.perf_counter()
+        rebuilt = GameHistory(directory)
+        replayed_all = rebuilt.open()
+        without_snapshot = time.perf_counter() - started
+        assert rebuilt.aggregates.dump()['games'] == reopened.aggregates.dump()['games']
+        print(f'Запуск: со снимком {with_snapshot:.2f} с (дочитано {replayed} раундов), '
+              f'без снимка {without_snapshot:.2f} с (дочитано {replayed_all})')
+    finally:
+        shutil.rmtree(directory)
+
+    extra = await check_compaction(rounds[:100])
+    print(f'Запуск после сбоя во время уплотнения: '
+          f'{"все раунды учтены" if not extra else f"лишних раундов {extra:+d}"}')
+    return extra
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--segment-rows', type=int, default=65536)
+    parser.add_argument('--flush-interval', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    extra = asyncio.run(run(
+        events=args.events, users=args.users, segment_rows=args.segment_rows,
+        flush_interval=args.flush_interval, seed=args.seed
+    ))
+    sys.exit(1 if extra else 0)
+
+
+if __name__ == '__main__':
+    main()
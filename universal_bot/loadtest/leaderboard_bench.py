@@ -0,0 +1,112 @@
+"""
+Замер таблицы лидеров на дереве Фенвика против сортировки всех игроков.
+
+Таблица заполняется игроками со случайными результатами одной пачкой, как
+при запуске бота. Затем измеряются обновление результата игрока после
+сыгранной игры, место игрока и топ-10, а для сравнения — построение того же
+топа и места сортировкой всех игроков, как пришлось бы делать без индекса.
+Отдельно проверяется, что дерево растет по числу различных ключей, а не по
+числу побед лучшего игрока, и скрипт завершается с кодом 1, если это не так.
+Запуск из каталога universal_bot:
+    python -m loadtest.leaderboard_bench --players 1000000
+"""
+import argparse
+import random
+import sys
+import time
+
+from database import FenwickTree, Leaderboard
+
+
+def check_size(*, players: int, wins: int) -> list[str]:
+    """Проверяет размер деревьев и возвращает описания нарушений"""
+    failed = []
+    tree = FenwickTree()
+    tree.grow(5000)
+    if len(tree) != 8192:
+        failed.append(f'FenwickTree.grow(5000): {len(tree)} счетчиков вместо 8192')
+
+    # Один игрок с большим числом побед среди обычных игроков
+    board = Leaderboard()
+    board.extend((user_id, 1, 1 + user_id % 3) for user_id in range(1, players + 1))
+    started = time.perf_counter()
+    for won in range(1, wins + 1):
+        board.update(0, won, won)
+    elapsed = time.perf_counter() - started
+    distinct = len({Leaderboard.key(1, 1 + user_id % 3) for user_id in range(1, players + 1)})
+    size = len(board._tree)
+    print(f'Игрок с {wins} победами: дерево из {size} счетчиков, '
+          f'обновление {elapsed / wins * 1e6:.2f} мкс')
+    if size > 4 * (distinct + 1) + 256:
+        failed.append(f'дерево из {size} счетчиков при {distinct + 1} различных ключах')
+    if board.top(1)[0][1:] != (0, wins, 100) or board.rank(0) != 1:
+        failed.append(f'лидер: {board.top(1)}, место {board.rank(0)}')
+    return failed
+
+
+def run(*, players: int, operations: int, seed: int) -> list[str]:
+    rnd = random.Random(seed)
+    profiles = {}
+    for user_id in range(10_000, 10_000 + players):
+        games = rnd.randrange(1, 500)
+        profiles[user_id] = [rnd.randint(0, games), games]
+    user_ids = list(profiles)
+
+    board = Leaderboard()
+    started = time.perf_counter()
+    board.extend((user_id, wins, games) for user_id, (wins, games) in profiles.items())
+    print(f'Построение: {players} игроков за {time.perf_counter() - started:.2f} с')
+
+    # Обновление: игрок сыграл еще одну игру
+    sample = [rnd.choice(user_ids) for _ in range(operations)]
+    started = time.perf_counter()
+    for user_id in sample:
+        profile = profiles[user_id]
+        profile[0] += rnd.random() < 0.5
+        profile[1] += 1
+        board.update(user_id, *profile)
+    update = (time.perf_counter() - started) / operations
+
+    started = time.perf_counter()
+    for user_id in sample:
+        board.rank(user_id)
+    rank = (time.perf_counter() - started) / operations
+
+    tops = max(1, operations // 100)
+    started = time.perf_counter()
+    for _ in range(tops):
+        top = board.top(10)
+    top_time = (time.perf_counter() - started) / tops
+    print(f'Индекс: обновление {update * 1e6:.2f} мкс, место {rank * 1e6:.2f} мкс, '
+          f'топ-10 {top_time * 1e6:.1f} мкс')
+
+    # Без индекса: сортируем всех игроков по тому же ключу
+    started = time.perf_counter()
+    ordered = sorted(
+        user_ids, key=lambda user_id: (-Leaderboard.key(*profiles[user_id]), user_id)
+    )
+    sort = time.perf_counter() - started
+    key = Leaderboard.key(*profiles[sample[-1]])
+    assert [user_id for _, user_id, *_ in top] == ordered[:10]
+    assert board.rank(sample[-1]) == 1 + sum(
+        Leaderboard.key(*profile) > key for profile in profiles.values()
+    )
+    print(f'Сортировка всех игроков: {sort * 1000:.0f} мс на запрос, '
+          f'в {sort / top_time:,.0f} раз дольше топа по индексу')
+    return check_size(players=min(players, 10000), wins=65535)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--players', type=int, default=1000000)
+    parser.add_argument('--operations', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    failed = run(players=args.players, operations=args.operations, seed=args.seed)
+    if failed:
+        print('Проверки не пройдены: ' + '; '.join(failed))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
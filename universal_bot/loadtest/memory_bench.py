@@ -0,0 +1,60 @@
+"""
+Замер памяти на одного пользователя: словарь объектов User против UserRegistry.
+
+Реестр хранит профиль примерно в 8 раз компактнее (не на порядок), но
+заполняется в несколько раз медленнее словаря: каждое обращение создает
+объект-представление и проходит по индексу на Python. Выводятся обе цифры.
+Запуск из каталога universal_bot:
+    python -m loadtest.memory_bench --users 10000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from database import User, UserRegistry
+
+
+def measure(name: str, users: int, fill) -> tuple[float, float]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    storage = fill(users)
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_user = size / users
+    print(f'{name:<14} {per_user:8.1f} байт/польз. {size / 2 ** 20:10.1f} МиБ {elapsed:8.1f} с')
+    del storage
+    return per_user, elapsed
+
+
+def fill_dict(users: int) -> dict[int, User]:
+    storage = {}
+    for user_id in range(1, users + 1):
+        user = storage[user_id] = User()
+        user.rock_paper_scissors.total_games += 1
+    return storage
+
+
+def fill_registry(users: int) -> UserRegistry:
+    storage = UserRegistry()
+    for user_id in range(1, users + 1):
+        storage.get_or_create(user_id).rock_paper_scissors.total_games += 1
+    return storage
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    baseline, baseline_time = measure('dict[int, User]', args.users, fill_dict)
+    columnar, columnar_time = measure('UserRegistry', args.users, fill_registry)
+    print(f'Экономия памяти: в {baseline / columnar:.1f} раза, '
+          f'заполнение медленнее в {columnar_time / baseline_time:.1f} раза')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Замер накладных расходов сбора метрик на обработку апдейта.
+
+Сначала отдельно замеряется стоимость самих мидлварей метрик на апдейт с
+одним хэндлером и тремя запросами к Bot API. Затем один и тот же поток
+игровых сессий прогоняется через диспетчер с хранилищем, локалями и
+роутером бота: без метрик, с метриками и с метриками и трассировкой части
+апдейтов. Каждый вариант повторяется несколько раз, в зачет идет лучший
+прогон. Запуск из каталога universal_bot:
+    python -m loadtest.metrics_bench --sessions 500 --repeats 5
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import SendMessage
+from aiogram.types import Update
+
+import handlers
+from database import MemoryStorage, UserStore
+from lexicon import LEXICON
+from metrics import Metrics, TimedStorage
+from middlewares import (ApiMetricsMiddleware, HandlerMetricsMiddleware, LocaleMiddleware,
+                         StorageMiddleware, UpdateMetricsMiddleware, setup_metrics)
+
+from .mock_session import MockSession
+from .updates import UpdateFactory
+
+
+# Запросов к Bot API на один апдейт в замере мидлварей
+API_CALLS = 3
+
+
+async def measure_middlewares(rounds: int, trace_sample_rate: float) -> tuple[float, float]:
+    """Возвращает время апдейта с пустыми хэндлером и запросами без метрик и с ними"""
+    bot = Bot(token='123456:TEST', session=MockSession())
+    update = Update.model_validate(UpdateFactory().message(1, '/help'), context={'bot': bot})
+    method = SendMessage(chat_id=1, text='...')
+    data = {'handler': handlers.router.message.handlers[0], 'event_from_user': update.message.from_user}
+
+    metrics = Metrics()
+    outer = UpdateMetricsMiddleware(metrics, trace_sample_rate=trace_sample_rate)
+    inner = HandlerMetricsMiddleware(metrics)
+    api = ApiMetricsMiddleware(metrics)
+
+    async def make_request(bot, method):
+        return None
+
+    async def plain_handler(event, data):
+        for _ in range(API_CALLS):
+            await make_request(bot, method)
+
+    async def instrumented_handler(event, data):
+        for _ in range(API_CALLS):
+            await api(make_request, bot, method)
+
+    async def plain(event, data):
+        return await plain_handler(event, data)
+
+    async def instrumented(event, data):
+        return await outer(lambda e, d: inner(instrumented_handler, e, d), event, data)
+
+    timings = []
+    for call in (plain, instrumented):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await call(update, data)
+        timings.append((time.perf_counter() - started) / rounds)
+    return timings[0], timings[1]
+
+
+async def measure(payloads: list[dict], *, metrics: Metrics | None,
+                  trace_sample_rate: float = 0.0) -> float:
+    bot = Bot(token='123456:TEST', session=MockSession())
+    dp = Dispatcher()
+    dp.include_router(handlers.router)
+
+    storage = MemoryStorage()
+    if metrics is not None:
+        setup_metrics(dp, bot, metrics, trace_sample_rate=trace_sample_rate)
+        storage = TimedStorage(storage, metrics)
+    store = UserStore(storage)
+    dp.update.outer_middleware(StorageMiddleware(store))
+    dp.update.outer_middleware(LocaleMiddleware(LEXICON))
+
+    updates = [Update.model_validate(payload, context={'bot': bot}) for payload in payloads]
+    gc.collect()
+    gc.disable()
+    started = time.perf_counter()
+    for update in updates:
+        try:
+            await dp.feed_update(bot, update, UsersStorage=store)
+        except Exception:
+            pass
+    elapsed = (time.perf_counter() - started) / len(updates)
+    gc.enable()
+
+    # Роутер можно подключить только к одному диспетчеру, поэтому отвязываем
+    # его перед следующим прогоном
+    dp.sub_routers.remove(handlers.router)
+    handlers.router._parent_router = None
+    return elapsed
+
+
+async def run(*, sessions: int, repeats: int, rounds: int, trace_sample_rate: float) -> None:
+    payloads = list(UpdateFactory(sessions, languages=('ru', 'en')).stream(sessions))
+    # Трассировки пишутся в лог, но для замера их вывод не нужен
+    logging.disable(logging.INFO)
+
+    for rate in (0.0, trace_sample_rate):
+        plain, instrumented = min(
+            [await measure_middlewares(rounds, rate) for _ in range(repeats)],
+            key=lambda timings: timings[1] - timings[0]
+        )
+        print(f'Мидлвари метрик (трассировка {rate:.0%}): '
+              f'{(instrumented - plain) * 1e6:.2f} мкс на апдейт с {API_CALLS} запросами к Bot API')
+
+    variants = {
+        'без метрик': {'metrics': None},
+        'метрики': {'metrics': Metrics()},
+        f'метрики + трассировка {trace_sample_rate:.0%}': {
+            'metrics': Metrics(), 'trace_sample_rate': trace_sample_rate
+        },
+    }
+    best = {name: float('inf') for name in variants}
+    for _ in range(repeats):
+        for name, kwargs in variants.items():
+            best[name] = min(best[name], await measure(payloads, **kwargs))
+
+    baseline = best['без метрик']
+    print(f'\nАпдейтов в прогоне через диспетчер: {len(payloads)}')
+    for name, elapsed in best.items():
+        overhead = (elapsed - baseline) / baseline
+        print(f'{name:<28} {elapsed * 1e6:8.1f} мкс/апдейт  накладные расходы: {overhead:+.1%}')
+
+    lines = variants['метрики']['metrics'].render().splitlines()
+    print(f'Строк в выдаче /metrics: {len(lines)}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sessions', type=int, default=500)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=100000)
+    parser.add_argument('--trace-sample-rate', type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(run(
+        sessions=args.sessions, repeats=args.repeats, rounds=args.rounds,
+        trace_sample_rate=args.trace_sample_rate
+    ))
+
+
+if __name__ == '__main__':
+    main()
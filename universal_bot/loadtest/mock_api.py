@@ -0,0 +1,79 @@
+import asyncio
+import time
+from collections import Counter, deque
+
+from aiohttp import web
+
+
+# Локальный сервер, имитирующий Bot API: отвечает на запросы бота без сети,
+# добавляет настраиваемую задержку и, как настоящий Telegram, возвращает
+# 429 retry_after при превышении лимитов отправки сообщений в чат и в целом
+class MockBotAPI:
+    def __init__(
+            self, *, latency: float = 0.0, chat_limit: int = 3, global_limit: int = 30,
+            retry_after: int = 1
+    ) -> None:
+        self.latency = latency
+        self.chat_limit = chat_limit  # Сообщений в один чат за секунду
+        self.global_limit = global_limit  # Сообщений во все чаты за секунду
+        self.retry_after = retry_after
+        self.calls: Counter[str] = Counter()
+        self.flood_errors = 0
+        self._chat_sent: dict[str, deque[float]] = {}
+        self._global_sent: deque[float] = deque()
+        self._message_id = 0
+        self._runner: web.AppRunner | None = None
+        self.url = ''
+
+    @staticmethod
+    def _over_limit(sent: deque[float], limit: int, now: float) -> bool:
+        while sent and now - sent[0] >= 1:
+            sent.popleft()
+        if len(sent) >= limit:
+            return True
+        sent.append(now)
+        return False
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method'].lower()
+        params = dict(await request.post())
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method.startswith(('send', 'copy', 'forward', 'edit')):
+            now = time.monotonic()
+            chat_sent = self._chat_sent.setdefault(params.get('chat_id', ''), deque())
+            if (self._over_limit(chat_sent, self.chat_limit, now)
+                    or self._over_limit(self._global_sent, self.global_limit, now)):
+                self.flood_errors += 1
+                return web.json_response({
+                    'ok': False, 'error_code': 429,
+                    'description': f'Too Many Requests: retry after {self.retry_after}',
+                    'parameters': {'retry_after': self.retry_after}
+                }, status=429)
+
+        if method == 'sendmessage':
+            self._message_id += 1
+            result = {
+                'message_id': self._message_id, 'date': int(time.time()),
+                'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+                'text': params.get('text', '')
+            }
+        elif method == 'getme':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'bot', 'username': 'mock_bot'}
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8081) -> None:
+        app = web.Application()
+        app.router.add_route('*', '/bot{token}/{method}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.url = f'http://{host}:{port}'
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
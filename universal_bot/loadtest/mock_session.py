@@ -0,0 +1,46 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Message
+
+
+# Сессия бота, которая не ходит в сеть, а сразу отвечает правдоподобными
+# результатами. Позволяет гонять хэндлеры под нагрузкой без Telegram
+class MockSession(BaseSession):
+    def __init__(self, *, delay: float = 0.0, jitter: float = 0.0, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        # Имитация сетевой задержки одного запроса: delay + случайная добавка до jitter
+        self.delay = delay
+        self.jitter = jitter
+        self.calls: Counter[str] = Counter()
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.delay or self.jitter:
+            await asyncio.sleep(self.delay + random.random() * self.jitter)
+
+        returning = method.__returning__
+        if returning is Message:
+            self._message_id += 1
+            return Message(
+                message_id=self._message_id, date=int(time.time()),
+                chat=Chat(id=getattr(method, 'chat_id', 0), type='private'),
+                text=getattr(method, 'text', None)
+            ).as_(bot)
+        if returning is bool:
+            return True
+        return None
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        raise NotImplementedError
+        yield b''
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,122 @@
+"""
+Замер стоимости подготовки и отправки ответа на один апдейт.
+
+Для типичных ответов бота сравниваются прежний путь (str.format шаблона
+лексикона и сериализация клавиатуры при каждой отправке) и кэш ответов
+responses (скомпилированные шаблоны и заранее сериализованные клавиатуры).
+Сериализация замеряется без сети, отправка — через локальный имитатор Bot API.
+Запуск из каталога universal_bot:
+    python -m loadtest.response_bench --rounds 20000 --requests 2000
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.methods import SendMessage
+
+import keyboards
+from games import GAMES
+from lexicon import LEXICON
+from responses import PreparedSession
+
+from .mock_api import MockBotAPI
+
+
+CHAT_ID = 123456789
+TEXTS = LEXICON.default
+ROCK = TEXTS[keyboards.ROCK_PAPER_SCISSORS_BUTTONS['rock']]
+PLAY = LEXICON.key('/play')
+WIN = LEXICON.key('rock_paper_scissors.win')
+WELCOME = GAMES['rock_paper_scissors'].keys.welcome
+STAT = GAMES['number_guessing'].keys.stat
+
+# Ответ -> (сборка прежним способом, сборка через кэш ответов)
+SAMPLES: dict[str, tuple[Callable[[], SendMessage], Callable[[], SendMessage]]] = {
+    'выбор игры': (
+        lambda: SendMessage(chat_id=CHAT_ID, text=TEXTS[PLAY], reply_markup=GAMES.games_kb(TEXTS)),
+        lambda: SendMessage(chat_id=CHAT_ID, text=TEXTS[PLAY], reply_markup=GAMES.games_kb(TEXTS))
+    ),
+    'ход в КНБ': (
+        lambda: SendMessage(
+            chat_id=CHAT_ID, text=TEXTS[WIN].format(ROCK),
+            reply_markup=keyboards.yes_no_kb(TEXTS)
+        ),
+        lambda: SendMessage(
+            chat_id=CHAT_ID, text=TEXTS.format(WIN, ROCK),
+            reply_markup=keyboards.yes_no_kb(TEXTS)
+        )
+    ),
+    'начало КНБ': (
+        lambda: SendMessage(
+            chat_id=CHAT_ID, text=TEXTS[WELCOME],
+            reply_markup=keyboards.rock_paper_scissors_kb(TEXTS)
+        ),
+        lambda: SendMessage(
+            chat_id=CHAT_ID, text=TEXTS[WELCOME],
+            reply_markup=keyboards.rock_paper_scissors_kb(TEXTS)
+        )
+    ),
+    'статистика': (
+        lambda: SendMessage(chat_id=CHAT_ID, text=TEXTS[STAT].format(42, 17, 40)),
+        lambda: SendMessage(chat_id=CHAT_ID, text=TEXTS.format(STAT, 42, 17, 40))
+    ),
+}
+
+
+def measure_serialize(session: AiohttpSession, bot: Bot, build: Callable[[], SendMessage],
+                      rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        session.build_form_data(bot, build())()
+    return (time.perf_counter() - started) / rounds
+
+
+async def measure_send(bot: Bot, build: Callable[[], SendMessage], requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        await bot(build())
+    return (time.perf_counter() - started) / requests
+
+
+async def run(*, rounds: int, requests: int, port: int) -> None:
+    api = MockBotAPI(chat_limit=10 ** 9, global_limit=10 ** 9)
+    await api.start(port=port)
+    server = TelegramAPIServer.from_base(api.url)
+    legacy = Bot(token='123456:TEST', session=AiohttpSession(api=server))
+    prepared = Bot(token='123456:TEST', session=PreparedSession(api=server))
+
+    try:
+        print('Сериализация ответа, мкс на апдейт')
+        print(f'{"ответ":<14} {"прежде":>10} {"кэш":>10} {"ускорение":>10}')
+        for name, (old, new) in SAMPLES.items():
+            before = measure_serialize(legacy.session, legacy, old, rounds)
+            after = measure_serialize(prepared.session, prepared, new, rounds)
+            print(f'{name:<14} {before * 1e6:10.1f} {after * 1e6:10.1f} {before / after:9.2f}x')
+
+        print('\nОтправка ответа в имитатор Bot API, мкс на апдейт')
+        print(f'{"ответ":<14} {"прежде":>10} {"кэш":>10} {"ускорение":>10}')
+        for name, (old, new) in SAMPLES.items():
+            before = await measure_send(legacy, old, requests)
+            after = await measure_send(prepared, new, requests)
+            print(f'{name:<14} {before * 1e6:10.1f} {after * 1e6:10.1f} {before / after:9.2f}x')
+    finally:
+        await legacy.session.close()
+        await prepared.session.close()
+        await api.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rounds', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--port', type=int, default=8083)
+    args = parser.parse_args()
+    asyncio.run(run(rounds=args.rounds, requests=args.requests, port=args.port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Замер стоимости случайных исходов игр на один ход.
+
+Сравниваются прежние функции services (random.choice по списку, который
+собирается при каждом вызове, randint и словарь правил в get_winner) и сервис
+случайности: блоки исходов из os.urandom или из генератора с seed и таблица
+исходов. Замер идет внутри цикла событий, чтобы блоки готовились в фоне, как
+в боте. Отдельно проверяется равномерность исходов и воспроизводимость с seed.
+Запуск из каталога universal_bot:
+    python -m loadtest.rng_bench --rounds 200000
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from random import choice, randint
+from typing import Callable
+
+import services
+from services import Randomness
+
+
+def legacy_item() -> str:
+    return choice(['rock', 'paper', 'scissors'])
+
+
+def legacy_winner(user_choice: str, bot_choice: str) -> str:
+    rules = {'rock': 'scissors',
+             'scissors': 'paper',
+             'paper': 'rock'}
+    if user_choice == bot_choice:
+        return 'draw'
+    elif rules[user_choice] == bot_choice:
+        return 'win'
+    return 'lose'
+
+
+def legacy_number(start: int = 1, end: int = 100) -> int:
+    return randint(start, end)
+
+
+async def measure(func: Callable[[], object], rounds: int) -> float:
+    """Среднее время вызова в мкс; каждые 64 вызова отдаем управление циклу событий"""
+    elapsed = 0.0
+    for _ in range(rounds // 64):
+        started = time.perf_counter()
+        for _ in range(64):
+            func()
+        elapsed += time.perf_counter() - started
+        await asyncio.sleep(0)
+    return elapsed / (rounds // 64 * 64) * 1e6
+
+
+async def run(rounds: int) -> None:
+    seeded = Randomness(seed=0)
+    seeded_item = seeded.stream('rock_paper_scissors', services.ROCK_PAPER_SCISSORS_ITEMS)
+
+    samples = {
+        'выбор КНБ': (legacy_item, services.get_random_item, seeded_item),
+        'число 1..100': (
+            legacy_number, services.get_random_number, lambda: seeded.integers(1, 100)()
+        ),
+        'победитель КНБ': (
+            lambda: legacy_winner('rock', 'paper'),
+            lambda: services.get_winner('rock', 'paper'),
+            lambda: services.get_winner('rock', 'paper')
+        ),
+    }
+
+    print('Стоимость одного исхода, мкс')
+    print(f'{"исход":<16} {"прежде":>8} {"urandom":>8} {"seed":>8} {"ускорение":>10}')
+    for name, (old, new, reproducible) in samples.items():
+        before = await measure(old, rounds)
+        after = await measure(new, rounds)
+        with_seed = await measure(reproducible, rounds)
+        print(f'{name:<16} {before:8.3f} {after:8.3f} {with_seed:8.3f} {before / after:9.2f}x')
+
+    counts = Counter(services.get_random_item() for _ in range(rounds))
+    spread = (max(counts.values()) - min(counts.values())) / (rounds / 3)
+    print(f'\nРаспределение выбора КНБ: {dict(counts)}, разброс {spread:.2%}')
+
+    first, second = Randomness(seed=42), Randomness(seed=42)
+    # Обращения к другому потоку не сдвигают последовательность игры
+    second.integers(1, 100)()
+    same = all(
+        first.stream('rock_paper_scissors', services.ROCK_PAPER_SCISSORS_ITEMS)()
+        == second.stream('rock_paper_scissors', services.ROCK_PAPER_SCISSORS_ITEMS)()
+        for _ in range(10000)
+    )
+    print(f'Воспроизводимость с seed: {"да" if same else "НЕТ"}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rounds', type=int, default=200000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rounds))
+
+
+if __name__ == '__main__':
+    main()
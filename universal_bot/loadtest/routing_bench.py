@@ -0,0 +1,122 @@
+"""
+Микро-бенчмарк стоимости маршрутизации одного апдейта: прежняя цепочка
+фильтров роутера против таблиц маршрутов handlers.RouteTable.
+
+Хэндлеры в обоих роутерах пустые, поэтому замер показывает только работу
+диспетчера по выбору хэндлера. Запуск из каталога universal_bot:
+    python -m loadtest.routing_bench --rounds 20000
+"""
+import argparse
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.filters import Command, CommandStart
+from aiogram.types import Update
+
+from handlers.routing import RouteTable, callback_data, message_text
+from keyboards import NO_CALLBACK, ROCK_PAPER_SCISSORS_BUTTONS, YES_CALLBACK
+
+from .mock_session import MockSession
+from .updates import UpdateFactory
+
+
+COMMANDS = ('help', 'play', 'roles', 'cancel', 'stat')
+GAMES = ('rock_paper_scissors', 'number_guessing')
+RPS_BUTTONS = tuple(ROCK_PAPER_SCISSORS_BUTTONS)
+
+
+async def noop(event) -> None:
+    pass
+
+
+def is_guess(message) -> bool:
+    return bool(message.text and message.text.isdigit() and 1 <= int(message.text) <= 100)
+
+
+def build_filter_chain_router() -> Router:
+    """Роутер с той же цепочкой фильтров, что была в handlers до таблиц маршрутов"""
+    router = Router()
+    router.message(CommandStart())(noop)
+    for command in COMMANDS[:3]:
+        router.message(Command(commands=command))(noop)
+    router.callback_query(F.data.in_([f'{game}_roles' for game in GAMES]))(noop)
+    router.message(Command(commands='cancel'))(noop)
+    router.message(Command(commands='stat'))(noop)
+    router.callback_query(F.data.in_([f'{game}_stat' for game in GAMES]))(noop)
+    router.callback_query(F.data == 'rock_paper_scissors')(noop)
+    router.callback_query(F.data.in_(RPS_BUTTONS))(noop)
+    router.callback_query(F.data == 'number_guessing')(noop)
+    router.message(lambda x: x.text and x.text.isdigit() and 1 <= int(x.text) <= 100)(noop)
+    router.callback_query(F.data == YES_CALLBACK)(noop)
+    router.callback_query(F.data == NO_CALLBACK)(noop)
+    router.message()(noop)
+    return router
+
+
+def build_route_table_router() -> Router:
+    """Роутер, устроенный так же, как handlers.router: таблицы маршрутов и запасные фильтры"""
+    router = Router()
+    messages = RouteTable(message_text)
+    callbacks = RouteTable(callback_data)
+    router.message.register(messages.dispatch, messages)
+    router.callback_query.register(callbacks.dispatch, callbacks)
+
+    messages.route('/start', *(f'/{command}' for command in COMMANDS))(noop)
+    messages.route(*(str(number) for number in range(1, 101)))(noop)
+    callbacks.route(
+        *GAMES, *RPS_BUTTONS, *(f'{game}_roles' for game in GAMES),
+        *(f'{game}_stat' for game in GAMES),
+        YES_CALLBACK, NO_CALLBACK
+    )(noop)
+
+    router.message(CommandStart())(noop)
+    for command in COMMANDS:
+        router.message(Command(commands=command))(noop)
+    router.message(is_guess)(noop)
+    router.message()(noop)
+    return router
+
+
+async def measure(router: Router, bot: Bot, updates: list[Update], rounds: int) -> float:
+    dp = Dispatcher()
+    dp.include_router(router)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for update in updates:
+            await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / (rounds * len(updates))
+
+
+async def run(rounds: int) -> None:
+    bot = Bot(token='123456:TEST', session=MockSession())
+    factory = UpdateFactory()
+    samples = {
+        'команда /stat': factory.message(1, '/stat'),
+        'число 42': factory.message(1, '42'),
+        'прочий текст': factory.message(1, 'привет'),
+        'кнопка "Не хочу"': factory.callback(1, NO_CALLBACK),
+        'кнопка "Камень"': factory.callback(1, 'rock'),
+    }
+    samples = {
+        name: Update.model_validate(payload, context={'bot': bot})
+        for name, payload in samples.items()
+    }
+
+    print(f'{"апдейт":<20} {"фильтры, мкс":>14} {"таблица, мкс":>14} {"ускорение":>10}')
+    for name, update in samples.items():
+        chain = await measure(build_filter_chain_router(), bot, [update], rounds)
+        table = await measure(build_route_table_router(), bot, [update], rounds)
+        print(f'{name:<20} {chain * 1e6:14.1f} {table * 1e6:14.1f} {chain / table:9.2f}x')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rounds', type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rounds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Замер отправки ответов на нажатия кнопок через локальный имитатор Bot API.
+
+Каждое нажатие — это апдейт с нажатием кнопки хода в игре камень, ножницы,
+бумага, который проходит через настоящий handlers.router. Хэндлер отвечает
+через services.replace_message тремя запросами (answerCallbackQuery,
+sendMessage, deleteMessage). Сравниваются последовательная и одновременная
+отправка этих запросов, с мидлварью OutboundThrottleMiddleware и без нее.
+Ответ 429 без лимитов — ожидаемый исход, а любая другая ошибка хэндлера
+завершает замер с кодом 1. Запуск из каталога universal_bot:
+    python -m loadtest.sender_bench --chats 50 --clicks 6 --latency 0.03
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from collections import Counter
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import CallbackQuery, Update
+
+import services
+from database import MemoryStorage, UserStore
+from handlers import router
+from lexicon import LEXICON
+from middlewares import LocaleMiddleware, OutboundThrottleMiddleware, StorageMiddleware
+
+from .mock_api import MockBotAPI
+from .stats import format_latency
+from .updates import UpdateFactory
+
+
+# Одновременная отправка — та, что в хэндлерах бота
+replace_message = services.replace_message
+
+
+async def replace_message_sequentially(callback: CallbackQuery, **kwargs) -> None:
+    """Прежняя отправка ответа на нажатие: три запроса по очереди"""
+    await callback.answer()
+    await callback.message.answer(**kwargs)
+    await callback.message.delete()
+
+
+async def scenario(
+        api: MockBotAPI, dp: Dispatcher, store: UserStore, *, chats: int, clicks: int, pipelined: bool,
+        throttled: bool
+) -> Counter[str]:
+    """Прогоняет нажатия и возвращает ошибки хэндлеров, кроме 429"""
+    session = AiohttpSession(api=TelegramAPIServer.from_base(api.url))
+    if throttled:
+        session.middleware(OutboundThrottleMiddleware())
+    bot = Bot(token='123456:TEST', session=session)
+    services.replace_message = replace_message if pipelined else replace_message_sequentially
+    factory = UpdateFactory(chats)
+
+    api.calls.clear()
+    api.flood_errors = 0
+    latencies: list[float] = []
+    flooded = 0
+    errors: Counter[str] = Counter()
+
+    async def chat(chat_id: int) -> None:
+        nonlocal flooded
+        for n in range(clicks):
+            payload = factory.callback(chat_id, ('rock', 'paper', 'scissors')[n % 3])
+            update = Update.model_validate(payload, context={'bot': bot})
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update, UsersStorage=store)
+            except TelegramRetryAfter:
+                flooded += 1
+            except Exception as error:
+                errors[type(error).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(chat_id) for chat_id in range(1, chats + 1)))
+    elapsed = time.perf_counter() - started
+    await session.close()
+    services.replace_message = replace_message
+
+    name = f'{"одновременно" if pipelined else "по очереди"}, ' \
+           f'{"с лимитами" if throttled else "без лимитов"}'
+    print(f'{name:<28} {api.calls["sendmessage"] / elapsed:7.1f} сообщ./с  '
+          f'429: {api.flood_errors:<4} ошибок: {flooded + errors.total():<4} {format_latency(latencies)}')
+    if throttled and flooded:
+        # С лимитами 429 не должен доходить до хэндлера
+        errors['TelegramRetryAfter'] += flooded
+    return errors
+
+
+async def run(*, chats: int, clicks: int, latency: float, port: int) -> Counter[str]:
+    dp = Dispatcher()
+    dp.include_router(router)
+    # Роутер подключается к диспетчеру один раз, поэтому диспетчер и хранилище
+    # общие для всех сценариев
+    store = UserStore(MemoryStorage())
+    dp.update.outer_middleware(StorageMiddleware(store))
+    dp.update.outer_middleware(LocaleMiddleware(LEXICON))
+
+    api = MockBotAPI(latency=latency)
+    await api.start(port=port)
+    errors: Counter[str] = Counter()
+    try:
+        for pipelined in (False, True):
+            for throttled in (False, True):
+                errors += await scenario(
+                    api, dp, store, chats=chats, clicks=clicks, pipelined=pipelined,
+                    throttled=throttled
+                )
+                # Даем окнам лимитов имитатора очиститься между сценариями
+                await asyncio.sleep(1)
+    finally:
+        await api.close()
+    print(f'Ошибок хэндлеров: {dict(errors) or 0}')
+    return errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--clicks', type=int, default=6)
+    parser.add_argument('--latency', type=float, default=0.03)
+    parser.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+
+    # Предупреждения о повторах после 429 засоряют отчет
+    logging.disable(logging.WARNING)
+    errors = asyncio.run(run(
+        chats=args.chats, clicks=args.clicks, latency=args.latency, port=args.port
+    ))
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Моделирование выгрузки простаивающих пользователей менеджером сессий.
+
+Пользователи приходят в случайные моменты модельного времени, делают
+несколько ходов и уходят, причем часть из них бросает игру посередине, а
+каждый пятый только читает /help и профиля в хранилище не заводит.
+Каждую модельную секунду менеджер продвигает колесо таймеров. Сравнивается
+число профилей в памяти с менеджером и без него, а также время одного тика
+колеса и полного обхода всех профилей. Запуск из каталога universal_bot:
+    python -m loadtest.sessions_bench --users 100000 --hours 3
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+
+from database import Games, MemoryStorage, SessionManager, UserStore
+
+from .stats import format_latency
+
+
+async def run(*, users: int, hours: float, game_ttl: float, idle_ttl: float, seed: int) -> None:
+    rnd = random.Random(seed)
+    duration = int(hours * 3600)
+
+    # Модельная секунда -> id пользователей, приславших в нее апдейт
+    activity: dict[int, list[int]] = defaultdict(list)
+    abandoned = set()
+    for user_id in range(1, users + 1):
+        start = rnd.randrange(duration)
+        for _ in range(rnd.randint(1, 5)):
+            activity[start + rnd.randrange(300)].append(user_id)
+        if rnd.random() < 0.5:
+            abandoned.add(user_id)
+
+    store = UserStore(MemoryStorage())
+    sessions = SessionManager(store, game_ttl=game_ttl, idle_ttl=idle_ttl)
+
+    tracemalloc.start()
+    peak = 0
+    ticks: list[float] = []
+    for now in range(duration + int(idle_ttl) + 2):
+        for user_id in activity.pop(now, ()):
+            sessions.touch(user_id, now)
+            if user_id % 5 == 0:
+                continue
+            user = store.get_or_create(user_id)
+            # Брошенная игра так и остается начатой
+            user.is_playing = user_id in abandoned
+            user.current_game = Games.NumberGuessing if user.is_playing else None
+            store.mark_dirty(user_id)
+
+        started = time.perf_counter()
+        await sessions.expire(now)
+        ticks.append(time.perf_counter() - started)
+        peak = max(peak, len(store))
+        if now == duration:
+            memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Полный обход профилей, который заменяет колесо таймеров
+    last_seen = {user_id: float(user_id % duration) for user_id in range(1, users + 1)}
+    started = time.perf_counter()
+    [user_id for user_id, seen in last_seen.items() if duration - seen >= game_ttl]
+    scan = time.perf_counter() - started
+
+    print(f'Пользователей: {users}, модельное время: {hours} ч, '
+          f'game_ttl={game_ttl:.0f} с, idle_ttl={idle_ttl:.0f} с')
+    print(f'Профилей в памяти без менеджера: {users}')
+    print(f'Профилей в памяти с менеджером: пик {peak}, в конце {len(store)}')
+    print(f'Память процесса в конце периода активности: {memory / 2 ** 20:.1f} МБ')
+    print(f'Отслеживается пользователей в конце: {len(sessions)}')
+    print(f'Завершено брошенных игр: {sessions.expired_games}, выгружено профилей: {sessions.offloaded}')
+    print(f'Тик колеса: {format_latency(ticks)}')
+    print(f'Полный обход {users} профилей: {scan * 1000:.2f}ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--hours', type=float, default=3)
+    parser.add_argument('--game-ttl', type=float, default=900)
+    parser.add_argument('--idle-ttl', type=float, default=3600)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(
+        users=args.users, hours=args.hours, game_ttl=args.game_ttl,
+        idle_ttl=args.idle_ttl, seed=args.seed
+    ))
+
+
+if __name__ == '__main__':
+    main()
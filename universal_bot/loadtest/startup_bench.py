@@ -0,0 +1,119 @@
+"""
+Регрессионный замер холодного запуска воркера бота.
+
+Воркер кластера (bot.py с CLUSTER_WORKER_INDEX) запускается заново несколько
+раз, и измеряется время от запуска процесса до его сообщения о готовности.
+Импорт aiogram бот сократить не может, поэтому цель задана как накладные
+расходы самого бота сверх него. Они считаются по фазам запуска из лога того
+же процесса (все фазы, кроме импорта aiogram): время запуска отдельного
+процесса с импортом aiogram колеблется на сотни миллисекунд, и разность
+двух процессов тонула в этом шуме. При превышении целей скрипт завершается
+с кодом 1. Запуск из каталога universal_bot:
+    python -m loadtest.startup_bench --runs 9 --profile
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+BOT_DIR = Path(__file__).resolve().parent.parent
+
+# Цель: сколько бот может тратить на запуск сверх импорта aiogram. Замерено
+# на Linux-контейнере с Python 3.11 и aiogram 3.31 (импорт aiogram около 6 с):
+# медиана 9 запусков 180-190 мс в четырех замерах, отдельные запуски от 120
+# до 200 мс. Цель оставляет запас на шум, но ловит заметный регресс
+TARGET_OVERHEAD_MS = 250
+
+# Фаза запуска воркера, которую бот сократить не может
+AIOGRAM_PHASE = 'aiogram'
+
+# Окружение воркера без внешних зависимостей. Пустые значения перекрывают .env
+WORKER_ENV = {
+    'BOT_TOKEN': '123456:TEST',
+    'CLUSTER_WORKERS': '2',
+    'CLUSTER_WORKER_INDEX': '0',
+    'STORAGE_BACKEND': 'memory',
+    'WEBHOOK_URL': '',
+    'METRICS_PORT': '0',
+    'HISTORY_DIR': '',
+}
+
+
+def time_ready(command: list[str], env: dict[str, str]) -> tuple[float, str]:
+    """Время от запуска процесса до строки о готовности и его лог"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        command, cwd=BOT_DIR, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    line = process.stdout.readline()
+    elapsed = time.perf_counter() - started
+    # Закрытый stdin — сигнал процессу завершиться
+    _, log = process.communicate()
+    if line != b'0 ready\n':
+        raise RuntimeError(f'Process {command} failed to start:\n{log.decode()}')
+    return elapsed, log.decode()
+
+
+def parse_phases(log: str) -> dict[str, float]:
+    """Фазы запуска из лога воркера: название -> секунды"""
+    for line in log.splitlines():
+        _, found, phases = line.partition('Фазы запуска: ')
+        if found:
+            return {
+                name: int(spent) / 1000
+                for name, spent, _ in (phase.rsplit(' ', 2) for phase in phases.split(', '))
+            }
+    raise RuntimeError(f'Worker log has no startup phases:\n{log}')
+
+
+def time_worker(profile: bool) -> tuple[float, str]:
+    """Время до готовности воркера и его лог"""
+    env = {**os.environ, **WORKER_ENV, 'STARTUP_PROFILE': '1' if profile else ''}
+    return time_ready([sys.executable, 'bot.py'], env)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=9)
+    parser.add_argument('--profile', action='store_true',
+                        help='показать разбивку запуска последнего прогона')
+    parser.add_argument('--max-overhead-ms', type=float, default=TARGET_OVERHEAD_MS)
+    parser.add_argument('--max-startup-ms', type=float, default=None,
+                        help='предел полного времени запуска')
+    args = parser.parse_args()
+
+    aiogram, overheads, startup, log = [], [], [], ''
+    for n in range(args.runs):
+        elapsed, log = time_worker(args.profile and n == args.runs - 1)
+        phases = parse_phases(log)
+        aiogram.append(phases.pop(AIOGRAM_PHASE))
+        overheads.append(sum(phases.values()))
+        startup.append(elapsed)
+    total, overhead = statistics.median(startup), statistics.median(overheads)
+    for name, values in (('Запуск воркера', startup), ('Импорт aiogram в воркере', aiogram),
+                         ('Накладные расходы бота', overheads)):
+        print(f'{name}: медиана {statistics.median(values) * 1000:.0f} мс '
+              f'(от {min(values) * 1000:.0f} до {max(values) * 1000:.0f})')
+    print(f'Цель накладных расходов: {args.max_overhead_ms:.0f} мс')
+    if args.profile:
+        for line in log.splitlines():
+            if 'Фазы запуска' in line or line.startswith(('Импорты', 'Самые долгие')):
+                print(line.split(' - ')[-1])
+
+    failed = []
+    if overhead * 1000 > args.max_overhead_ms:
+        failed.append(f'overhead {overhead * 1000:.0f}ms > {args.max_overhead_ms:.0f}ms')
+    if args.max_startup_ms is not None and total * 1000 > args.max_startup_ms:
+        failed.append(f'startup {total * 1000:.0f}ms > {args.max_startup_ms:.0f}ms')
+    if failed:
+        print('Цели не выполнены: ' + '; '.join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+def percentile(values: list[float], q: float) -> float:
+    """Функция возвращает q-й перцентиль (0 <= q <= 100) по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def format_latency(latencies: list[float]) -> str:
+    """Функция форматирует перцентили задержек (в секундах) для отчета"""
+    return ', '.join(
+        f'p{q}={percentile(latencies, q) * 1000:.2f}ms' for q in (50, 90, 99, 99.9)
+    )
@@ -0,0 +1,126 @@
+"""
+Стресс-проверка последовательной обработки апдейтов одного пользователя.
+
+Тысячи апдейтов случайных действий одновременно отправляются в диспетчер
+с UserLockMiddleware, после чего профиль каждого пользователя сравнивается
+с профилем, полученным при строго последовательном воспроизведении тех же
+апдейтов. Чтобы исход зависел только от порядка апдейтов, выбор бота в
+играх на время проверки фиксируется. Любая ошибка хэндлера в любом из
+прогонов завершает проверку с кодом 1.
+
+Запуск из каталога universal_bot:
+    python -m loadtest.stress --users 50 --updates 5000
+"""
+import argparse
+import asyncio
+import random
+import sys
+from collections import Counter
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+import services
+from database import MemoryStorage, UserStore, dump_user
+from handlers import router
+from keyboards import NO_CALLBACK, YES_CALLBACK
+from lexicon import LEXICON
+from middlewares import LocaleMiddleware, StorageMiddleware, UserLockMiddleware
+
+from .mock_session import MockSession
+from .updates import UpdateFactory
+
+
+# Смещение id пользователей для последовательного прогона
+REPLAY_OFFSET = 10 ** 9
+
+ACTIONS = (
+    ('message', '/start'), ('message', '/play'), ('message', '/stat'),
+    ('message', '/cancel'), ('message', '40'), ('message', '50'), ('message', '60'),
+    ('callback', 'rock_paper_scissors'), ('callback', 'number_guessing'),
+    ('callback', 'rock'), ('callback', 'paper'), ('callback', 'scissors'),
+    ('callback', YES_CALLBACK), ('callback', NO_CALLBACK)
+)
+
+
+def generate(users: int, updates: int, seed: int) -> list[tuple[int, str, str]]:
+    """Функция генерирует поток действий (id пользователя, тип апдейта, данные)"""
+    rnd = random.Random(seed)
+    first = [(user_id, 'message', '/start') for user_id in range(1, users + 1)]
+    return first + [
+        (rnd.randint(1, users), *rnd.choice(ACTIONS)) for _ in range(updates - users)
+    ]
+
+
+async def run(*, users: int, updates: int, seed: int, jitter: float) -> int:
+    # Фиксируем выбор бота, чтобы результат зависел только от порядка апдейтов
+    services.get_random_item = lambda: 'scissors'
+    services.get_random_number = lambda start=1, end=100: 50
+
+    bot = Bot(token='123456:TEST', session=MockSession(jitter=jitter))
+    dp = Dispatcher()
+    dp.include_router(router)
+
+    store = UserStore(MemoryStorage())
+    locks = UserLockMiddleware()
+    dp.update.outer_middleware(locks)
+    dp.update.outer_middleware(StorageMiddleware(store))
+    dp.update.outer_middleware(LocaleMiddleware(LEXICON))
+
+    factory = UpdateFactory()
+    actions = generate(users, updates, seed)
+
+    def build(user_id: int, kind: str, data: str) -> Update:
+        payload = getattr(factory, kind)(user_id, data)
+        return Update.model_validate(payload, context={'bot': bot})
+
+    errors: Counter[str] = Counter()
+
+    async def feed(update: Update) -> None:
+        try:
+            await dp.feed_update(bot, update, UsersStorage=store)
+        except Exception as error:
+            # Ошибки хэндлеров считаем, чтобы прогон завершился с кодом 1
+            errors[type(error).__name__] += 1
+
+    # Одновременный прогон: все апдейты запускаются разом
+    await asyncio.gather(*(feed(build(*action)) for action in actions))
+    print(f'Блокировок после прогона: {locks.active_users}')
+    concurrent_errors, errors = errors, Counter()
+
+    # Эталонный прогон: те же апдейты строго по очереди для "двойников" пользователей
+    for user_id, kind, data in actions:
+        await feed(build(user_id + REPLAY_OFFSET, kind, data))
+
+    mismatches = [
+        user_id for user_id in range(1, users + 1)
+        if dump_user(store[user_id]) != dump_user(store[user_id + REPLAY_OFFSET])
+    ]
+    total_games = sum(
+        store[u].rock_paper_scissors.total_games + store[u].number_guessing.total_games
+        for u in range(1, users + 1)
+    )
+    print(f'Апдейтов: {len(actions)}, пользователей: {users}, сыграно игр: {total_games}')
+    print(f'Расхождений с последовательным прогоном: {len(mismatches)}')
+    print(f'Ошибок хэндлеров: {dict(concurrent_errors) or 0}')
+    # Любая ошибка хэндлера — провал, даже если она воспроизводится в обоих прогонах
+    return (len(mismatches) + locks.active_users
+            + concurrent_errors.total() + errors.total())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--updates', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jitter', type=float, default=0.002)
+    args = parser.parse_args()
+
+    failures = asyncio.run(run(
+        users=args.users, updates=args.updates, seed=args.seed, jitter=args.jitter
+    ))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
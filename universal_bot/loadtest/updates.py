@@ -0,0 +1,105 @@
+import random
+import time
+from collections.abc import Iterator
+
+from keyboards import NO_CALLBACK, ROCK_PAPER_SCISSORS_BUTTONS, YES_CALLBACK
+
+
+# Генератор поддельных апдейтов Telegram в том виде, в котором они приходят
+# на вебхук (JSON-словари). Апдейты складываются в правдоподобные игровые
+# сессии: /start, /play, выбор игры, ходы, продолжение или отказ. Язык
+# пользователя в сессиях выбирается из languages по его id
+class UpdateFactory:
+    def __init__(
+            self, users: int = 1000, *, seed: int | None = 0, first_user_id: int = 10_000,
+            languages: tuple[str, ...] = ('ru',)
+    ) -> None:
+        self.users = users
+        self.languages = languages
+        self.first_user_id = first_user_id
+        self._random = random.Random(seed)
+        self._update_id = 0
+        self._message_id = 0
+
+    def _next_ids(self) -> tuple[int, int]:
+        self._update_id += 1
+        self._message_id += 1
+        return self._update_id, self._message_id
+
+    @staticmethod
+    def _user(user_id: int, language_code: str = 'ru') -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}',
+                'language_code': language_code}
+
+    @staticmethod
+    def _chat(user_id: int) -> dict:
+        return {'id': user_id, 'type': 'private', 'first_name': f'user{user_id}'}
+
+    def message(self, user_id: int, text: str, language_code: str = 'ru') -> dict:
+        """Апдейт с текстовым сообщением пользователя"""
+        update_id, message_id = self._next_ids()
+        message = {
+            'message_id': message_id, 'date': int(time.time()),
+            'chat': self._chat(user_id), 'from': self._user(user_id, language_code),
+            'text': text
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+        return {'update_id': update_id, 'message': message}
+
+    def callback(self, user_id: int, data: str, language_code: str = 'ru') -> dict:
+        """Апдейт с нажатием инлайн-кнопки под сообщением бота"""
+        update_id, message_id = self._next_ids()
+        return {
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id), 'chat_instance': str(user_id), 'data': data,
+                'from': self._user(user_id, language_code),
+                'message': {
+                    'message_id': message_id, 'date': int(time.time()),
+                    'chat': self._chat(user_id),
+                    'from': {'id': 1, 'is_bot': True, 'first_name': 'bot'},
+                    'text': '...'
+                }
+            }
+        }
+
+    def session(self, user_id: int, rounds: int = 3) -> list[dict]:
+        """Типичная игровая сессия одного пользователя"""
+        language_code = self.languages[user_id % len(self.languages)]
+        message = lambda text: self.message(user_id, text, language_code)
+        callback = lambda data: self.callback(user_id, data, language_code)
+
+        updates = [message('/start'), message('/play')]
+        game = self._random.choice(('rock_paper_scissors', 'number_guessing'))
+        updates.append(callback(game))
+
+        for n in range(rounds):
+            if game == 'rock_paper_scissors':
+                item = self._random.choice(tuple(ROCK_PAPER_SCISSORS_BUTTONS))
+                updates.append(callback(item))
+            else:
+                for _ in range(self._random.randint(1, 7)):
+                    updates.append(message(str(self._random.randint(1, 100))))
+            updates.append(callback(YES_CALLBACK if n < rounds - 1 else NO_CALLBACK))
+
+        updates.append(message('/stat'))
+        return updates
+
+    def stream(self, sessions: int, rounds: int = 3) -> Iterator[dict]:
+        """
+        Поток апдейтов, в котором сессии разных пользователей перемешаны
+        между собой, а порядок апдейтов внутри одной сессии сохранен
+        """
+        active = [
+            iter(self.session(self.first_user_id + n % self.users, rounds))
+            for n in range(sessions)
+        ]
+        while active:
+            n = self._random.randrange(len(active))
+            update = next(active[n], None)
+            if update is None:
+                active[n] = active[-1]
+                active.pop()
+            else:
+                yield update
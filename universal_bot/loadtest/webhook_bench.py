@@ -0,0 +1,103 @@
+"""
+Замер пропускной способности и задержек режима вебхука без доступа к сети.
+
+Запуск из каталога universal_bot:
+    python -m loadtest.webhook_bench --sessions 2000 --users 500 --api-delay 0.02
+"""
+import argparse
+import asyncio
+import time
+
+from aiohttp import ClientSession, TCPConnector, web
+from aiogram import Bot, Dispatcher
+
+from database import MemoryStorage, UserStore
+from handlers import router
+from lexicon import LEXICON
+from middlewares import LocaleMiddleware, StorageMiddleware
+from webhook import create_app
+
+from .mock_session import MockSession
+from .stats import format_latency
+from .updates import UpdateFactory
+
+
+async def run(
+        *, sessions: int, users: int, concurrency: int, clients: int,
+        api_delay: float, port: int
+) -> None:
+    bot = Bot(token='123456:TEST', session=MockSession(delay=api_delay))
+    dp = Dispatcher()
+    dp.include_router(router)
+
+    store = UserStore(MemoryStorage())
+    dp.update.outer_middleware(StorageMiddleware(store))
+    dp.update.outer_middleware(LocaleMiddleware(LEXICON))
+
+    # Время окончания обработки каждого апдейта
+    finished: dict[int, float] = {}
+
+    async def timing_middleware(handler, event, data):
+        try:
+            return await handler(event, data)
+        finally:
+            finished[event.update_id] = time.perf_counter()
+
+    dp.update.outer_middleware(timing_middleware)
+
+    updates = list(UpdateFactory(users, languages=('ru', 'en')).stream(sessions))
+    sent: dict[int, float] = {}
+
+    app = create_app(dp, bot, max_concurrency=concurrency, UsersStorage=store)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+
+    url = f'http://127.0.0.1:{port}/webhook'
+
+    # Каждый клиент отправляет апдейты своей части пользователей по порядку,
+    # так что апдейты одного пользователя не обгоняют друг друга в сети
+    parts: list[list[dict]] = [[] for _ in range(clients)]
+    for update in updates:
+        event = update.get('message') or update.get('callback_query')
+        parts[event['from']['id'] % clients].append(update)
+
+    async def client(session: ClientSession, part: list[dict]) -> None:
+        for update in part:
+            sent[update['update_id']] = time.perf_counter()
+            async with session.post(url, json=update) as response:
+                response.raise_for_status()
+
+    started = time.perf_counter()
+    async with ClientSession(connector=TCPConnector(limit=clients)) as session:
+        await asyncio.gather(*(client(session, part) for part in parts))
+    await app['scheduler'].join()
+    elapsed = time.perf_counter() - started
+    await runner.cleanup()
+
+    latencies = [finished[i] - sent[i] for i in sent if i in finished]
+    print(f'Апдейтов: {len(updates)}, пользователей: {users}, '
+          f'параллельность: {concurrency}, задержка API: {api_delay * 1000:.0f}ms')
+    print(f'Пропускная способность: {len(updates) / elapsed:.0f} апдейтов/с')
+    print(f'Задержка обработки: {format_latency(latencies)}')
+    print(f'Запросов к Bot API: {sum(bot.session.calls.values())}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--api-delay', type=float, default=0.01)
+    parser.add_argument('--port', type=int, default=8089)
+    args = parser.parse_args()
+
+    asyncio.run(run(
+        sessions=args.sessions, users=args.users, concurrency=args.concurrency,
+        clients=args.clients, api_delay=args.api_delay, port=args.port
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+from .metrics import (DEFAULT_BUCKETS, Histogram, Metrics, TimedStorage,
+                      create_metrics_app, current_trace, start_metrics_server,
+                      trace_span)
\ No newline at end of file
@@ -0,0 +1,185 @@
+import logging
+import time
+from bisect import bisect_left
+from collections.abc import AsyncIterator, Iterable, Mapping
+from contextvars import ContextVar
+
+from aiohttp import web
+
+from database import BaseStorage
+
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержек, в секундах
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Трассировка текущего апдейта: список (операция, длительность) или None,
+# если апдейт не попал в выборку трассировки
+current_trace: ContextVar[list[tuple[str, float]] | None] = ContextVar('current_trace', default=None)
+
+
+def trace_span(name: str, elapsed: float) -> None:
+    """Добавляет операцию в трассировку текущего апдейта, если она ведется"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.append((name, elapsed))
+
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+# Гистограмма с фиксированными корзинами. Наблюдение стоит одного
+# двоичного поиска по границам, поэтому ее можно держать на горячем пути
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+# Семейство метрик с одной меткой, например задержки по имени хэндлера
+class Family:
+    def __init__(self, name: str, help: str, label: str, kind: str,
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.kind = kind  # counter или histogram
+        self.buckets = buckets
+        self._children: dict[str, Counter | Histogram] = {}
+
+    def labels(self, value: str) -> Counter | Histogram:
+        child = self._children.get(value)
+        if child is None:
+            child = self._children[value] = (
+                Histogram(self.buckets) if self.kind == 'histogram' else Counter()
+            )
+        return child
+
+    def render(self) -> Iterable[str]:
+        """Строки семейства в текстовом формате Prometheus"""
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} {self.kind}'
+        for value, child in sorted(self._children.items()):
+            label = f'{self.label}="{_escape(value)}"'
+            if isinstance(child, Counter):
+                yield f'{self.name}{{{label}}} {child.value}'
+                continue
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), child.counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}'
+            yield f'{self.name}_sum{{{label}}} {child.sum}'
+            yield f'{self.name}_count{{{label}}} {child.count}'
+
+
+# Метрики бота: апдейты по типам, задержки хэндлеров, запросов к Bot API и
+# обращений к хранилищу
+class Metrics:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.families: list[Family] = []
+        self.updates = self._family('bot_updates_total', 'Processed updates', 'type', 'counter')
+        self.update_latency = self._family(
+            'bot_update_seconds', 'Update processing time', 'type', 'histogram', buckets
+        )
+        self.handler_latency = self._family(
+            'bot_handler_seconds', 'Handler execution time', 'handler', 'histogram', buckets
+        )
+        self.handler_errors = self._family(
+            'bot_handler_errors_total', 'Handler exceptions', 'handler', 'counter'
+        )
+        self.api_latency = self._family(
+            'bot_api_request_seconds', 'Bot API request time', 'method', 'histogram', buckets
+        )
+        self.api_errors = self._family(
+            'bot_api_errors_total', 'Failed Bot API requests', 'method', 'counter'
+        )
+        self.storage_latency = self._family(
+            'bot_storage_seconds', 'Storage operation time', 'operation', 'histogram', buckets
+        )
+
+    def _family(self, *args) -> Family:
+        family = Family(*args)
+        self.families.append(family)
+        return family
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        return '\n'.join(line for family in self.families for line in family.render()) + '\n'
+
+
+# Обертка над хранилищем, замеряющая время каждой операции
+class TimedStorage(BaseStorage):
+    def __init__(self, storage: BaseStorage, metrics: Metrics) -> None:
+        self.storage = storage
+        self._get = metrics.storage_latency.labels('get_many')
+        self._set = metrics.storage_latency.labels('set_many')
+        self._delete = metrics.storage_latency.labels('delete_many')
+
+    async def get_many(self, user_ids: Iterable[int]) -> dict[int, str]:
+        started = time.perf_counter()
+        try:
+            return await self.storage.get_many(user_ids)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._get.observe(elapsed)
+            trace_span('storage.get_many', elapsed)
+
+    async def set_many(self, records: Mapping[int, str]) -> None:
+        started = time.perf_counter()
+        try:
+            await self.storage.set_many(records)
+        finally:
+            self._set.observe(time.perf_counter() - started)
+
+    async def delete_many(self, user_ids: Iterable[int]) -> None:
+        started = time.perf_counter()
+        try:
+            await self.storage.delete_many(user_ids)
+        finally:
+            self._delete.observe(time.perf_counter() - started)
+
+    def scan(self, batch: int = 1000) -> AsyncIterator[dict[int, str]]:
+        return self.storage.scan(batch)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+
+def create_metrics_app(metrics: Metrics, path: str = '/metrics') -> web.Application:
+    """Функция создает aiohttp-приложение, отдающее метрики Prometheus"""
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.render(), content_type='text/plain')
+
+    app = web.Application()
+    app.router.add_get(path, handle_metrics)
+    return app
+
+
+async def start_metrics_server(metrics: Metrics, host: str, port: int) -> web.AppRunner:
+    """Функция запускает сервер метрик и возвращает его runner для остановки"""
+    runner = web.AppRunner(create_metrics_app(metrics))
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    logger.info('Метрики доступны на http://%s:%s/metrics', host, port)
+    return runner
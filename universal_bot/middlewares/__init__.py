@@ -0,0 +1,14 @@
+from startup import lazy_exports
+
+
+# Подмодули загружаются при первом обращении: метрики тянут aiohttp.web и
+# не нужны процессу, в котором мониторинг выключен
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    '.locale': ('LocaleMiddleware',),
+    '.metrics': ('ApiMetricsMiddleware', 'HandlerMetricsMiddleware',
+                 'UpdateMetricsMiddleware', 'setup_metrics'),
+    '.sessions': ('SessionMiddleware',),
+    '.storage': ('StorageMiddleware',),
+    '.throttling': ('OutboundThrottleMiddleware', 'TokenBucket'),
+    '.user_lock': ('UserLockMiddleware',),
+})
\ No newline at end of file
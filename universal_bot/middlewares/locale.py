@@ -0,0 +1,23 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TgUser
+
+from lexicon import Lexicon
+
+
+# Мидлварь выбирает каталог лексикона по языку пользователя из апдейта и
+# передает его хэндлерам аргументом lexicon
+class LocaleMiddleware(BaseMiddleware):
+    def __init__(self, lexicon: Lexicon) -> None:
+        self.lexicon = lexicon
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any]
+    ) -> Any:
+        user: TgUser | None = data.get('event_from_user')
+        data['lexicon'] = self.lexicon.get(user.language_code if user else None)
+        return await handler(event, data)
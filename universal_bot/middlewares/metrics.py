@@ -0,0 +1,127 @@
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import (BaseRequestMiddleware,
+                                                     NextRequestMiddlewareType)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from metrics import Metrics, current_trace, trace_span
+
+
+logger = logging.getLogger(__name__)
+
+
+def update_type(update: Update) -> str:
+    """
+    Функция определяет тип апдейта по заданным в нем полям. Update.event_type
+    кэширует результат через lru_cache с хэшированием всего апдейта, что
+    дороже самого сбора метрик
+    """
+    for name in update.model_fields_set:
+        if name != 'update_id':
+            return name
+    return 'unknown'
+
+
+# Внешняя мидлварь апдейтов: считает апдейты по типам и время их обработки.
+# Доля trace_sample_rate апдейтов трассируется: в лог пишется хэндлер и
+# длительности всех запросов к Bot API и хранилищу за время обработки
+class UpdateMetricsMiddleware(BaseMiddleware):
+    def __init__(self, metrics: Metrics, *, trace_sample_rate: float = 0.0) -> None:
+        self.metrics = metrics
+        self.trace_sample_rate = trace_sample_rate
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: dict[str, Any]
+    ) -> Any:
+        token = None
+        if self.trace_sample_rate and random.random() < self.trace_sample_rate:
+            token = current_trace.set([])
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            kind = update_type(event)
+            self.metrics.updates.labels(kind).inc()
+            self.metrics.update_latency.labels(kind).observe(elapsed)
+            if token is not None:
+                spans = current_trace.get()
+                current_trace.reset(token)
+                user = data.get('event_from_user')
+                logger.info(
+                    'trace update=%s type=%s user=%s total=%.2fms %s', event.update_id,
+                    kind, user.id if user else None, elapsed * 1000,
+                    ' '.join(f'{name}={seconds * 1000:.2f}ms' for name, seconds in spans)
+                )
+
+
+# Внутренняя мидлварь событий: время работы и ошибки каждого хэндлера. Для
+# хэндлеров из таблиц маршрутов учитывается найденный таблицей хэндлер
+class HandlerMetricsMiddleware(BaseMiddleware):
+    def __init__(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any]
+    ) -> Any:
+        name = (data.get('route') or data['handler']).callback.__name__
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            self.metrics.handler_errors.labels(name).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.handler_latency.labels(name).observe(elapsed)
+            trace_span(f'handler.{name}', elapsed)
+
+
+# Мидлварь исходящих запросов: время и ошибки запросов к Bot API по методам
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    def __init__(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+
+    async def __call__(
+            self, make_request: NextRequestMiddlewareType[TelegramType], bot: Bot,
+            method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            self.metrics.api_errors.labels(name).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.api_latency.labels(name).observe(elapsed)
+            trace_span(f'api.{name}', elapsed)
+
+
+def setup_metrics(dp: Dispatcher, bot: Bot, metrics: Metrics, *,
+                  trace_sample_rate: float = 0.0) -> None:
+    """
+    Функция подключает мидлвари метрик к диспетчеру и сессии бота. Ее нужно
+    вызывать до подключения остальных мидлварей апдейтов, чтобы время апдейта
+    включало их работу, но после ограничителя исходящих запросов, чтобы время
+    запроса к Bot API не включало ожидание его очереди
+    """
+    dp.update.outer_middleware(UpdateMetricsMiddleware(metrics, trace_sample_rate=trace_sample_rate))
+    handler_metrics = HandlerMetricsMiddleware(metrics)
+    dp.message.middleware(handler_metrics)
+    dp.callback_query.middleware(handler_metrics)
+    bot.session.middleware(ApiMetricsMiddleware(metrics))
@@ -0,0 +1,30 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TgUser
+
+from database import SessionManager
+
+
+# Мидлварь сообщает менеджеру сессий о начале и конце обработки апдейта
+# пользователя: это продлевает его сессию и не дает выгрузить профиль из
+# памяти, пока с ним работает хэндлер. Подключается до StorageMiddleware
+class SessionMiddleware(BaseMiddleware):
+    def __init__(self, sessions: SessionManager) -> None:
+        self.sessions = sessions
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any]
+    ) -> Any:
+        user: TgUser | None = data.get('event_from_user')
+        if user is None:
+            return await handler(event, data)
+
+        self.sessions.acquire(user.id)
+        try:
+            return await handler(event, data)
+        finally:
+            self.sessions.release(user.id)
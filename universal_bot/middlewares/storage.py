@@ -0,0 +1,30 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TgUser
+
+from database import UserStore
+
+
+# Мидлварь подгружает профиль пользователя из хранилища до вызова хэндлера
+# и помечает его измененным после, чтобы он попал в ближайшую пачку записи
+class StorageMiddleware(BaseMiddleware):
+    def __init__(self, store: UserStore) -> None:
+        self.store = store
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any]
+    ) -> Any:
+        user: TgUser | None = data.get('event_from_user')
+        if user is None:
+            return await handler(event, data)
+
+        await self.store.load(user.id)
+        try:
+            return await handler(event, data)
+        finally:
+            if user.id in self.store:
+                self.store.mark_dirty(user.id)
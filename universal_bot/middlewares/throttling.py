@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (BaseRequestMiddleware,
+                                                     NextRequestMiddlewareType)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+
+logger = logging.getLogger(__name__)
+
+# Методы, отправляющие сообщения в чат. Лимиты Telegram касаются именно их
+_LIMITED_PREFIXES = ('Send', 'Copy', 'Forward', 'Edit')
+
+
+# Ведро токенов: пропускает не более rate запросов в секунду в среднем и до
+# capacity запросов подряд. Ожидающие получают токены в порядке очереди
+class TokenBucket:
+    __slots__ = ('rate', 'capacity', '_tokens', '_updated', '_blocked_until', '_lock')
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def idle(self) -> bool:
+        """Ведро полно и никто его не ждет — его можно удалить без потери состояния"""
+        now = time.monotonic()
+        self._refill(now)
+        return (self._tokens >= self.capacity and not self._lock.locked()
+                and now >= self._blocked_until)
+
+    def block(self, seconds: float) -> None:
+        """Запрещает выдачу токенов на seconds секунд (ответ Telegram retry_after)"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# Мидлварь исходящих запросов к Bot API. Отправка сообщений проходит через
+# общее ведро бота и ведро конкретного чата, так что очередь сообщений не
+# упирается в лимиты Telegram: по умолчанию за любую секунду уходит не больше
+# 30 сообщений в целом и 3 сообщений в один чат. Если Telegram все же ответил
+# retry_after, ведро чата (или общее) блокируется на это время и запрос повторяется
+class OutboundThrottleMiddleware(BaseRequestMiddleware):
+    def __init__(
+            self, *, global_rate: float = 25, global_burst: float = 5,
+            chat_rate: float = 1, chat_burst: float = 2, max_retries: int = 3,
+            max_idle_buckets: int = 10000
+    ) -> None:
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_idle_buckets = max_idle_buckets
+        self._chat_buckets: dict[int | str, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.max_idle_buckets:
+                # Выбрасываем ведра чатов, которые давно ничего не отправляли
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items() if not value.idle
+                }
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def __call__(
+            self, make_request: NextRequestMiddlewareType[TelegramType], bot: Bot,
+            method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, 'chat_id', None)
+        limited = type(method).__name__.startswith(_LIMITED_PREFIXES)
+        chat_bucket = self._chat_bucket(chat_id) if limited and chat_id is not None else None
+
+        for attempt in range(self.max_retries + 1):
+            if limited:
+                if chat_bucket is not None:
+                    await chat_bucket.acquire()
+                await self.global_bucket.acquire()
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as error:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning('Превышен лимит Telegram, повтор через %s с', error.retry_after)
+                (chat_bucket or self.global_bucket).block(error.retry_after)
+                if not limited:
+                    await asyncio.sleep(error.retry_after)
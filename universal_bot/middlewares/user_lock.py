@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TgUser
+
+
+# Запись таблицы блокировок: сама блокировка и число апдейтов, которые ее
+# держат или ждут. Когда счетчик обнуляется, запись удаляется из таблицы
+class _LockEntry:
+    __slots__ = ('lock', 'refs')
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.refs = 0
+
+
+# Мидлварь обрабатывает апдейты одного пользователя строго по очереди
+# (asyncio.Lock пропускает ожидающих в порядке прихода), а апдейты разных
+# пользователей — параллельно. Блокировки простаивающих пользователей сразу
+# удаляются, поэтому таблица не растет с числом когда-либо писавших пользователей
+class UserLockMiddleware(BaseMiddleware):
+    def __init__(self) -> None:
+        self._locks: dict[int, _LockEntry] = {}
+
+    @property
+    def active_users(self) -> int:
+        """Количество пользователей, чьи апдейты сейчас обрабатываются или ждут очереди"""
+        return len(self._locks)
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any]
+    ) -> Any:
+        user: TgUser | None = data.get('event_from_user')
+        if user is None:
+            return await handler(event, data)
+
+        entry = self._locks.get(user.id)
+        if entry is None:
+            entry = self._locks[user.id] = _LockEntry()
+        entry.refs += 1
+        try:
+            async with entry.lock:
+                return await handler(event, data)
+        finally:
+            entry.refs -= 1
+            if not entry.refs:
+                del self._locks[user.id]
@@ -0,0 +1 @@
+from .responses import PreparedSession, prepare_markup
\ No newline at end of file
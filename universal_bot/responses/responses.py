@@ -0,0 +1,51 @@
+import json
+import weakref
+from typing import Any, TypeVar
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject
+from aiohttp import FormData
+
+
+MarkupT = TypeVar('MarkupT', bound=TelegramObject)
+
+# Заранее сериализованные клавиатуры: id объекта -> JSON. Запись удаляется
+# вместе с клавиатурой, поэтому ее id не достанется другому объекту, а
+# клавиатуры выгруженных локалей не копятся
+_PREPARED: dict[int, str] = {}
+
+
+def prepare_markup(markup: MarkupT) -> MarkupT:
+    """
+    Функция один раз сериализует статическую клавиатуру в JSON и запоминает
+    результат. Подготовленную клавиатуру нельзя изменять после вызова
+    """
+    _PREPARED[id(markup)] = json.dumps(markup.model_dump(warnings=False, exclude_none=True))
+    weakref.finalize(markup, _PREPARED.pop, id(markup), None)
+    return markup
+
+
+# Сессия Bot API, которая подставляет в запрос готовый JSON подготовленной
+# клавиатуры вместо того, чтобы заново переводить ее в словарь и
+# сериализовать при каждой отправке. Форма собирается только через публичный
+# API aiohttp, как в AiohttpSession.build_form_data
+class PreparedSession(AiohttpSession):
+    def build_form_data(self, bot: Bot, method: TelegramMethod[Any]) -> FormData:
+        prepared = _PREPARED.get(id(getattr(method, 'reply_markup', None)))
+        if prepared is None:
+            return super().build_form_data(bot, method)
+
+        form = FormData(quote_fields=False)
+        files: dict[str, Any] = {}
+        dumped = method.model_dump(warnings=False, exclude_none=True, exclude={'reply_markup'})
+        for key, value in dumped.items():
+            value = self.prepare_value(value, bot=bot, files=files)
+            if not value:
+                continue
+            form.add_field(key, value)
+        form.add_field('reply_markup', prepared)
+        for key, value in files.items():
+            form.add_field(key, value.read(bot), filename=value.filename or key)
+        return form
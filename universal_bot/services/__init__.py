@@ -1 +1,4 @@
-from .services import get_random_number, get_random_item, get_winner
\ No newline at end of file
+from .messages import replace_message
+from .randomness import Randomness, RandomStream
+from .services import (RANDOMNESS, ROCK_PAPER_SCISSORS_ITEMS, WINNERS, get_random_number,
+                       get_random_item, get_winner)
\ No newline at end of file
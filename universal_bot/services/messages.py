@@ -0,0 +1,16 @@
+import asyncio
+
+from aiogram.types import CallbackQuery
+
+
+async def replace_message(callback: CallbackQuery, **kwargs) -> None:
+    """
+    Функция убирает знак часов с кнопки, отправляет новое сообщение и удаляет
+    старое. Три запроса к Bot API отправляются одновременно, а не по очереди
+    """
+    # Методы aiogram не хэшируются, поэтому gather получает их обернутыми в задачи
+    await asyncio.gather(*map(asyncio.ensure_future, (
+        callback.answer(),
+        callback.message.answer(**kwargs),
+        callback.message.delete()
+    )))
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import random
+from collections.abc import Callable, Sequence
+from typing import Generic, TypeVar
+
+
+T = TypeVar('T')
+
+# Источник случайных байтов: принимает число байтов и возвращает их
+ByteSource = Callable[[int], bytes]
+
+
+# Поток случайных исходов. Исходы генерируются блоками: один вызов источника
+# дает байты сразу на block_size исходов, и они переводятся в исходы одним
+# проходом, а хэндлер лишь снимает готовый исход с конца списка. Когда в
+# блоке остается меньше low_water исходов, следующий блок готовится
+# колбэком цикла событий уже после текущего хэндлера. Байты, которые дали бы
+# смещение распределения, отбрасываются, поэтому все исходы равновероятны
+class RandomStream(Generic[T]):
+    __slots__ = ('outcomes', 'block_size', 'low_water', '_source', '_width', '_limit',
+                 '_block', '_next', '_refilling')
+
+    def __init__(
+            self, outcomes: Sequence[T], source: ByteSource, *, block_size: int = 4096,
+            low_water: int | None = None
+    ) -> None:
+        if not outcomes:
+            raise ValueError('RandomStream needs at least one outcome')
+        self.outcomes = outcomes
+        self.block_size = block_size
+        self.low_water = block_size // 4 if low_water is None else low_water
+        self._source = source
+        # Сколько байтов нужно на один исход и с какого значения байты отбрасываются
+        self._width = max(1, (len(self.outcomes) - 1).bit_length() + 7 >> 3)
+        space = 256 ** self._width
+        self._limit = space - space % len(self.outcomes)
+        self._block: list[T] = []
+        self._next: list[T] | None = None
+        self._refilling = False
+
+    def _generate(self) -> list[T]:
+        outcomes, n, limit, width = self.outcomes, len(self.outcomes), self._limit, self._width
+        # Берем байты с запасом на отброшенные значения
+        data = self._source(self.block_size * width * 2)
+        if width == 1:
+            return [outcomes[b % n] for b in data if b < limit]
+        values = (int.from_bytes(data[i:i + width], 'little') for i in range(0, len(data), width))
+        return [outcomes[v % n] for v in values if v < limit]
+
+    def _refill(self) -> None:
+        self._refilling = False
+        if self._next is None:
+            self._next = self._generate()
+
+    def _schedule_refill(self) -> None:
+        if self._refilling or self._next is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Вне цикла событий готовим блок сразу
+            self._refill()
+            return
+        self._refilling = True
+        loop.call_soon(self._refill)
+
+    def __call__(self) -> T:
+        block = self._block
+        if not block:
+            # Следующий блок не успел подготовиться — генерируем на месте
+            block = self._block = self._next if self._next is not None else self._generate()
+            self._next = None
+        if len(block) <= self.low_water:
+            self._schedule_refill()
+        return block.pop()
+
+    def reset(self, source: ByteSource) -> None:
+        """Меняет источник байтов и выбрасывает уже сгенерированные исходы"""
+        self._source = source
+        self._block = []
+        self._next = None
+
+
+# Сервис случайности игр. Каждая игра берет исходы из своего именованного
+# потока. Без seed байты берутся из os.urandom (как в модуле secrets), а с
+# seed у каждого потока свой генератор random.Random, зависящий только от
+# seed и имени потока, поэтому последовательность исходов игры
+# воспроизводится независимо от того, как часто обращаются к другим играм
+class Randomness:
+    def __init__(self, seed: int | str | None = None, *, block_size: int = 4096) -> None:
+        self.seed = seed
+        self.block_size = block_size
+        self._streams: dict[str, RandomStream] = {}
+        # Потоки целых чисел по границам, чтобы не собирать имя потока на каждый вызов
+        self._integers: dict[tuple[int, int], RandomStream[int]] = {}
+
+    def _source(self, name: str) -> ByteSource:
+        if self.seed is None:
+            return os.urandom
+        return random.Random(f'{self.seed}:{name}').randbytes
+
+    def stream(self, name: str, outcomes: Sequence[T]) -> RandomStream[T]:
+        """Возвращает поток с именем name, создавая его при первом обращении"""
+        stream = self._streams.get(name)
+        if stream is None:
+            stream = self._streams[name] = RandomStream(
+                outcomes, self._source(name), block_size=self.block_size
+            )
+        return stream
+
+    def integers(self, start: int, end: int) -> RandomStream[int]:
+        """Поток целых чисел от start до end включительно"""
+        stream = self._integers.get((start, end))
+        if stream is None:
+            stream = self._integers[start, end] = self.stream(
+                f'integers:{start}:{end}', range(start, end + 1)
+            )
+        return stream
+
+    def reseed(self, seed: int | str | None) -> None:
+        """Пересоздает источники всех потоков для нового seed"""
+        self.seed = seed
+        for name, stream in self._streams.items():
+            stream.reset(self._source(name))
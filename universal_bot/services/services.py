@@ -1,23 +1,39 @@
-from random import choice, randint
+from .randomness import Randomness
 
 
-def get_random_item() -> int:
+# Общий сервис случайности игр. Для воспроизводимых прогонов его можно
+# пересоздать с seed через RANDOMNESS.reseed
+RANDOMNESS = Randomness()
+
+ROCK_PAPER_SCISSORS_ITEMS = ('rock', 'paper', 'scissors')
+
+# Что бьет каждый предмет
+_BEATS = {'rock': 'scissors', 'scissors': 'paper', 'paper': 'rock'}
+
+# Исход для пользователя по паре (выбор пользователя, выбор бота)
+WINNERS = {
+    (user_choice, bot_choice): (
+        'draw' if user_choice == bot_choice
+        else 'win' if _BEATS[user_choice] == bot_choice
+        else 'lose'
+    )
+    for user_choice in ROCK_PAPER_SCISSORS_ITEMS
+    for bot_choice in ROCK_PAPER_SCISSORS_ITEMS
+}
+
+_rock_paper_scissors = RANDOMNESS.stream('rock_paper_scissors', ROCK_PAPER_SCISSORS_ITEMS)
+
+
+def get_random_item() -> str:
     """Функция генерирует выбор бота в игре камень, ножницы, бумага"""
-    return choice(['rock', 'paper', 'scissors'])
+    return _rock_paper_scissors()
 
 
 def get_winner(user_choice: str, bot_choice: str) -> str:
     """Функция определяет победителя в игре камень, ножницы, бумага"""
-    rules = {'rock': 'scissors',
-             'scissors': 'paper',
-             'paper': 'rock'}
-    if user_choice == bot_choice:
-        return 'draw'
-    elif rules[user_choice] == bot_choice:
-        return 'win'
-    return 'lose'
+    return WINNERS[user_choice, bot_choice]
 
 
 def get_random_number(start: int=1, end: int=100) -> int:
     """Функция генерирует загаданное число бота в игре Числовая угадайка"""
-    return randint(start, end)
\ No newline at end of file
+    return RANDOMNESS.integers(start, end)()
\ No newline at end of file
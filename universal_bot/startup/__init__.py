@@ -0,0 +1 @@
+from .startup import STARTED, ImportProfiler, StartupProfile, lazy_exports
\ No newline at end of file
@@ -0,0 +1,147 @@
+import importlib
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+
+# Момент загрузки этого модуля: от него считаются фазы запуска
+STARTED = time.perf_counter()
+
+
+def lazy_exports(
+        package: str, exports: Mapping[str, Iterable[str]]
+) -> tuple[Callable[[str], Any], Callable[[], list[str]], list[str]]:
+    """
+    Функция возвращает __getattr__, __dir__ и __all__ для пакета, который
+    подгружает подмодули при первом обращении к их именам. exports задает
+    подмодуль для каждого набора имен, например {'.metrics': ('Metrics',)}
+    """
+    modules = {name: module for module, names in exports.items() for name in names}
+    namespace = sys.modules[package].__dict__
+
+    def __getattr__(name: str) -> Any:
+        module = modules.get(name)
+        if module is None:
+            raise AttributeError(f'module {package!r} has no attribute {name!r}')
+        value = namespace[name] = getattr(importlib.import_module(module, package), name)
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted({*namespace, *modules})
+
+    return __getattr__, __dir__, list(modules)
+
+
+# Загрузчик модуля, который замеряет выполнение его кода. После выполнения
+# модулю возвращается исходный загрузчик, поэтому проверки вида
+# isinstance(module.__loader__, ...) в библиотеках не ломаются
+class _TimedLoader:
+    def __init__(self, loader: Any, profiler: 'ImportProfiler') -> None:
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        self._profiler._enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(module.__name__)
+            module.__loader__ = module.__spec__.loader = self._loader
+
+
+# Профилировщик импортов, как python -X importtime, но внутри процесса: для
+# каждого модуля считает собственное время выполнения и время вместе с
+# вложенными импортами. Ставится первым в sys.meta_path и отдает поиск
+# остальным искателям, лишь оборачивая найденный загрузчик
+class ImportProfiler:
+    def __init__(self) -> None:
+        self.self_time: dict[str, float] = {}
+        self.total_time: dict[str, float] = {}
+        self._stack: list[list[float]] = []  # [начало, время вложенных импортов]
+
+    def find_spec(self, name: str, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, 'find_spec', None)
+            spec = find_spec(name, path, target) if find_spec is not None else None
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def _enter(self) -> None:
+        self._stack.append([time.perf_counter(), 0.0])
+
+    def _exit(self, name: str) -> None:
+        started, children = self._stack.pop()
+        total = time.perf_counter() - started
+        self.total_time[name] = total
+        self.self_time[name] = total - children
+        if self._stack:
+            self._stack[-1][1] += total
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def by_package(self) -> list[tuple[str, float]]:
+        """Собственное время модулей, сложенное по пакетам верхнего уровня"""
+        packages: Counter[str] = Counter()
+        for name, spent in self.self_time.items():
+            packages[name.partition('.')[0]] += spent
+        return packages.most_common()
+
+    def slowest(self, n: int = 10) -> list[tuple[str, float]]:
+        """Модули с самым долгим собственным временем выполнения"""
+        return Counter(self.self_time).most_common(n)
+
+
+# Профиль запуска бота: длительность фаз от загрузки модуля startup до
+# готовности принимать апдейты и, если включен профилировщик, разбивка
+# времени импортов по пакетам
+class StartupProfile:
+    def __init__(self, *, imports: bool = False) -> None:
+        self.phases: list[tuple[str, float]] = []
+        self._last = STARTED
+        self.imports = ImportProfiler() if imports else None
+        if self.imports is not None:
+            self.imports.install()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - STARTED
+
+    def mark(self, phase: str) -> None:
+        """Завершает фазу запуска с названием phase"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self, top: int = 10) -> str:
+        lines = ['Фазы запуска: ' + ', '.join(
+            f'{phase} {spent * 1000:.0f} мс' for phase, spent in self.phases
+        )]
+        if self.imports is not None:
+            self.imports.uninstall()
+            lines.append('Импорты по пакетам: ' + ', '.join(
+                f'{name} {spent * 1000:.0f} мс'
+                for name, spent in self.imports.by_package()[:top]
+            ))
+            lines.append('Самые долгие модули: ' + ', '.join(
+                f'{name} {spent * 1000:.0f} мс' for name, spent in self.imports.slowest(top)
+            ))
+        return '\n'.join(lines)
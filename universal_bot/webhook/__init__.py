@@ -0,0 +1,9 @@
+from startup import lazy_exports
+
+
+# Веб-приложение (aiohttp.web) загружается только в режиме вебхука, а
+# планировщик апдейтов нужен и воркерам, и поллингу
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    '.app': ('create_app', 'run_webhook'),
+    '.scheduler': ('UpdateScheduler',),
+})
\ No newline at end of file
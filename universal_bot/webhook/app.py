@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import Any
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from .scheduler import UpdateScheduler
+
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def create_app(
+        dp: Dispatcher, bot: Bot, *, path: str = '/webhook', secret: str | None = None,
+        max_concurrency: int = 64, max_pending: int = 10000, **kwargs: Any
+) -> web.Application:
+    """
+    Функция создает aiohttp-приложение, принимающее апдейты от Telegram.
+    Апдейт подтверждается сразу после постановки в очередь планировщика,
+    а обрабатывается в фоне. Именованные аргументы передаются в хэндлеры.
+    """
+    scheduler = UpdateScheduler(
+        lambda update: dp.feed_update(bot, update, **kwargs),
+        max_concurrency=max_concurrency, max_pending=max_pending
+    )
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+
+        update = Update.model_validate(await request.json(), context={'bot': bot})
+        await scheduler.submit(update)
+        return web.Response()
+
+    async def on_shutdown(app: web.Application) -> None:
+        # Дорабатываем уже принятые апдейты перед остановкой
+        await scheduler.join()
+
+    app = web.Application()
+    app['scheduler'] = scheduler
+    app.router.add_post(path, handle_update)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+
+async def run_webhook(
+        dp: Dispatcher, bot: Bot, *, base_url: str, path: str, host: str, port: int,
+        secret: str | None = None, max_concurrency: int = 64, **kwargs: Any
+) -> None:
+    """Функция регистрирует вебхук в Telegram и запускает сервер до его остановки"""
+    app = create_app(
+        dp, bot, path=path, secret=secret, max_concurrency=max_concurrency, **kwargs
+    )
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=host, port=port)
+    await site.start()
+
+    # Накопившиеся апдейты не сбрасываем: Telegram доставит их на новый вебхук
+    await bot.set_webhook(
+        url=f'{base_url.rstrip("/")}{path}', secret_token=secret,
+        allowed_updates=dp.resolve_used_update_types()
+    )
+    logger.info('Вебхук запущен на %s:%s%s', host, port, path)
+
+    try:
+        await dp.emit_startup(bot=bot, **kwargs)
+        # Работаем до отмены задачи (Ctrl+C или сигнал остановки)
+        await asyncio.Event().wait()
+    finally:
+        await dp.emit_shutdown(bot=bot, **kwargs)
+        await runner.cleanup()
+        await bot.session.close()
+
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from aiogram.types import Update
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_update_key(update: Update) -> int:
+    """Функция возвращает ключ упорядочивания апдейта: id пользователя, а если его нет, то id апдейта"""
+    user = getattr(update.event, 'from_user', None)
+    return user.id if user is not None else -update.update_id
+
+
+# Планировщик обработки апдейтов. Апдейты разных пользователей обрабатываются
+# параллельно (не более max_concurrency одновременно), а апдейты одного
+# пользователя — строго по очереди в порядке поступления. Если в обработке
+# скопилось max_pending апдейтов, submit ждет освобождения места
+class UpdateScheduler:
+    def __init__(
+            self, process: Callable[[Update], Awaitable[Any]], *,
+            max_concurrency: int = 64, max_pending: int = 10000
+    ) -> None:
+        self._process = process
+        self._concurrency = asyncio.Semaphore(max_concurrency)
+        self._pending = asyncio.Semaphore(max_pending)
+        self._queues: dict[int, deque[Update]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Количество апдейтов, ожидающих обработки или обрабатываемых сейчас"""
+        return sum(map(len, self._queues.values()))
+
+    async def submit(self, update: Update) -> None:
+        await self._pending.acquire()
+
+        key = get_update_key(update)
+        queue = self._queues.get(key)
+        if queue is not None:
+            # У пользователя уже есть обработчик очереди — просто встаем в нее
+            queue.append(update)
+            return
+
+        self._queues[key] = deque((update,))
+        task = asyncio.create_task(self._drain(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, key: int) -> None:
+        queue = self._queues[key]
+        try:
+            while queue:
+                update = queue[0]
+                try:
+                    async with self._concurrency:
+                        await self._process(update)
+                except Exception:
+                    logger.exception('Ошибка при обработке апдейта %s', update.update_id)
+                finally:
+                    queue.popleft()
+                    self._pending.release()
+        finally:
+            del self._queues[key]
+
+    async def join(self) -> None:
+        """Дожидается обработки всех принятых апдейтов"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
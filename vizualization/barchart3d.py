@@ -1,18 +1,32 @@
+import base64
+import json
 import numpy as np
 
 from numpy.typing import ArrayLike, NDArray
-from typing import Sequence
+from pathlib import Path
+from typing import Callable, Sequence
 
 from seaborn import color_palette
 from plotly.graph_objects import Mesh3d, Figure, Frame
+from plotly.offline import get_plotlyjs_version
 
 
 # Error messages
 msg_ticks = 'The {} parameter must conform to the sequence protocol and contain string values'
 msg_indent = 'The value of the indent parameter must be in the interval [0; 1)'
+msg_sort = ("The sort parameter must be a boolean value, 'sum', 'max', a frame "
+            'index, a reduction function or a pair of permutation arrays')
+msg_sort_frame = 'Frame {} passed to the sort parameter is out of range for {} frames'
+msg_sort_perm = ('The pair of arrays passed to the sort parameter must be '
+                 'permutations of {} rows and {} columns')
+msg_colors = "The colors parameter must be 'rank' or 'value'"
+msg_max_bars = ('The max_bars parameter must be a positive integer or a pair of '
+                'positive integers for the y and x axes')
+msg_reduce = "The reduce parameter must be 'sum', 'mean' or 'max'"
 msg_bool = 'The argument passed to the {} parameter must be a boolean value'
 msg_speed = 'The argument passed in the speed parameter must be an integer or float value'
 msg_neg_speed = 'Speed multiplier сannot be a negative or zero value'
+msg_delta = 'Delta frames can only be used together with merged bars (merge=True)'
 msg_neg_val = 'Negative value detected in the passed data array'
 msg_shape = ("The passed array isn't reshapable according to the passed "
              "parameters xticks, yticks and animation_ticks.")
@@ -26,26 +40,217 @@ msg_two_to_three = ('A two-dimensional array cannot be converted to a '
                     'three-dimensional array. Remove the animation_ticks '
                     'parameter or change the shape of the array.')
 
+# Maximum size of the palette lookup table: matplotlib colormaps don't have
+# more colors themselves
+max_colors = 256
+
+# Maximum number of unique values kept for colors='rank'. There can be as many
+# unique values as values in the data, but the palette only resolves
+# max_colors steps, so beyond this a random sample of the unique values is kept
+max_levels = 128 * max_colors
+
+# Ways to sort rows and columns, see the sort parameter of barchart3d
+Sort = bool | str | int | Callable[..., NDArray] | tuple[ArrayLike, ArrayLike]
+
+# Vertices of a bar with unit side centered at the origin: the four corners of
+# the bottom face and then the same corners of the top face
+box_x = np.array([-1, -1, 1, 1, -1, -1, 1, 1]) / 2
+box_y = np.array([-1, 1, 1, -1, -1, 1, 1, -1]) / 2
+box_top = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+
+# Two triangles for each of the six faces of a bar, as indices of its vertices
+box_faces = np.array([
+    [0, 1, 2], [0, 2, 3],  # bottom
+    [4, 5, 6], [4, 6, 7],  # top
+    [0, 1, 5], [0, 5, 4],
+    [1, 2, 6], [1, 6, 5],
+    [2, 3, 7], [2, 7, 6],
+    [3, 0, 4], [3, 4, 7]
+])
+
+# Page of write_barchart3d. __SPEC__ is replaced with the JSON description of
+# the chart and __BUFFERS__ with the base64 frames, if they are embedded
+html_template = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<script src="https://cdn.plot.ly/plotly-__PLOTLYJS__.min.js" charset="utf-8"></script>
+<style>
+    #barchart3d-hover {
+        position: fixed; display: none; pointer-events: none; padding: 4px 8px;
+        background: white; border: 1px solid #444; font: 13px sans-serif;
+    }
+</style>
+</head>
+<body>
+<div id="barchart3d"></div>
+<div id="barchart3d-hover"></div>
+<script type="application/json" id="barchart3d-spec">__SPEC__</script>
+__BUFFERS__
+<script>
+(async function () {
+    const spec = JSON.parse(document.getElementById('barchart3d-spec').textContent);
+    const gd = document.getElementById('barchart3d');
+    const hover = document.getElementById('barchart3d-hover');
+    const box = spec.box, nBars = spec.nrows * spec.ncols, nFrames = spec.frames.length;
+    const types = {
+        float32: Float32Array, float64: Float64Array, uint16: Uint16Array, uint32: Uint32Array
+    };
+
+    // The vertices and faces of one bar are repeated for every cell of the grid
+    const x = new Float32Array(8 * nBars), y = new Float32Array(8 * nBars);
+    const faces = [0, 1, 2].map(() => new Uint32Array(12 * nBars));
+    for (let bar = 0; bar < nBars; bar++) {
+        const row = Math.floor(bar / spec.ncols), col = bar % spec.ncols;
+        for (let v = 0; v < 8; v++) {
+            x[8 * bar + v] = col + box.x[v] * spec.bar_side;
+            y[8 * bar + v] = row + box.y[v] * spec.bar_side;
+        }
+        for (let f = 0; f < 36; f++) {
+            faces[f % 3][12 * bar + Math.floor(f / 3)] = 8 * bar + box.faces[f];
+        }
+    }
+
+    // A frame is decoded or downloaded when it is requested for the first time
+    const buffers = new Map();
+    function loadBuffer(level) {
+        if (!buffers.has(level)) {
+            const src = spec.frames[level].src;
+            const url = spec.inline
+                ? 'data:application/octet-stream;base64,' + document.getElementById(src).textContent
+                : src;
+            buffers.set(level, fetch(url).then(response => {
+                if (!response.ok) {
+                    throw new Error('Failed to load ' + src + ': ' + response.status);
+                }
+                return response.arrayBuffer();
+            }));
+        }
+        return buffers.get(level);
+    }
+
+    async function loadFrame(level) {
+        const frame = spec.frames[level], buffer = await loadBuffer(level);
+        const view = ([type, offset, length]) => new types[type](buffer, offset, length);
+        // Without ranks the colorscale runs over the values themselves
+        const values = view(frame.values), ranks = frame.ranks ? view(frame.ranks) : values;
+        const z = new Float32Array(8 * nBars), intensity = new Float32Array(8 * nBars);
+        for (let bar = 0; bar < nBars; bar++) {
+            const height = spec.log_scale ? Math.log1p(values[bar]) : values[bar];
+            for (let v = 0; v < 8; v++) {
+                z[8 * bar + v] = box.top[v] * height;
+                intensity[8 * bar + v] = ranks[bar];
+            }
+        }
+        return {values, z, intensity};
+    }
+
+    let first = await loadFrame(0), values = first.values, shown = 0;
+    await Plotly.newPlot(gd, [{
+        type: 'mesh3d', x: x, y: y, z: first.z, i: faces[0], j: faces[1], k: faces[2],
+        intensity: first.intensity, intensitymode: 'vertex', colorscale: spec.colorscale,
+        cmin: spec.cmin, cmax: spec.cmax, showscale: spec.colorbar !== null,
+        colorbar: spec.colorbar || {}, flatshading: true
+    }], spec.layout);
+    first = null;
+    console.log('barchart3d: drawn in ' + Math.round(performance.now()) + ' ms');
+    if (nFrames > 1) {
+        loadBuffer(1);
+    }
+
+    // Frames are shown in the order they were requested
+    let queue = Promise.resolve();
+    function show(level) {
+        queue = queue.then(async () => {
+            if (level === shown) {
+                return;
+            }
+            const frame = await loadFrame(level);
+            values = frame.values;
+            shown = level;
+            await Plotly.restyle(gd, {z: [frame.z], intensity: [frame.intensity]}, [0]);
+            if (level + 1 < nFrames) {
+                loadBuffer(level + 1);
+            }
+        });
+        return queue;
+    }
+
+    gd.on('plotly_sliderchange', event => show(Number(event.step.value)));
+
+    let playing = false;
+    gd.on('plotly_buttonclicked', async event => {
+        if (event.button.label !== '►') {
+            playing = false;
+            return;
+        }
+        if (playing) {
+            return;
+        }
+        playing = true;
+        if (shown === nFrames - 1) {
+            await show(0);
+        }
+        while (playing && shown < nFrames - 1) {
+            const started = performance.now(), level = shown + 1;
+            await show(level);
+            await Plotly.relayout(gd, {'sliders[0].active': level});
+            const left = spec.frame_duration - (performance.now() - started);
+            await new Promise(resolve => setTimeout(resolve, Math.max(0, left)));
+        }
+        playing = false;
+    });
+
+    // Hover labels are drawn by the page: plotly reports the hovered vertex,
+    // and every bar has 8 of them
+    let mouseX = 0, mouseY = 0;
+    gd.addEventListener('mousemove', event => {
+        mouseX = event.clientX;
+        mouseY = event.clientY;
+        hover.style.left = (mouseX + 12) + 'px';
+        hover.style.top = (mouseY + 12) + 'px';
+    });
+    gd.on('plotly_hover', event => {
+        const bar = Math.floor(event.points[0].pointNumber / 8);
+        const row = Math.floor(bar / spec.ncols), col = bar % spec.ncols;
+        hover.innerHTML = spec.xtexts[col] + spec.ytexts[row] + '<b>Value</b>: ' + values[bar];
+        hover.style.display = 'block';
+    });
+    gd.on('plotly_unhover', () => {
+        hover.style.display = 'none';
+    });
+})();
+</script>
+</body>
+</html>
+"""
+
 
 def barchart3d(
-        data: ArrayLike, *, xticks: Sequence[str] = None, yticks: Sequence[str] = None,
-        xlabel: str = None, ylabel: str = None, zlabel: str = None,
-        title: str = None, animation_ticks: Sequence[str] = None,
-        animation_title: str = None, cmap: str = 'magma_r', width: int = None,
-        height: int = None, indent: float = 0.1, log_scale: bool = False,
-        sort: bool = False, speed: int | float = 1
+        data: ArrayLike | str | Path, *, xticks: Sequence[str] = None,
+        yticks: Sequence[str] = None, xlabel: str = None, ylabel: str = None,
+        zlabel: str = None, title: str = None, animation_ticks: Sequence[str] = None,
+        animation_title: str = None, cmap: str = 'magma_r', colors: str = 'rank',
+        colorbar: bool = False, width: int = None, height: int = None,
+        indent: float = 0.1, log_scale: bool = False, sort: Sort = False,
+        max_bars: int | tuple[int, int] = None, reduce: str = 'sum',
+        speed: int | float = 1, merge: bool = False,
+        delta: bool = False
 ) -> Figure:
     '''
     Builds 3D bar chart with animation capability.
 
     Parameters
     ----------
-        data: numpy.typing.ArrayLike
+        data: numpy.typing.ArrayLike, str or pathlib.Path
             One-/two-/three-dimensional array of non-negative values. If a
             one-dimensional array is passed, its shape must be reshapable to
             two-dimensional (if only xticks and yticks are passed) or
             three-dimensional (if animation_ticks are passed) using
-            numpy.reshape().
+            numpy.reshape(). A path to a .npy file is opened as a read-only
+            memory-mapped array. Arrays, including numpy.memmap, aren't
+            copied: the frames are read one depth level at a time, so an
+            animation larger than memory can be drawn
         xticks: Sequence[str], default None
             Ticks for x scale i.e. columns in data
         yticks: Sequence[str], default None
@@ -69,6 +274,17 @@ def barchart3d(
                 3. 'ch:<cubehelix arguments>'
                 4. 'light:<color>', 'dark:<color>', 'blend:<color>,<color>',
                 5. a sequence of colors in any format matplotlib accepts
+        colors: str, default 'rank'
+            How the values are mapped to the colormap. With 'rank' the colors
+            are spread evenly over the unique values of all frames, with
+            'value' they are spread linearly from the minimum to the maximum
+            value. Either way a value has the same color in every frame. The
+            colormap is sampled into at most 256 colors, so with more unique
+            values neighbouring values can share a color. With more than
+            max_levels unique values the ranks are estimated from a random
+            sample of them
+        colorbar: bool, default False
+            Whether to show a colorbar with the values
         width: int, default None
             Width of the graph (in pixels)
         height: int, default None
@@ -79,11 +295,42 @@ def barchart3d(
             Whether it's necessary to logarithmize the values on the
             z-axis that were passed to the data parameter. When set to True,
             z-scale values are hidden because they aren't relevant
-        sort: bool, default False
-            Determines whether sorting is necessary. If set to True, sorting is
-            performed on the x and y axes
+        sort: bool, str, int, callable or tuple, default False
+            Determines whether sorting is necessary. If set, rows and columns
+            are sorted in descending order of their scores on the x and y
+            axes, and rows or columns with equal scores keep their order.
+            Possible values include:
+                1. True or 'sum': the sum of the values over all frames
+                2. 'max': the maximum value over all frames
+                3. int: the sum of the values in the frame with this index
+                4. a NumPy-style reduction, called as key(data, axis=(0, 2))
+                for rows and key(data, axis=(0, 1)) for columns of the
+                three-dimensional data
+                5. a pair of permutation arrays (row_order, col_order), for
+                example returned by sort_order() for other data
+        max_bars: int or tuple of two ints, default None
+            The maximum number of bars along the y and x axes (one int limits
+            both). Larger grids are split into contiguous bins of rows and
+            columns, which are merged into single bars with the reduce
+            function and labelled with the first and the last tick of the bin.
+            Binning is applied after sorting, and then a bin is labelled with
+            its first tick and the number of the other ticks, e.g. 'x4 (+2)',
+            because its rows or columns needn't be neighbours in the data
+        reduce: str, default 'sum'
+            How the values of a bin are merged when max_bars is set: 'sum',
+            'mean' or 'max'
         speed: int or float, default 1
             Animation speed multiplier. Cannot be a negative or zero value
+        merge: bool, default False
+            Whether to draw all bars of a frame as one Mesh3d trace. Vertices,
+            faces and colors are then generated by NumPy for the whole grid at
+            once, which makes building and rendering large grids much faster
+            than one trace per bar
+        delta: bool, default False
+            Whether animation frames should only carry the heights, colors and
+            values of the bars, sharing the geometry and hover labels of the
+            first screen. This makes deep animations much lighter. Can only
+            be used together with merge
 
     Returns
     -------
@@ -117,8 +364,10 @@ def barchart3d(
 
     # Validate passed arguments
     _validate_args(
-        data=data, xticks=xticks, yticks=yticks, animation_ticks=animation_ticks,
-        log_scale=log_scale, indent=indent, sort=sort, speed=speed
+        xticks=xticks, yticks=yticks, animation_ticks=animation_ticks,
+        log_scale=log_scale, indent=indent, sort=sort, speed=speed, merge=merge,
+        delta=delta, colors=colors, colorbar=colorbar, max_bars=max_bars,
+        reduce=reduce
     )
 
     # Trying to get the correct NDarray based on the given arguments for ticks.
@@ -126,132 +375,197 @@ def barchart3d(
         data=data, xticks=xticks, yticks=yticks, animation_ticks=animation_ticks
     )
 
-    depth, nrows, ncols = data.shape
+    # Sorting and binning are applied to each frame when it's read
+    read_frame, xticks, yticks = _get_frame_reader(
+        data=data, xticks=xticks, yticks=yticks, sort=sort, max_bars=max_bars,
+        reduce=reduce
+    )
 
-    if sort:
-        data, xticks, yticks = _get_sorted_data(
-            data=data, xticks=xticks, yticks=yticks)
+    depth, nrows, ncols = data.shape[0], len(yticks), len(xticks)
 
     # Determine the side size of one bar
     bar_side = 1 - indent
 
     figure_config = dict()
 
-    # Format axis captions and chart name, if they are set
+    xlabel, ylabel, zlabel, title, animation_title = _get_labels(
+        xlabel=xlabel, ylabel=ylabel, zlabel=zlabel, title=title,
+        animation_title=animation_title
+    )
+    figure_config['layout'] = _get_layout(
+        xticks=xticks, yticks=yticks, xlabel=xlabel, ylabel=ylabel, zlabel=zlabel,
+        title=title, width=width, height=height, log_scale=log_scale,
+        ncols=ncols, nrows=nrows
+    )
+
+    # One palette for all frames
+    levels, vmin, vmax = _get_data_stats(read_frame=read_frame, depth=depth, colors=colors)
+    colors = _get_colors(
+        levels=levels, vmin=vmin, vmax=vmax, cmap=cmap, colorbar=colorbar, zlabel=zlabel
+    )
+
+    bars_config = dict(
+        xticks=xticks, yticks=yticks, xlabel=xlabel, ylabel=ylabel,
+        bar_side=bar_side, colors=colors, log_scale=log_scale, ncols=ncols, nrows=nrows
+    )
+    get_bars = _get_merged_bars if merge else _get_list_of_bars
+    if merge:
+        bars_config['delta'] = delta
+
+    # Create the basic (first) figure
+    first_screen = get_bars(mat=read_frame(0), **bars_config)
+    figure_config['data'] = first_screen
+
+    # If a three-dimensional array, create frames and slider
+    if depth > 1:
+        if delta:
+            # Frames only update the heights and colors of the merged bars,
+            # while the geometry, colorscale and hover labels stay from the
+            # first screen
+            frames = [
+                Frame(
+                    data=[Mesh3d(_get_bar_heights(
+                        mat=read_frame(level), colors=colors, log_scale=log_scale
+                    ))],
+                    traces=[0], name=animation_ticks[level]
+                )
+                for level in range(depth)
+            ]
+        else:
+            # The first frame is the same as the first screen
+            frames = [Frame(data=first_screen, name=animation_ticks[0])] + [
+                Frame(data=get_bars(mat=read_frame(level), **bars_config),
+                      name=animation_ticks[level])
+                for level in range(1, depth)
+            ]
+        figure_config['frames'] = frames
+
+        sliders_dict, updatemenus_dict = _get_animation_controls(
+            animation_ticks=animation_ticks, animation_title=animation_title,
+            speed=speed
+        )
+        figure_config['layout'].update(dict(
+            sliders=[sliders_dict],
+            updatemenus=[updatemenus_dict]
+        ))
+
+    fig = Figure(figure_config)
+
+    return fig
+
+
+def _get_labels(
+        *, xlabel: str, ylabel: str, zlabel: str, title: str, animation_title: str
+) -> tuple[str, str, str, str | None, str | None]:
+    '''
+    Formats axis captions and chart name, if they are set.
+    '''
     xlabel = f'<b>{xlabel}</b>' if xlabel else ''
     ylabel = f'<b>{ylabel}</b>' if ylabel else ''
     zlabel = f'<b>{zlabel}</b>' if zlabel else ''
     title = f'<b>{title}</b>' if title else None
     animation_title = f'{animation_title}: ' if animation_title else None
 
+    return xlabel, ylabel, zlabel, title, animation_title
+
+
+def _get_layout(
+        *, xticks: Sequence[str], yticks: Sequence[str], xlabel: str, ylabel: str,
+        zlabel: str, title: str, width: int, height: int, log_scale: bool,
+        ncols: int, nrows: int
+) -> dict:
+    '''
+    Customizes the height, width, indents, lettering, and aspect ratio of the
+    shape.
+    '''
     # Looking for the aspect ratio to make the bars square rather than rectangular
     x_aspect = 1
     y_aspect = nrows / ncols
     z_aspect = min(x_aspect, y_aspect)
 
-    # Customizes the height, width, indents, lettering, and aspect ratio of the shape
-    figure_config['layout'] = dict(
+    return dict(
         width=width, height=height, margin=dict(l=40, r=40, b=60, t=0),
         title=dict(text=title, font=dict(size=20), x=0.5, y=0.95),
         scene=dict(
             aspectmode='manual',
             aspectratio=dict(x=x_aspect, y=y_aspect, z=z_aspect),
-            xaxis=dict(title=xlabel, tickvals=list(range(ncols)), ticktext=xticks),
-            yaxis=dict(title=ylabel, tickvals=list(range(nrows)), ticktext=yticks),
+            xaxis=dict(title=xlabel, tickvals=list(range(ncols)), ticktext=list(xticks)),
+            yaxis=dict(title=ylabel, tickvals=list(range(nrows)), ticktext=list(yticks)),
             zaxis=dict(title=zlabel, showticklabels=(not log_scale))
         )
     )
 
-    # Create the basic (first) figure
-    first_screen = _get_list_of_bars(
-        mat=data[0], xticks=xticks, yticks=yticks, xlabel=xlabel, ylabel=ylabel,
-        bar_side=bar_side, cmap=cmap, log_scale=log_scale, ncols=ncols, nrows=nrows
-    )
-    figure_config['data'] = first_screen
 
-    # If a three-dimensional array, create frames and slider
-    if depth > 1:
-        frames = [
-            Frame(
-                data=_get_list_of_bars(
-                    mat=data[level], xticks=xticks, yticks=yticks,
-                    xlabel=xlabel, ylabel=ylabel, bar_side=bar_side, cmap=cmap,
-                    log_scale=log_scale, ncols=ncols, nrows=nrows
-                ),
-                name=animation_ticks[level]
-            )
-            for level in range(depth)
-        ]
-        figure_config['frames'] = frames
+def _get_animation_controls(
+        *, animation_ticks: Sequence[str], animation_title: str, speed: int | float
+) -> tuple[dict, dict]:
+    '''
+    Returns the slider and the play/pause buttons of the animation.
+    '''
+    # Configure the display of the current value on the slider,
+    # the location and animation of the slider slider
+    sliders_dict = dict(
+        active=0,
+        currentvalue=dict(
+            font=dict(size=16), prefix=animation_title,
+            visible=True,
+            xanchor="left"
+        ),
+        transition=dict(duration=500 / speed, easing='cubic-in-out'),
+        len=0.9, x=0.1, pad=dict(b=10, t=15),
+        steps=[]
+    )
 
-        # Configure the display of the current value on the slider,
-        # the location and animation of the slider slider
-        sliders_dict = dict(
-            active=0,
-            currentvalue=dict(
-                font=dict(size=16), prefix=animation_title,
-                visible=True,
-                xanchor="left"
-            ),
-            transition=dict(duration=500 / speed, easing='cubic-in-out'),
-            len=0.9, x=0.1, pad=dict(b=10, t=15),
-            steps=[]
+    # Filling the slider with steps
+    steps = [
+        dict(
+            args=[[tick], dict(duration=300 / speed, mode='immediate')],
+            label=tick, method="animate"
         )
+        for tick in animation_ticks
+    ]
+    sliders_dict['steps'] = steps
 
-        # Filling the slider with steps
-        steps = [
+    # Configure the display of the buttons location, their appearance and
+    # animation method
+    updatemenus_dict = dict(
+        direction='left', pad=dict(r=20, t=40),
+        xanchor="right", yanchor="top", x=0.1, y=0,
+        type='buttons',
+        buttons=[
             dict(
-                args=[[tick], dict(duration=300 / speed, mode='immediate')],
-                label=tick, method="animate"
+                args=[
+                    None,
+                    dict(
+                        frame=dict(duration=300 / speed),
+                        fromcurrent=True,
+                        transition=dict(
+                            duration=300 / speed, easing='quadratic-in-out'
+                        )
+                    )
+                ],
+                label='►',
+                method="animate"
+            ),
+            dict(
+                args=[[None], dict(mode='immediate')],
+                label='❚❚',
+                method="animate"
             )
-            for tick in animation_ticks
         ]
-        sliders_dict['steps'] = steps
-
-        # Configure the display of the buttons location, their appearance and
-        # animation method
-        updatemenus_dict = dict(
-            direction='left', pad=dict(r=20, t=40),
-            xanchor="right", yanchor="top", x=0.1, y=0,
-            type='buttons',
-            buttons=[
-                dict(
-                    args=[
-                        None,
-                        dict(
-                            frame=dict(duration=300 / speed),
-                            fromcurrent=True,
-                            transition=dict(
-                                duration=300 / speed, easing='quadratic-in-out'
-                            )
-                        )
-                    ],
-                    label='►',
-                    method="animate"
-                ),
-                dict(
-                    args=[[None], dict(mode='immediate')],
-                    label='❚❚',
-                    method="animate"
-                )
-            ]
-        )
-        figure_config['layout'].update(dict(
-            sliders=[sliders_dict],
-            updatemenus=[updatemenus_dict]
-        ))
-
-    fig = Figure(figure_config)
+    )
 
-    return fig
+    return sliders_dict, updatemenus_dict
 
 
 def _validate_args(
-        *, data, xticks, yticks, animation_ticks, log_scale, indent, sort, speed
+        *, xticks, yticks, animation_ticks, log_scale, indent, sort, speed,
+        merge, delta, colors, colorbar, max_bars, reduce
 ) -> None:
     '''
     Checks whether the values and types of the passed objects match the
-    required ones.
+    required ones. The values of the data are checked by _get_data_stats
+    while it reads the frames.
     '''
     def is_seq(x): return hasattr(x, '__getitem__') and hasattr(x, '__len__')
     def contains_str(x): return all((isinstance(elem, str) for elem in x))
@@ -266,28 +580,48 @@ def _validate_args(
 
     if not isinstance(log_scale, bool):
         raise TypeError(msg_bool.format('log_scale'))
-    if not isinstance(sort, bool):
-        raise TypeError(msg_bool.format('sort'))
+    if not (isinstance(sort, int | np.integer | tuple) or callable(sort)
+            or sort in ('sum', 'max')):
+        raise TypeError(msg_sort)
+    if not isinstance(merge, bool):
+        raise TypeError(msg_bool.format('merge'))
+    if not isinstance(delta, bool):
+        raise TypeError(msg_bool.format('delta'))
+    if not isinstance(colorbar, bool):
+        raise TypeError(msg_bool.format('colorbar'))
+    if colors not in ('rank', 'value'):
+        raise ValueError(msg_colors)
+    if max_bars is not None:
+        limits = max_bars if isinstance(max_bars, tuple) else (max_bars, max_bars)
+        if not (len(limits) == 2 and all(
+                isinstance(limit, int) and not isinstance(limit, bool) and limit > 0
+                for limit in limits)):
+            raise ValueError(msg_max_bars)
+    if reduce not in ('sum', 'mean', 'max'):
+        raise ValueError(msg_reduce)
     if not isinstance(speed, int | float):
         raise TypeError(msg_speed)
 
     if not (0 <= indent < 1):
         raise ValueError(msg_indent)
-    if np.min(data) < 0:
-        raise ValueError(msg_neg_val)
     if speed <= 0:
         raise ValueError(msg_neg_speed)
+    if delta and not merge:
+        raise ValueError(msg_delta)
 
     return
 
 
 def _get_reshaped_data(*, data, xticks, yticks, animation_ticks) -> NDArray:
     '''
-    Converts an ArrayLike object to an NDarray, checks that the dimensionality
-    and size of the original array are correct relative to the expected ones,
-    and reshapes the data if necessary.
+    Converts an ArrayLike object to an NDarray without copying it, checks that
+    the dimensionality and size of the original array are correct relative to
+    the expected ones, and reshapes the data if necessary. A path is opened as
+    a memory-mapped .npy file.
     '''
-    data = np.array(data)
+    if isinstance(data, str | Path):
+        data = np.load(data, mmap_mode='r')
+    data = np.asarray(data)
 
     dims = data.shape
 
@@ -330,47 +664,364 @@ def _get_reshaped_data(*, data, xticks, yticks, animation_ticks) -> NDArray:
     return data
 
 
-def _get_sorted_data(
-        *, data: NDArray, xticks: Sequence[str], yticks: Sequence[str]
-) -> tuple[NDArray, Sequence[str], Sequence[str]]:
-    mat_sum = data.sum(axis=0)
+def sort_order(data: ArrayLike, sort: Sort = 'sum') -> tuple[NDArray, NDArray]:
+    '''
+    Returns the orders of rows and columns in which barchart3d draws the data
+    with the given sort parameter. The orders are permutation arrays, so they
+    can be computed once and passed to barchart3d as sort=(row_order,
+    col_order) for other data with the same rows and columns.
 
-    # Find the sums by axes for further sorting
-    row_sum = mat_sum.sum(axis=1)
-    col_sum = mat_sum.sum(axis=0)
+    Parameters
+    ----------
+        data: numpy.typing.ArrayLike
+            Two- or three-dimensional array of values
+        sort: bool, str, int, callable or tuple, default 'sum'
+            The same as in barchart3d
 
-    # Find the order of rows and columns and take their indices
-    row_order: list[int] = [
-        np.where(row_sum == val)[0][0]
-        for val in sorted(row_sum, reverse=True)
-    ]
-    col_order: list[int] = [
-        np.where(col_sum == val)[0][0]
-        for val in sorted(col_sum, reverse=True)
+    Returns
+    -------
+    return tuple of row and column orders
+    '''
+    data = np.asarray(data)
+    if data.ndim == 2:
+        data = data[None]
+    depth, nrows, ncols = data.shape
+
+    if isinstance(sort, tuple):
+        row_order, col_order = (np.asarray(order) for order in sort)
+        if not (_is_permutation(row_order, nrows) and _is_permutation(col_order, ncols)):
+            raise ValueError(msg_sort_perm.format(nrows, ncols))
+        return row_order, col_order
+
+    key = sort
+    if sort is True or sort == 'sum':
+        key = np.sum
+    elif sort == 'max':
+        key = np.max
+    elif isinstance(sort, int | np.integer):
+        if not -depth <= sort < depth:
+            raise ValueError(msg_sort_frame.format(sort, depth))
+        data, key = data[[sort]], np.sum
+
+    row_order = _get_descending_order(key(data, axis=(0, 2)))
+    col_order = _get_descending_order(key(data, axis=(0, 1)))
+
+    return row_order, col_order
+
+
+def _get_descending_order(scores: NDArray) -> NDArray:
+    '''
+    Stable argsort in descending order: equal scores keep their order.
+    '''
+    # Sorting the reversed scores in ascending order and reversing the result
+    # gives the descending order with ties in the original order
+    scores = np.asarray(scores)
+    order = np.argsort(scores[::-1], kind='stable')[::-1]
+
+    return scores.size - 1 - order
+
+
+def _is_permutation(order: NDArray, size: int) -> bool:
+    return (
+        order.shape == (size,) and np.issubdtype(order.dtype, np.integer)
+        and np.array_equal(np.sort(order), np.arange(size))
+    )
+
+
+def _get_frame_reader(
+        *, data: NDArray, xticks: Sequence[str], yticks: Sequence[str], sort: Sort,
+        max_bars: int | tuple[int, int] | None, reduce: str
+) -> tuple[Callable[..., NDArray], Sequence[str], Sequence[str]]:
+    '''
+    Finds the orders of rows and columns and the bins of max_bars, and returns
+    a function that reads one depth level of the data with them applied,
+    together with the new xticks and yticks. Only the frame being read is
+    loaded into memory, so the data isn't copied as a whole.
+    '''
+    depth, nrows, ncols = data.shape
+
+    row_order = col_order = None
+    if sort is not False:
+        # The scores are NumPy reductions, so they stream through the data too
+        row_order, col_order = sort_order(data, sort)
+
+        # Changing the order of the labels
+        yticks = [yticks[ind] for ind in row_order.tolist()]
+        xticks = [xticks[ind] for ind in col_order.tolist()]
+
+    row_edges = col_edges = None
+    if max_bars is not None:
+        max_rows, max_cols = max_bars if isinstance(max_bars, tuple) else (max_bars, max_bars)
+        row_edges = _get_bin_edges(size=nrows, max_bins=max_rows)
+        col_edges = _get_bin_edges(size=ncols, max_bins=max_cols)
+
+        sorted_ticks = row_order is not None
+        xticks = _get_bin_ticks(ticks=xticks, edges=col_edges, sorted_ticks=sorted_ticks)
+        yticks = _get_bin_ticks(ticks=yticks, edges=row_edges, sorted_ticks=sorted_ticks)
+
+    def read_frame(level: int, *, validate: bool = False) -> NDArray:
+        mat = np.asarray(data[level])
+        if validate:
+            if np.min(mat) < 0:
+                raise ValueError(msg_neg_val)
+            # Statistics of the values don't depend on the order of the bars,
+            # so a frame that isn't binned is returned as is
+            if row_edges is None:
+                return mat
+
+        # Arrange the columns and rows of the frame and merge them into bins
+        if row_edges is not None:
+            mat = _get_binned_data(
+                data=mat, row_edges=row_edges, col_edges=col_edges, reduce=reduce,
+                row_order=row_order, col_order=col_order
+            )
+        elif row_order is not None:
+            mat = mat[row_order[:, None], col_order]
+
+        return mat
+
+    return read_frame, xticks, yticks
+
+
+def aggregate_data(
+        data: ArrayLike, *, xticks: Sequence[str], yticks: Sequence[str],
+        max_bars: int | tuple[int, int], reduce: str = 'sum'
+) -> tuple[NDArray, list[str], list[str], NDArray, NDArray]:
+    '''
+    Merges rows and columns of the data into contiguous bins, so that the grid
+    has at most max_bars bars along each axis. This is what barchart3d does
+    with the max_bars parameter.
+
+    Parameters
+    ----------
+        data: numpy.typing.ArrayLike
+            Two- or three-dimensional array of values
+        xticks, yticks, max_bars, reduce
+            The same as in barchart3d
+
+    Returns
+    -------
+    return tuple of the three-dimensional aggregated data, its xticks and
+    yticks, and the edges of the row and column bins. The bin of the bar in
+    row i and column j covers data[:, row_edges[i]:row_edges[i + 1],
+    col_edges[j]:col_edges[j + 1]], so the bar can be drilled down by passing
+    this slice and the matching ticks to barchart3d again.
+    '''
+    data = np.asarray(data)
+    if data.ndim == 2:
+        data = data[None]
+    depth, nrows, ncols = data.shape
+    max_rows, max_cols = max_bars if isinstance(max_bars, tuple) else (max_bars, max_bars)
+
+    row_edges = _get_bin_edges(size=nrows, max_bins=max_rows)
+    col_edges = _get_bin_edges(size=ncols, max_bins=max_cols)
+    data = _get_binned_data(
+        data=data, row_edges=row_edges, col_edges=col_edges, reduce=reduce)
+
+    xticks = _get_bin_ticks(ticks=xticks, edges=col_edges)
+    yticks = _get_bin_ticks(ticks=yticks, edges=row_edges)
+
+    return data, xticks, yticks, row_edges, col_edges
+
+
+def _get_binned_data(
+        *, data: NDArray, row_edges: NDArray, col_edges: NDArray, reduce: str,
+        row_order: NDArray = None, col_order: NDArray = None
+) -> NDArray:
+    '''
+    Merges the rows and columns of a frame or of the whole data (the last two
+    axes) into the bins with the given edges, after arranging them in the
+    given orders, if they are passed.
+    '''
+    nrows, ncols = data.shape[-2:]
+
+    # Bins are reduced with ufunc.reduceat along each axis in turn, and the
+    # mean is the sum divided by the number of cells in the bin. The rows are
+    # merged before the columns are arranged, so the columns are gathered
+    # from an already smaller array
+    ufunc = np.maximum if reduce == 'max' else np.add
+    if row_order is not None:
+        data = data[..., row_order, :]
+    if row_edges.size <= nrows:
+        data = ufunc.reduceat(data, row_edges[:-1], axis=-2)
+    if col_order is not None:
+        data = data[..., col_order]
+    if col_edges.size <= ncols:
+        data = ufunc.reduceat(data, col_edges[:-1], axis=-1)
+    if reduce == 'mean':
+        data = data / np.outer(np.diff(row_edges), np.diff(col_edges))
+
+    return data
+
+
+def _get_bin_edges(*, size: int, max_bins: int) -> NDArray:
+    '''
+    Splits size cells into at most max_bins contiguous bins of nearly equal
+    size and returns the edges of the bins.
+    '''
+    if size <= max_bins:
+        return np.arange(size + 1)
+
+    return np.linspace(0, size, max_bins + 1).round().astype(np.intp)
+
+
+def _get_bin_ticks(
+        *, ticks: Sequence[str], edges: NDArray, sorted_ticks: bool = False
+) -> list[str]:
+    '''
+    Labels the bins with the first and the last tick. The bins of sorted
+    ticks aren't ranges of the original ticks, so they are labelled with the
+    first tick and the number of the others instead.
+    '''
+    return [
+        ticks[start] if end - start == 1
+        else f'{ticks[start]} (+{end - start - 1})' if sorted_ticks
+        else f'{ticks[start]} – {ticks[end - 1]}'
+        for start, end in zip(edges[:-1].tolist(), edges[1:].tolist())
     ]
 
-    # Changing the order of the labels
-    row_labels = [yticks[ind] for ind in row_order]
-    col_labels = [xticks[ind] for ind in col_order]
 
-    # Create a tensor with correct arrangement of columns and rows
-    data = data[:, row_order, :][:, :, col_order]
+def _get_data_stats(
+        *, read_frame: Callable[..., NDArray], depth: int, colors: str
+) -> tuple[NDArray | None, float | None, float | None]:
+    '''
+    Reads the data frame by frame in a single pass, checks that it has no
+    negative values and collects what the palette needs: the unique values of
+    all frames with colors='rank', the minimum and the maximum otherwise.
+    Of more than max_levels unique values only a random sample is kept as the
+    frames are read, so only one frame and max_levels values are in memory.
+    '''
+    levels = hashes = vmin = vmax = None
+    for level in range(depth):
+        mat = read_frame(level, validate=True)
+        if colors == 'rank':
+            levels, hashes = _sample_levels(
+                levels=levels, hashes=hashes, unique=np.unique(mat), size=max_levels
+            )
+        else:
+            mat_min, mat_max = np.min(mat).item(), np.max(mat).item()
+            vmin = mat_min if vmin is None else min(vmin, mat_min)
+            vmax = mat_max if vmax is None else max(vmax, mat_max)
+
+    return levels, vmin, vmax
+
+
+def _sample_levels(
+        *, levels: NDArray | None, hashes: NDArray | None, unique: NDArray, size: int
+) -> tuple[NDArray, NDArray]:
+    '''
+    Adds the unique values of a frame to the levels and keeps at most size of
+    them: the ones with the smallest hashes. A value has the same hash in every
+    frame, so it is either kept each time it recurs or never, and the levels
+    are a uniform sample of the unique values of all frames however often the
+    values recur. The colorscale runs over the positions of the levels, so their
+    quantiles stand for the ranks among all unique values. Returns the levels
+    sorted and their hashes.
+    '''
+    unique_hashes = _hash_values(unique)
+    if levels is not None:
+        # Values whose hashes are above the kept ones can't get into the sample
+        if levels.size >= size:
+            kept = unique_hashes <= hashes.max()
+            unique, unique_hashes = unique[kept], unique_hashes[kept]
+        levels, index = np.unique(np.concatenate([levels, unique]), return_index=True)
+        unique_hashes = np.concatenate([hashes, unique_hashes])[index]
+    else:
+        levels = unique
+    if levels.size > size:
+        kept = np.sort(np.argpartition(unique_hashes, size - 1)[:size])
+        levels, unique_hashes = levels[kept], unique_hashes[kept]
+
+    return levels, unique_hashes
 
-    return data, col_labels, row_labels
+
+def _hash_values(values: NDArray) -> NDArray:
+    '''
+    Hashes the values to pseudo-random 64-bit integers: the bits of the values
+    as float64 mixed with the finalizer of splitmix64.
+    '''
+    # Adding zero turns -0.0 into 0.0, which np.unique takes for the same value
+    x = (values.astype(np.float64) + 0.0).view(np.uint64)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _get_colors(
+        *, levels: NDArray | None, vmin: float | None, vmax: float | None,
+        cmap: str, colorbar: bool, zlabel: str
+) -> dict:
+    '''
+    Builds the palette lookup table shared by all frames and the colorscale
+    made of it. If the unique values of the data are passed as levels, the
+    colorscale runs over their ranks, otherwise over the values from vmin to
+    vmax.
+    '''
+    if levels is not None:
+        cmin, cmax = 0, max(levels.size - 1, 1)
+        n_colors = min(levels.size, max_colors)
+    else:
+        cmin, cmax = vmin, vmax
+        cmax = cmax if cmax > cmin else cmin + 1
+        n_colors = max_colors
+
+    palette = color_palette(palette=cmap, n_colors=n_colors)
+    lut = [f'rgb({", ".join(str(int(i * 255)) for i in color)})' for color in palette]
+    if n_colors > 1:
+        colorscale = [[n / (n_colors - 1), rgb] for n, rgb in enumerate(lut)]
+    else:
+        colorscale = [[0, lut[0]], [1, lut[0]]]
+
+    colorbar_config = None
+    if colorbar:
+        colorbar_config = dict(title=dict(text=zlabel))
+        # Ranks mean nothing to the reader, so the ticks show the values
+        if levels is not None:
+            ticks = np.unique(np.linspace(0, levels.size - 1, 6).round().astype(int))
+            colorbar_config.update(
+                tickvals=ticks.tolist(),
+                ticktext=[str(val) for val in levels[ticks].tolist()]
+            )
+
+    return dict(
+        levels=levels, lut=lut, colorscale=colorscale, cmin=cmin, cmax=cmax,
+        colorbar=colorbar_config
+    )
+
+
+def _get_intensities(*, mat: ArrayLike, colors: dict) -> NDArray:
+    '''
+    Maps the values of the matrix to the colorscale: to their ranks among the
+    unique values of the data or to the values themselves.
+    '''
+    values = np.ravel(mat)
+    if colors['levels'] is None:
+        return values
+
+    return np.searchsorted(colors['levels'], values)
+
+
+def _get_lut_indices(*, intensities: NDArray, colors: dict) -> NDArray:
+    '''
+    Finds the colors of the palette lookup table for positions on the
+    colorscale.
+    '''
+    n_colors = len(colors['lut'])
+    position = (intensities - colors['cmin']) / (colors['cmax'] - colors['cmin'])
+
+    return np.rint(np.clip(position, 0, 1) * (n_colors - 1)).astype(np.intp)
 
 
 def _get_list_of_bars(
         mat: ArrayLike, xticks: Sequence[str], yticks: Sequence[str],
-        xlabel: str, ylabel: str, bar_side: float, cmap: str, log_scale: bool,
+        xlabel: str, ylabel: str, bar_side: float, colors: dict, log_scale: bool,
         ncols: int, nrows: int
 ) -> list[Mesh3d]:
     traces: list[Mesh3d] = []
 
-    mat_unique_vals = np.unique(mat)
-
-    # Creating a color palette
-    n_colors = mat_unique_vals.size
-    colors = color_palette(palette=cmap, n_colors=n_colors)
+    # Find the colors of all values in the palette at once
+    intensities = _get_intensities(mat=mat, colors=colors)
+    lut_indices = _get_lut_indices(intensities=intensities, colors=colors).tolist()
 
     # The matrix is processed so that the maximum value is located in the far
     # corner of the figure
@@ -382,9 +1033,15 @@ def _get_list_of_bars(
             x_min, x_max = x - bar_side / 2, x + bar_side / 2
             y_min, y_max = y - bar_side / 2, y + bar_side / 2
 
-            # Get the color for the current value from the color palette array
-            color = colors[np.where(mat_unique_vals == val)[0][0]]
-            rgb_str = f'rgb({", ".join(str(int(i * 255)) for i in color)})'
+            # The first bar carries the colorbar, if it's shown
+            if x == y == 0 and colors['colorbar'] is not None:
+                color_config = dict(
+                    intensity=[intensities[0]] * 8, colorscale=colors['colorscale'],
+                    cmin=colors['cmin'], cmax=colors['cmax'], showscale=True,
+                    colorbar=colors['colorbar']
+                )
+            else:
+                color_config = dict(color=colors['lut'][lut_indices[y * ncols + x]])
 
             # Customize the legend in the pop-up window that appears when
             # hovering over the bar
@@ -406,9 +1063,297 @@ def _get_list_of_bars(
                 y=[y_min, y_max, y_max, y_min, y_min, y_max, y_max, y_min],
                 z=[0] * 4 + [np.log(val + 1) if log_scale else val] * 4,
                 alphahull=0,
-                color=rgb_str, flatshading=True,
+                **color_config, flatshading=True,
                 hovertext=hovertext, hoverinfo='text'
             )
             traces.append(bar)
 
     return traces
+
+
+def _get_merged_bars(
+        mat: ArrayLike, xticks: Sequence[str], yticks: Sequence[str],
+        xlabel: str, ylabel: str, bar_side: float, colors: dict, log_scale: bool,
+        ncols: int, nrows: int, delta: bool = False
+) -> list[Mesh3d]:
+    '''
+    Builds all bars of the matrix as a single Mesh3d trace. Does the same as
+    _get_list_of_bars, but generates vertices, faces and colors for the whole
+    grid with NumPy instead of creating a trace per bar. With delta the hover
+    labels are built for delta frames, which only replace the values.
+    '''
+    bars = Mesh3d({
+        **_get_bar_geometry(bar_side=bar_side, colors=colors, ncols=ncols, nrows=nrows),
+        **_get_bar_heights(mat=mat, colors=colors, log_scale=log_scale),
+        **(_get_shared_hover if delta else _get_frame_hover)(
+            mat=mat, xticks=xticks, yticks=yticks, xlabel=xlabel, ylabel=ylabel
+        )
+    })
+
+    return [bars]
+
+
+def _get_tick_texts(
+        *, xticks: Sequence[str], yticks: Sequence[str], xlabel: str, ylabel: str
+) -> tuple[list[str], list[str]]:
+    '''
+    Returns the lines of the pop-up window that appears when hovering over the
+    bar, which name its column and row.
+    '''
+    if xlabel and ylabel:
+        xtexts = [f'{xlabel}: {tick.replace("<br>", " ")}<br>' for tick in xticks]
+        ytexts = [f'{ylabel}: {tick.replace("<br>", " ")}<br>' for tick in yticks]
+    else:
+        xtexts = [f'{tick}<br>' for tick in xticks]
+        ytexts = [f'{tick}<br>' for tick in yticks]
+    return xtexts, ytexts
+
+
+def _get_shared_hover(
+        *, mat: ArrayLike, xticks: Sequence[str], yticks: Sequence[str], xlabel: str,
+        ylabel: str
+) -> dict:
+    '''
+    Returns hover labels for delta frames. Hover labels are mapped to
+    vertices, so the tick lines of a bar are repeated for its 8 vertices as
+    text, which is set once on the first screen, while the value is taken
+    from customdata, which every frame replaces.
+    '''
+    xtexts, ytexts = _get_tick_texts(xticks=xticks, yticks=yticks, xlabel=xlabel, ylabel=ylabel)
+    texts = [xtext + ytext for ytext in ytexts for xtext in xtexts]
+
+    return dict(
+        text=np.repeat(texts, 8),
+        hovertemplate='%{text}<b>Value</b>: %{customdata}<extra></extra>'
+    )
+
+
+def _get_frame_hover(
+        *, mat: ArrayLike, xticks: Sequence[str], yticks: Sequence[str], xlabel: str,
+        ylabel: str
+) -> dict:
+    '''
+    Returns hover labels for frames that replace the whole trace. The ticks
+    and the value of a bar are repeated for its 8 vertices as compact
+    customdata, and the axis labels are set once in the template.
+    '''
+    values = np.ravel(mat)
+    nrows, ncols = len(yticks), len(xticks)
+    rows, cols = np.divmod(np.arange(nrows * ncols), ncols)
+
+    if xlabel and ylabel:
+        xticks = [tick.replace('<br>', ' ') for tick in xticks]
+        yticks = [tick.replace('<br>', ' ') for tick in yticks]
+        hovertemplate = f'{xlabel}: %{{customdata[0]}}<br>{ylabel}: %{{customdata[1]}}<br>'
+    else:
+        hovertemplate = '%{customdata[0]}<br>%{customdata[1]}<br>'
+    hovertemplate += '<b>Value</b>: %{customdata[2]}<extra></extra>'
+    customdata = np.empty((nrows * ncols, 3), dtype=object)
+    customdata[:, 0] = np.asarray(xticks, dtype=object)[cols]
+    customdata[:, 1] = np.asarray(yticks, dtype=object)[rows]
+    customdata[:, 2] = values.tolist()
+
+    return dict(customdata=np.repeat(customdata, 8, axis=0), hovertemplate=hovertemplate)
+
+
+def _get_bar_geometry(
+        *, bar_side: float, colors: dict, ncols: int, nrows: int
+) -> dict:
+    '''
+    Returns the part of the merged bars that is the same for all frames:
+    vertex positions on the grid, faces and colorscale.
+    '''
+    n_bars = nrows * ncols
+
+    # Bars go row by row, like the values in the flattened matrix. Every bar
+    # has 8 vertices and 12 triangular faces
+    rows, cols = np.divmod(np.arange(n_bars), ncols)
+    x = (cols[:, None] + box_x * bar_side).astype(np.float32).ravel()
+    y = (rows[:, None] + box_y * bar_side).astype(np.float32).ravel()
+    faces = (box_faces + 8 * np.arange(n_bars)[:, None, None]).reshape(-1, 3)
+
+    return dict(
+        x=x, y=y, i=faces[:, 0], j=faces[:, 1], k=faces[:, 2],
+        intensitymode='vertex', colorscale=colors['colorscale'], cmin=colors['cmin'],
+        cmax=colors['cmax'], showscale=colors['colorbar'] is not None,
+        colorbar=colors['colorbar'], flatshading=True
+    )
+
+
+def _get_bar_heights(*, mat: ArrayLike, colors: dict, log_scale: bool) -> dict:
+    '''
+    Returns the part of the merged bars that changes between frames: heights,
+    colors and values of the bars.
+    '''
+    values = np.ravel(mat)
+    heights = np.log(values + 1) if log_scale else values
+
+    return dict(
+        z=(heights[:, None] * box_top).ravel(),
+        intensity=np.repeat(_get_intensities(mat=mat, colors=colors), 8),
+        customdata=np.repeat(values, 8)
+    )
+
+
+def write_barchart3d(
+        path: str | Path, data: ArrayLike | str | Path, *,
+        xticks: Sequence[str] = None, yticks: Sequence[str] = None, xlabel: str = None, ylabel: str = None,
+        zlabel: str = None, title: str = None, animation_ticks: Sequence[str] = None,
+        animation_title: str = None, cmap: str = 'magma_r', colors: str = 'rank',
+        colorbar: bool = False, width: int = None, height: int = None,
+        indent: float = 0.1, log_scale: bool = False, sort: Sort = False,
+        max_bars: int | tuple[int, int] = None, reduce: str = 'sum',
+        speed: int | float = 1, sidecar: bool = False
+) -> Path:
+    '''
+    Writes 3D bar chart with animation capability to an HTML file that stores
+    its data as binary typed arrays. Designed for grids that are too large for
+    barchart3d: the file stays small for millions of bars, but the page has
+    to build the whole mesh in the browser (see Notes).
+
+    Parameters
+    ----------
+        path: str or pathlib.Path
+            Path of the HTML file
+        data, xticks, yticks, xlabel, ylabel, zlabel, title, animation_ticks,
+        animation_title, cmap, colors, colorbar, width, height, indent,
+        log_scale, sort, max_bars, reduce, speed
+            The same as in barchart3d
+        sidecar: bool, default False
+            Whether to write the frames into separate binary files in the
+            <name>_files directory next to the HTML file. Otherwise the frames
+            are embedded into the HTML file as base64. Sidecar files are loaded
+            with fetch, so the page must be opened through an HTTP server
+            (for example, python -m http.server), not as a local file
+
+    Returns
+    -------
+    return pathlib.Path of the written HTML file
+
+    Notes
+    -----
+    The page draws all bars as one Mesh3d trace, like barchart3d with
+    merge=True, but its geometry isn't stored in the file: the page repeats
+    the vertices and faces of one bar for every cell of the grid. A frame
+    stores only the values of the bars and the ranks of their colors, and it
+    is decoded (or downloaded, if sidecar is True) only when the slider
+    reaches it. Hover labels are drawn by the page itself instead of plotly.
+
+    Only writing the file is verified for millions of bars. The page script
+    was run on a 1000x1000 grid under Node.js with a stubbed DOM and plotly:
+    building the mesh took 1.7 s and 735 MB of memory, before plotly and
+    WebGL make their own copies of it. Drawing in a real browser hasn't been
+    measured at any size, so grids of hundreds of thousands of bars and more
+    should be aggregated with max_bars for interactive use.
+    '''
+    _validate_args(
+        xticks=xticks, yticks=yticks, animation_ticks=animation_ticks,
+        log_scale=log_scale, indent=indent, sort=sort, speed=speed, merge=False,
+        delta=False, colors=colors, colorbar=colorbar, max_bars=max_bars,
+        reduce=reduce
+    )
+    data = _get_reshaped_data(
+        data=data, xticks=xticks, yticks=yticks, animation_ticks=animation_ticks
+    )
+    read_frame, xticks, yticks = _get_frame_reader(
+        data=data, xticks=xticks, yticks=yticks, sort=sort, max_bars=max_bars,
+        reduce=reduce
+    )
+    depth, nrows, ncols = data.shape[0], len(yticks), len(xticks)
+    animation_ticks = animation_ticks or ['']
+
+    xlabel, ylabel, zlabel, title, animation_title = _get_labels(
+        xlabel=xlabel, ylabel=ylabel, zlabel=zlabel, title=title,
+        animation_title=animation_title
+    )
+    layout = _get_layout(
+        xticks=xticks, yticks=yticks, xlabel=xlabel, ylabel=ylabel, zlabel=zlabel,
+        title=title, width=width, height=height, log_scale=log_scale,
+        ncols=ncols, nrows=nrows
+    )
+    if depth > 1:
+        # The page switches frames itself, so the controls only report clicks
+        sliders_dict, updatemenus_dict = _get_animation_controls(
+            animation_ticks=animation_ticks, animation_title=animation_title,
+            speed=speed
+        )
+        for level, step in enumerate(sliders_dict['steps']):
+            step.update(args=[], method='skip', value=str(level))
+        for button in updatemenus_dict['buttons']:
+            button.update(args=[], method='skip')
+        layout.update(dict(sliders=[sliders_dict], updatemenus=[updatemenus_dict]))
+    # Plotly's hover labels need a text per vertex, so the page draws its own
+    layout['scene']['hovermode'] = False
+
+    # Hover labels of the rows and columns
+    xtexts, ytexts = _get_tick_texts(xticks=xticks, yticks=yticks, xlabel=xlabel, ylabel=ylabel)
+
+    # One palette for all frames
+    levels, vmin, vmax = _get_data_stats(read_frame=read_frame, depth=depth, colors=colors)
+    colors = _get_colors(
+        levels=levels, vmin=vmin, vmax=vmax, cmap=cmap, colorbar=colorbar, zlabel=zlabel
+    )
+
+    path = Path(path)
+    files = path.with_name(f'{path.stem}_files')
+    if sidecar:
+        files.mkdir(exist_ok=True)
+
+    frames, buffers = [], []
+    for level in range(depth):
+        buffer, frame = _get_frame_buffer(mat=read_frame(level), colors=colors)
+        frame['name'] = animation_ticks[level]
+        if sidecar:
+            (files / f'frame_{level}.bin').write_bytes(buffer)
+            frame['src'] = f'{files.name}/frame_{level}.bin'
+        else:
+            buffers.append(
+                f'<script type="application/octet-stream" id="barchart3d-frame-{level}">'
+                f'{base64.b64encode(buffer).decode()}</script>'
+            )
+            frame['src'] = f'barchart3d-frame-{level}'
+        frames.append(frame)
+
+    spec = dict(
+        nrows=nrows, ncols=ncols, bar_side=1 - indent, log_scale=log_scale,
+        frame_duration=300 / speed, inline=not sidecar, xtexts=xtexts,
+        ytexts=ytexts, box=dict(x=box_x.tolist(), y=box_y.tolist(),
+                                top=box_top.tolist(), faces=box_faces.ravel().tolist()),
+        colorscale=colors['colorscale'], cmin=colors['cmin'], cmax=colors['cmax'],
+        colorbar=colors['colorbar'], layout=layout, frames=frames
+    )
+    # The spec is embedded into a script tag, so it must not close it
+    spec_json = json.dumps(spec, ensure_ascii=False).replace('</', '<\\/')
+
+    html = (html_template
+            .replace('__PLOTLYJS__', get_plotlyjs_version())
+            .replace('__SPEC__', spec_json)
+            .replace('__BUFFERS__', '\n'.join(buffers)))
+    path.write_text(html, encoding='utf-8')
+
+    return path
+
+
+def _get_frame_buffer(*, mat: NDArray, colors: dict) -> tuple[bytes, dict]:
+    '''
+    Packs the values of the bars and, if colors are assigned by rank, the
+    ranks of the values into one binary buffer for write_barchart3d and
+    describes its layout.
+    '''
+    values = np.ravel(mat)
+
+    # float32 halves the buffer, if the values survive it unchanged
+    values_32 = values.astype(np.float32)
+    if np.array_equal(values_32, values):
+        values = values_32
+    else:
+        values = values.astype(np.float64)
+    frame = dict(values=[values.dtype.name, 0, values.size], ranks=None)
+    if colors['levels'] is None:
+        return values.tobytes(), frame
+
+    ranks = _get_intensities(mat=mat, colors=colors)
+    ranks = ranks.astype(np.uint16 if colors['levels'].size <= 2 ** 16 else np.uint32)
+    frame['ranks'] = [ranks.dtype.name, values.nbytes, ranks.size]
+
+    return values.tobytes() + ranks.tobytes(), frame
@@ -0,0 +1,130 @@
+'''
+Benchmark of barchart3d: one Mesh3d per bar, merged bars, delta frames and binary export.
+
+Builds the same animated chart in every mode and measures the time to build
+the figure, the time to export it to JSON and the size of the JSON. The
+binary modes are written with write_barchart3d (frames embedded as base64
+or in sidecar files), and their build time is the time to write the files.
+With --html the charts are also written as HTML files that show their load
+time in the browser tab title (binary pages log it to the console) once the
+first frame is drawn. The binary modes scale to millions of bars in this
+benchmark because it only measures writing the files: whether a browser can
+draw such a page hasn't been measured (see write_barchart3d). Run from the
+vizualization directory:
+    python barchart3d_bench.py --rows 30 --cols 30 --depth 10 --html /tmp
+    python barchart3d_bench.py --rows 1000 --cols 1000 --depth 5 --modes binary sidecar
+    python barchart3d_bench.py --rows 2000 --cols 2000 --depth 5 --modes delta binary --max-bars 100
+'''
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from barchart3d import barchart3d, write_barchart3d
+
+
+# Modes of building the chart: arguments of barchart3d for each of them
+MODES = {
+    'per bar': dict(merge=False),
+    'merged': dict(merge=True),
+    'delta': dict(merge=True, delta=True),
+}
+
+# Modes of write_barchart3d: its arguments for each of them
+EXPORTS = {
+    'binary': dict(sidecar=False),
+    'sidecar': dict(sidecar=True),
+}
+
+# Runs in the browser after the chart is drawn: the time since navigation
+# start includes loading the page, parsing the figure and the first render
+LOAD_TIMER = '''
+document.title = 'Loaded in ' + Math.round(performance.now()) + ' ms';
+console.log(document.title);
+'''
+
+
+def measure(data, html: Path | None = None, **mode) -> tuple[float, float, int]:
+    '''Returns build time, export time and JSON size of the chart'''
+    depth, nrows, ncols = data.shape
+    started = time.perf_counter()
+    fig = barchart3d(
+        data, xticks=[f'x{i}' for i in range(ncols)],
+        yticks=[f'y{i}' for i in range(nrows)],
+        animation_ticks=[f'{i}' for i in range(depth)] if depth > 1 else None,
+        xlabel='X', ylabel='Y', zlabel='Value', **mode
+    )
+    built = time.perf_counter()
+    size = len(fig.to_json().encode())
+    exported = time.perf_counter()
+    if html is not None:
+        fig.write_html(html, include_plotlyjs='cdn', post_script=LOAD_TIMER)
+    return built - started, exported - built, size
+
+
+def measure_export(data, html: Path, **mode) -> tuple[float, float, int]:
+    '''Returns the time to write the chart, zero export time and its size'''
+    depth, nrows, ncols = data.shape
+    started = time.perf_counter()
+    write_barchart3d(
+        html, data, xticks=[f'x{i}' for i in range(ncols)],
+        yticks=[f'y{i}' for i in range(nrows)],
+        animation_ticks=[f'{i}' for i in range(depth)] if depth > 1 else None,
+        xlabel='X', ylabel='Y', zlabel='Value', **mode
+    )
+    written = time.perf_counter() - started
+    files = html.with_name(f'{html.stem}_files')
+    size = html.stat().st_size
+    if files.exists():
+        size += sum(file.stat().st_size for file in files.iterdir())
+    return written, 0.0, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=30)
+    parser.add_argument('--cols', type=int, default=30)
+    parser.add_argument('--depth', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--modes', nargs='+', choices=[*MODES, *EXPORTS],
+                        default=[*MODES, *EXPORTS])
+    parser.add_argument('--max-bars', type=int, default=None,
+                        help='aggregate the grid to at most this many bars per axis')
+    parser.add_argument('--html', type=Path, default=None,
+                        help='directory for HTML files with a load timer')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    data = rng.integers(0, 1000, size=(args.depth, args.rows, args.cols))
+    print(f'Grid {args.rows}x{args.cols}, {args.depth} frames, '
+          f'{data.size} bars in total'
+          + (f', aggregated to at most {args.max_bars} bars per axis' if args.max_bars else ''))
+    limits = dict(max_bars=args.max_bars)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.modes:
+            html = None
+            if args.html is not None or name in EXPORTS:
+                html = (args.html or Path(directory)) / f'barchart3d_{name.replace(" ", "_")}.html'
+            if name in EXPORTS:
+                results[name] = build, export, size = measure_export(data, html, **EXPORTS[name], **limits)
+            else:
+                results[name] = build, export, size = measure(data, html, **MODES[name], **limits)
+            print(f'{name:>8}: build {build:.2f} s, export {export:.2f} s, '
+                  f'size {size / 2 ** 20:.1f} MB'
+                  + (f', written to {html}' if args.html is not None else ''))
+
+    if len(results) > 1:
+        base, (build, export, size) = args.modes[0], results[args.modes[0]]
+        for name in args.modes[1:]:
+            m_build, m_export, m_size = results[name]
+            print(f'{name} against {base}: build and export '
+                  f'{(build + export) / (m_build + m_export):.1f}x faster, '
+                  f'{size / m_size:.2f}x smaller')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+'''
+Benchmark of barchart3d color mapping: per-frame palettes against one palette lookup table.
+
+The previous approach built a palette of all unique values for every frame,
+found the color of each bar with np.where and formatted an rgb string per
+bar. The lookup table is built once for all frames, and the colors of a
+whole frame are found in one vectorized call. Both are timed on the same
+random data, the previous approach on --old-frames frames only, because it
+is quadratic. Run from the vizualization directory:
+    python barchart3d_colors_bench.py --rows 300 --cols 300 --depth 10
+'''
+import argparse
+import time
+
+import numpy as np
+
+from seaborn import color_palette
+
+from barchart3d import _get_colors, _get_data_stats, _get_intensities, _get_lut_indices
+
+
+def old_colors(mat) -> list[str]:
+    '''Colors of the bars of one frame as barchart3d found them before'''
+    mat_unique_vals = np.unique(mat)
+    colors = color_palette(palette='magma_r', n_colors=mat_unique_vals.size)
+    rgb_strs = []
+    for val in np.ravel(mat):
+        color = colors[np.where(mat_unique_vals == val)[0][0]]
+        rgb_strs.append(f'rgb({", ".join(str(int(i * 255)) for i in color)})')
+    return rgb_strs
+
+
+def new_colors(mat, colors: dict) -> list[str]:
+    '''Colors of the bars of one frame from the lookup table'''
+    intensities = _get_intensities(mat=mat, colors=colors)
+    lut = colors['lut']
+    return [lut[i] for i in _get_lut_indices(intensities=intensities, colors=colors).tolist()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=300)
+    parser.add_argument('--cols', type=int, default=300)
+    parser.add_argument('--depth', type=int, default=10)
+    parser.add_argument('--values', type=int, default=1000,
+                        help='number of distinct values in the data')
+    parser.add_argument('--old-frames', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    data = rng.integers(0, args.values, size=(args.depth, args.rows, args.cols))
+    print(f'Grid {args.rows}x{args.cols}, {args.depth} frames, '
+          f'{np.unique(data).size} unique values')
+
+    for mode in ('rank', 'value'):
+        started = time.perf_counter()
+        levels, vmin, vmax = _get_data_stats(
+            read_frame=lambda level, validate: data[level], depth=args.depth, colors=mode)
+        colors = _get_colors(levels=levels, vmin=vmin, vmax=vmax, cmap='magma_r',
+                             colorbar=False, zlabel='')
+        built = time.perf_counter()
+        for level in range(args.depth):
+            # Positions on the colorscale, as merged bars use them
+            _get_intensities(mat=data[level], colors=colors)
+        mapped = time.perf_counter()
+        for level in range(args.depth):
+            new_colors(data[level], colors)
+        formatted = time.perf_counter()
+        print(f'{mode:>5} LUT: built in {(built - started) * 1000:.1f} ms, '
+              f'intensities {(mapped - built) / args.depth * 1000:.2f} ms per frame, '
+              f'rgb strings {(formatted - mapped) / args.depth * 1000:.1f} ms per frame')
+
+    started = time.perf_counter()
+    for level in range(args.old_frames):
+        old_colors(data[level])
+    old = (time.perf_counter() - started) / args.old_frames
+    print(f'Per-frame palettes: {old * 1000:.0f} ms per frame, '
+          f'{old / ((formatted - mapped) / args.depth):.0f}x slower than the LUT')
+
+    # Frames had their own palettes, so a value could change its color
+    first = dict(zip(np.ravel(data[0]).tolist(), old_colors(data[0])))
+    second = dict(zip(np.ravel(data[-1]).tolist(), old_colors(data[-1])))
+    changed = sum(first[val] != second[val] for val in first.keys() & second.keys())
+    print(f'Values that changed color between the first and the last frame: '
+          f'{changed} with per-frame palettes, 0 with the LUT')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+'''
+Benchmark of barchart3d memory: an animation tensor loaded into memory against a memory-mapped .npy file.
+
+Writes random data to a .npy file and draws it with write_barchart3d (frames
+in sidecar files) and with barchart3d (delta frames), once from the array
+loaded into memory and once from the path of the file, which is memory-mapped.
+The peak of memory allocated by Python and NumPy is traced with tracemalloc:
+pages of a memory-mapped file aren't allocations, so with the path only the
+frame being read is counted. Grids are aggregated with --max-bars, because
+the chart itself must fit into memory, and barchart3d also keeps all frames
+in the figure. With colors='rank' the unique values of the frames are
+sampled down to max_levels as they are read, so --colors value differs only
+by those levels. Run from the vizualization directory:
+    python barchart3d_memory_bench.py --rows 2000 --cols 2000 --depth 50 --max-bars 100
+    python barchart3d_memory_bench.py --rows 500 --cols 500 --depth 20 --max-bars 500 --colors value
+'''
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from barchart3d import barchart3d, write_barchart3d
+
+
+def measure(chart, load) -> tuple[float, int]:
+    '''Returns the time to load the data and draw the chart and the peak of allocated memory'''
+    tracemalloc.start()
+    started = time.perf_counter()
+    chart(load())
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--cols', type=int, default=1000)
+    parser.add_argument('--depth', type=int, default=20)
+    parser.add_argument('--max-bars', type=int, default=100)
+    parser.add_argument('--colors', choices=['rank', 'value'], default='rank')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ticks = dict(
+        xticks=[f'x{i}' for i in range(args.cols)],
+        yticks=[f'y{i}' for i in range(args.rows)],
+        animation_ticks=[f'{i}' for i in range(args.depth)] if args.depth > 1 else None,
+        sort=True, max_bars=args.max_bars, colors=args.colors
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = Path(directory) / 'data.npy'
+        # Frames are generated one at a time, so the file can be larger than memory
+        rng = np.random.default_rng(args.seed)
+        data = np.lib.format.open_memmap(
+            source, mode='w+', dtype=np.float32, shape=(args.depth, args.rows, args.cols))
+        for level in range(args.depth):
+            data[level] = rng.random((args.rows, args.cols), dtype=np.float32)
+        data.flush()
+        del data
+        frame = args.rows * args.cols * 4
+        print(f'Grid {args.rows}x{args.cols}, {args.depth} frames: '
+              f'{frame * args.depth / 2 ** 20:.0f} MB of data, '
+              f'{frame / 2 ** 20:.1f} MB per frame')
+
+        charts = {
+            'write_barchart3d': lambda data: write_barchart3d(
+                Path(directory) / 'chart.html', data, sidecar=True, **ticks),
+            'barchart3d': lambda data: barchart3d(data, merge=True, delta=True, **ticks),
+        }
+        # The array is read into memory, while the path is mapped by barchart3d
+        sources = {
+            'memory': lambda: np.load(source),
+            'memmap': lambda: source,
+        }
+        for name, chart in charts.items():
+            for kind, load in sources.items():
+                elapsed, peak = measure(chart, load)
+                print(f'{name:>16} from {kind}: '
+                      f'{elapsed:.2f} s, peak {peak / 2 ** 20:.1f} MB '
+                      f'({peak / frame:.1f} frames)')
+
+
+if __name__ == '__main__':
+    main()